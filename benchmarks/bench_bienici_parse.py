@@ -0,0 +1,168 @@
+"""Compare le débit (annonces/s) du parsing Bien'ici avant et après la projection des champs
+
+- ``before`` : ``response.json()`` (décodage texte puis module json) et annonce
+  complète conservée dans ``features`` ;
+- ``after`` : ``loads_json`` sur les octets (orjson s'il est installé) et
+  ``project_ad``, limitée aux champs persistés.
+
+La taille BSON moyenne des documents produits est aussi rapportée.
+
+Usage :
+    python benchmarks/bench_bienici_parse.py [--store data/raw/fixtures] [--pages 200] [--repeat 3]
+
+Sans réponses enregistrées (cf. bench_spiders.py), des pages synthétiques sont générées.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+
+import bson
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(os.path.join(ROOT, 'scraper'))
+
+from config import HTTP_FIXTURES_CONFIG  # noqa: E402
+from http_fixtures import FixtureStore  # noqa: E402
+from spiders.bienici_spider import project_ad  # noqa: E402
+from utils import loads_json, orjson  # noqa: E402
+
+
+def synthetic_ad(i: int) -> dict:
+    """Annonce au format de realEstateAds.json, avec les champs volumineux d'une vraie réponse"""
+    return {
+        'id': f'ag330000-{i}', 'reference': f'REF{i}', 'title': 'Appartement 3 pièces',
+        'propertyType': 'flat', 'price': 200000 + i, 'pricePerSquareMeter': 3500,
+        'surfaceArea': 60 + i % 40, 'roomsQuantity': 3, 'bedroomsQuantity': 2, 'floor': i % 6,
+        'floorQuantity': 6, 'hasElevator': True, 'hasBalcony': i % 2 == 0,
+        'energyClassification': 'C', 'greenhouseGazClassification': 'D', 'yearOfConstruction': 1990,
+        'city': 'Bordeaux', 'postalCode': '33000',
+        'district': {'name': 'Chartrons', 'id': 123, 'libelle': 'Chartrons'},
+        'description': 'Bel appartement lumineux, proche tram et commerces. ' * 12,
+        'publicationDate': '2024-05-01T08:00:00.000Z',
+        'modificationDate': '2024-05-20T08:00:00.000Z',
+        'photos': [{'url': f'https://file.bienici.com/photo/{i}-{p}.jpg',
+                    'url_photo': f'https://file.bienici.com/photo/{i}-{p}.jpg',
+                    'photo': f'{i}-{p}.jpg'} for p in range(15)],
+        'blurInfo': {'type': 'position', 'position': {'lat': 44.85, 'lon': -0.57}, 'radius': 30,
+                     'bbox': [-0.58, 44.84, -0.56, 44.86], 'origin': 'accounts'},
+        'accountDisplayName': 'Agence du Centre', 'adTypeFR': 'appartement', 'with3dModel': False,
+        'virtualTours': [],
+        'status': {'onTheMarket': True, 'closedByUser': False, 'highlighted': False},
+    }
+
+
+def synthetic_pages(count: int, per_page: int = 24):
+    return [
+        json.dumps({
+            'total': count * per_page, 'from': page * per_page, 'perPage': per_page,
+            'realEstateAds': [synthetic_ad(page * per_page + i) for i in range(per_page)],
+        }).encode()
+        for page in range(count)
+    ]
+
+
+def recorded_pages(store: FixtureStore):
+    return [store.read_body(fixture) for fixture in store.fixtures('bienici_spider')
+            if fixture.get('callback') in (None, 'parse') and fixture['status'] == 200]
+
+
+def legacy_ad(realEstate: dict, department: str) -> dict:
+    """Conversion d'origine : annonce complète dans ``features``, journalisation par annonce"""
+    price = realEstate.get('price', 0)
+    features = realEstate
+    num_pieces = realEstate.get('roomsQuantity', 0)
+    surface_m2 = realEstate.get('surfaceArea', 0)
+    num_chambres = realEstate.get('bedroomsQuantity', 0)
+    price_per_m2 = realEstate.get('pricePerSquareMeter', 0)
+    if isinstance(price, list):
+        price = sum(filter(None, price)) / len(price) if price else 0
+    if isinstance(price_per_m2, list):
+        price_per_m2 = sum(filter(None, price_per_m2)) / len(price_per_m2) if price_per_m2 else 0
+    if isinstance(num_chambres, list):
+        num_chambres = (int(sum(filter(None, num_chambres)) / len(num_chambres))
+                        if num_chambres else 0)
+    if isinstance(num_pieces, list):
+        num_pieces = int(sum(filter(None, num_pieces)) / len(num_pieces)) if num_pieces else 0
+    if isinstance(surface_m2, list):
+        surface_m2 = sum(filter(None, surface_m2)) / len(surface_m2) if surface_m2 else 0
+    if price_per_m2 is None:
+        price_per_m2 = price // surface_m2 if surface_m2 > 0 else 0
+    logging.debug(f"Price: {price}, Surface: {surface_m2}, Bedrooms: {num_chambres}, "
+                  f"Price per m2: {price_per_m2}")
+    property_type_mapping = {
+        'house': 'maison', 'flat': 'appartement', 'programme': 'programme', 'loft': 'loft',
+        'castle': 'château', 'townhouse': 'maison de ville',
+    }
+    current_time = datetime.now()
+    return {
+        'department': department,
+        'price': float(price) if price is not None else 0,
+        'price_per_m2': float(price_per_m2) if price_per_m2 is not None else 0,
+        'surface_m2': float(surface_m2) if surface_m2 is not None else 0,
+        'rooms': int(num_pieces) if num_pieces is not None else 0,
+        'bedrooms': int(num_chambres) if num_chambres is not None else 0,
+        'address': realEstate.get('district', '').get('name', ''),
+        'city': realEstate.get('city', ''),
+        'postal_code': realEstate.get('postalCode', ''),
+        'property_type': property_type_mapping.get(realEstate['propertyType'],
+                                                   realEstate['propertyType']),
+        'listing_url': realEstate.get('id', ''),
+        'features': features,
+        'description': realEstate.get('description', ''),
+        'first_seen_at': current_time, 'last_seen_at': current_time,
+        'last_updated_at': current_time,
+        'update_count': 1, 'is_active': True,
+    }
+
+
+def parse_before(body: bytes):
+    data = json.loads(body.decode('utf-8'))
+    return [legacy_ad(ad, '33') for ad in data.get('realEstateAds', [])]
+
+
+def parse_after(body: bytes):
+    data = loads_json(body)
+    seen_at = datetime.now()
+    return [project_ad(ad, '33', seen_at) for ad in data.get('realEstateAds', [])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--store', default=HTTP_FIXTURES_CONFIG['path'],
+                        help="Répertoire des réponses enregistrées")
+    parser.add_argument('--pages', type=int, default=200,
+                        help="Pages synthétiques sans réponses enregistrées")
+    parser.add_argument('--repeat', type=int, default=3, help="Nombre de passes sur les pages")
+    args = parser.parse_args()
+
+    pages = recorded_pages(FixtureStore(args.store))
+    source = f"{len(pages)} pages enregistrées"
+    if not pages:
+        pages = synthetic_pages(args.pages)
+        source = f"{len(pages)} pages synthétiques"
+    print(f"{source}, décodeur {'orjson' if orjson is not None else 'json'}")
+
+    results = {}
+    for name, parse in (('before', parse_before), ('after', parse_after)):
+        ads = 0
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for body in pages:
+                ads += len(parse(body))
+        elapsed = time.perf_counter() - start
+        documents = parse(pages[0])
+        size = sum(len(bson.encode(doc)) for doc in documents) / max(1, len(documents))
+        results[name] = ads / elapsed
+        print(f"{name:>7}: {ads} annonces en {elapsed:.2f}s - {results[name]:,.0f} annonces/s, "
+              f"{size:,.0f} octets BSON par document")
+
+    print(f"speedup: x{results['after'] / results['before']:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Compare le débit (lignes/s) des moteurs de transformation DVF
+
+Usage :
+    python benchmarks/bench_dvf_transform.py [--rows 200000] [--file full.csv.gz]
+
+Sans ``--file``, un fichier DVF synthétique est généré en mémoire.
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(os.path.join(ROOT, 'scraper'))
+sys.path.append(os.path.join(ROOT, 'tests'))
+
+from dvf_samples import dvf_gzip_bytes, dvf_row  # noqa: E402
+from dvf_transform import CHUNK_SIZE, DVF_USECOLS, transform_chunk  # noqa: E402
+from spiders.gouv_spider import GouvSpider  # noqa: E402
+from utils import iter_gzip_csv  # noqa: E402
+
+
+def bench_rows(payload: bytes) -> int:
+    """Chemin historique : csv.DictReader + GouvSpider.process_row"""
+    spider = GouvSpider.__new__(GouvSpider)
+    properties = []
+    rows = 0
+    for row in iter_gzip_csv(io.BytesIO(payload)):
+        rows += 1
+        if (row['nature_mutation'] == 'Vente' and row['valeur_fonciere']
+                and row['type_local'] in ['Maison', 'Appartement']):
+            property_data = spider.process_row(row)
+            if property_data is not None:
+                properties.append(property_data)
+    return rows
+
+
+def bench_columnar(payload: bytes) -> int:
+    """Moteur par blocs : pandas.read_csv + transform_chunk (comme ``iter_dvf_records``)
+
+    Compte les lignes CSV lues, comme ``bench_rows``, et non les propriétés produites.
+    """
+    rows = 0
+    reader = pd.read_csv(io.BytesIO(payload), compression='gzip', usecols=DVF_USECOLS, dtype=str,
+                         keep_default_na=False, chunksize=CHUNK_SIZE)
+    with reader:
+        for chunk in reader:
+            rows += len(chunk)
+            transform_chunk(chunk, GouvSpider.name)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=200_000, help="Lignes du fichier synthétique")
+    parser.add_argument('--file', help="Fichier DVF réel (full.csv.gz) à utiliser")
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, 'rb') as f:
+            payload = f.read()
+    else:
+        payload = dvf_gzip_bytes(dvf_row(i) for i in range(args.rows))
+
+    results = {}
+    for name, bench in (('rows', bench_rows), ('columnar', bench_columnar)):
+        start = time.perf_counter()
+        rows = bench(payload)
+        elapsed = time.perf_counter() - start
+        results[name] = rows / elapsed
+        print(f"{name:>9}: {rows} lignes en {elapsed:.2f}s - {results[name]:,.0f} lignes/s")
+
+    print(f"  speedup: x{results['columnar'] / results['rows']:.1f}")
+
+
+if __name__ == '__main__':
+    main()
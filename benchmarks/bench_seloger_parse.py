@@ -0,0 +1,150 @@
+"""Compare le débit (cartes/s) de l'extraction des cartes SeLoger avant et après le parcours unique
+
+- ``before`` : un sélecteur CSS par champ et par carte (extraction d'origine) ;
+- ``after`` : ``extract_card``, XPath précompilés et un seul parcours des
+  éléments de chaque carte.
+
+Chaque passe reconstruit les réponses : l'analyse du HTML est comptée dans
+les deux mesures, comme dans ``SeLogerSpider.parse``.
+
+Usage :
+    python benchmarks/bench_seloger_parse.py [--store data/raw/fixtures] [--pages 100] [--repeat 3]
+
+Sans réponses enregistrées (cf. bench_spiders.py), des pages synthétiques sont générées.
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(os.path.join(ROOT, 'scraper'))
+
+from scrapy.http import HtmlResponse  # noqa: E402
+
+from config import HTTP_FIXTURES_CONFIG  # noqa: E402
+from http_fixtures import FixtureStore  # noqa: E402
+from spiders.seloger_spider import CARD_XPATH, extract_card  # noqa: E402
+
+
+def synthetic_card(i: int) -> str:
+    """Carte au format des pages de recherche, avec le balisage d'affichage d'une vraie carte"""
+    photos = ''.join(f'<li><picture><source srcset="https://v.seloger.com/s/crop/{i}-{p}.jpg">'
+                     f'<img alt="photo {p}" src="https://v.seloger.com/s/crop/{i}-{p}.jpg">'
+                     '</picture></li>'
+                     for p in range(8))
+    return f'''
+    <div data-testid="serp-core-classified-card-testid" class="Card__Container">
+      <a data-testid="card-mfe-covering-link-testid"
+         href="https://www.seloger.com/annonces/achat/maison/bordeaux-33/{i}.htm"></a>
+      <div class="Card__Gallery">
+        <ul>{photos}</ul><button data-testid="cardmfe-bookmark-testid">Favori</button>
+      </div>
+      <div class="Card__Content">
+        <div data-testid="cardmfe-price-testid">
+          {200 + i % 300}&#160;000&#160;€<span>Prix de vente</span></div>
+        <div data-testid="cardmfe-keyfacts-testid">
+          <div>{2 + i % 5} pièces</div><div>·</div><div>{1 + i % 4} chambres</div><div>·</div>
+          <div>{40 + i % 120} m²</div><div>·</div><div>{300 + i} m² terrain</div>
+        </div>
+        <div data-testid="cardmfe-description-box-text-test-id">
+          <div>Maison à vendre</div><div>Chartrons</div>
+        </div>
+        <div data-testid="cardmfe-description-box-address">Bordeaux (33000)</div>
+        <div data-testid="cardmfe-description-text-test-id">
+          <div>{'Belle maison lumineuse avec jardin. ' * 6}</div>
+        </div>
+        <div class="Card__Agency">
+          <img alt="agence" src="https://v.seloger.com/agency/{i % 50}.png">
+          <span>Agence du Centre</span>
+        </div>
+      </div>
+    </div>'''
+
+
+def synthetic_pages(count: int, per_page: int = 25):
+    return [
+        ('https://www.seloger.com/immobilier/achat/33/?LISTING-LISTpg=1',
+         f'''<html><head><meta name="description" content="{count * per_page} annonces"></head>
+         <body>
+         <header>{'<nav><a href="/">SeLoger</a></nav>' * 20}</header>
+         <main>{''.join(synthetic_card(page * per_page + i) for i in range(per_page))}</main>
+         </body></html>'''.encode())
+        for page in range(count)
+    ]
+
+
+def recorded_pages(store: FixtureStore):
+    return [(fixture['url'], store.read_body(fixture))
+            for fixture in store.fixtures('seloger_spider')
+            if fixture.get('callback') in (None, 'parse') and fixture['status'] == 200]
+
+
+def cards_before(response):
+    """Extraction d'origine : un sélecteur CSS par champ"""
+    cards = []
+    for listing in response.css('div[data-testid="serp-core-classified-card-testid"]'):
+        cards.append({
+            'price': listing.css('div[data-testid="cardmfe-price-testid"]::text').get(),
+            'address': listing.css(
+                'div[data-testid="cardmfe-description-box-address"]::text'
+            ).get(),
+            'listing_url': listing.css(
+                'a[data-testid="card-mfe-covering-link-testid"]::attr(href)'
+            ).get(),
+            'keyfacts': listing.css(
+                'div[data-testid="cardmfe-keyfacts-testid"] div::text'
+            ).getall(),
+            'description': listing.css(
+                'div[data-testid="cardmfe-description-text-test-id"] div::text'
+            ).getall(),
+            'description_box': listing.css(
+                'div[data-testid="cardmfe-description-box-text-test-id"] div::text'
+            ).getall(),
+        })
+    return cards
+
+
+def cards_after(response):
+    return [extract_card(card) for card in CARD_XPATH(response.selector.root)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--store', default=HTTP_FIXTURES_CONFIG['path'],
+                        help="Répertoire des réponses enregistrées")
+    parser.add_argument('--pages', type=int, default=100,
+                        help="Pages synthétiques sans réponses enregistrées")
+    parser.add_argument('--repeat', type=int, default=3, help="Nombre de passes sur les pages")
+    args = parser.parse_args()
+
+    pages = recorded_pages(FixtureStore(args.store))
+    source = f"{len(pages)} pages enregistrées"
+    if not pages:
+        pages = synthetic_pages(args.pages)
+        source = f"{len(pages)} pages synthétiques"
+    print(source)
+
+    # Les deux extractions doivent produire les mêmes champs
+    url, body = pages[0]
+    first_page = HtmlResponse(url=url, body=body)
+    if cards_before(first_page) != cards_after(first_page):
+        print("attention : les extractions diffèrent sur la première page")
+
+    results = {}
+    for name, extract in (('before', cards_before), ('after', cards_after)):
+        cards = 0
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for url, body in pages:
+                cards += len(extract(HtmlResponse(url=url, body=body)))
+        elapsed = time.perf_counter() - start
+        results[name] = cards / elapsed
+        print(f"{name:>7}: {cards} cartes en {elapsed:.2f}s - {results[name]:,.0f} cartes/s")
+
+    print(f"speedup: x{results['after'] / results['before']:.1f}")
+
+
+if __name__ == '__main__':
+    main()
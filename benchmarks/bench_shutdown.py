@@ -0,0 +1,114 @@
+"""Mesure le coût des opérations de fin de run (closed) sur une collection MongoDB
+
+Compare l'ancien nettoyage (balayage d'inactivité sur toute la collection et
+recherche de doublons par ``$group``) au nettoyage indexé (balayage limité à
+la source et aux départements du run, recherche de doublons sautée quand
+l'index unique existe).
+
+Usage :
+    python benchmarks/bench_shutdown.py --uri mongodb://localhost:27017 [--docs 1000000]
+
+Les documents sont écrits dans une base temporaire supprimée à la fin.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pymongo
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(os.path.join(ROOT, 'scraper'))
+
+from mongo_indexes import (  # noqa: E402
+    ensure_indexes, mark_inactive_listings, remove_duplicate_listings
+)
+
+SOURCES = ['bienici', 'seloger', 'gouv']
+DEPARTMENTS = [f"{i:02d}" for i in range(1, 96)]
+
+
+def seed(collection, docs: int) -> None:
+    """Remplit la collection avec des annonces réparties sur les sources et départements"""
+    now = datetime.now()
+    rng = random.Random(0)
+    batch = []
+    for i in range(docs):
+        batch.append({
+            'listing_url': f"https://example.org/annonce/{i}",
+            'source': SOURCES[i % len(SOURCES)],
+            'department': DEPARTMENTS[i % len(DEPARTMENTS)],
+            'is_active': True,
+            'last_seen_at': now - timedelta(days=rng.randint(0, 90)),
+        })
+        if len(batch) == 10_000:
+            collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+
+
+def reset_activity(collection) -> None:
+    collection.update_many({'is_active': False}, {'$set': {'is_active': True}})
+
+
+def legacy_shutdown(collection, cutoff) -> None:
+    """Nettoyage historique de RealEstateSpider.closed"""
+    collection.update_many({'last_seen_at': {'$lt': cutoff}, 'is_active': True},
+                           {'$set': {'is_active': False}})
+    duplicates = collection.aggregate([
+        {'$group': {'_id': '$listing_url', 'doc_id': {'$first': '$_id'}, 'count': {'$sum': 1}}},
+        {'$match': {'count': {'$gt': 1}}}
+    ], allowDiskUse=True)
+    for doc in duplicates:
+        collection.delete_many({'listing_url': doc['_id'], '_id': {'$ne': doc['doc_id']}})
+
+
+def indexed_shutdown(collection, cutoff, departments) -> None:
+    """Nettoyage indexé : source et départements du run uniquement"""
+    mark_inactive_listings(collection, 'bienici', departments, cutoff)
+    remove_duplicate_listings(collection)
+
+
+def timed(label: str, func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    print(f"{label:>8}: {elapsed:.2f}s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--uri', default=os.getenv('MONGO_URI', 'mongodb://localhost:27017'))
+    parser.add_argument('--docs', type=int, default=1_000_000, help="Nombre d'annonces générées")
+    parser.add_argument('--departments', type=int, default=5,
+                        help="Départements crawlés pendant le run simulé")
+    args = parser.parse_args()
+
+    client = pymongo.MongoClient(args.uri)
+    db_name = f"bench_shutdown_{os.getpid()}"
+    collection = client[db_name]['real_estate']
+    try:
+        print(f"Génération de {args.docs} annonces...")
+        seed(collection, args.docs)
+        cutoff = datetime.now() - timedelta(days=30)
+        departments = DEPARTMENTS[:args.departments]
+
+        # Ancien nettoyage : seul l'index sur listing_url existe
+        collection.create_index('listing_url', unique=True)
+        legacy = timed('legacy', legacy_shutdown, collection, cutoff)
+        reset_activity(collection)
+
+        ensure_indexes(collection)
+        indexed = timed('indexed', indexed_shutdown, collection, cutoff, departments)
+        print(f" speedup: x{legacy / max(indexed, 1e-9):.1f}")
+    finally:
+        client.drop_database(db_name)
+        client.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Mesure le débit (pages/s, propriétés/s) des parseurs sur des réponses enregistrées
+
+Les réponses sont d'abord enregistrées lors d'un crawl réel :
+    HTTP_FIXTURES_MODE=record python scraper/run_bienici_spiders.py
+    HTTP_FIXTURES_MODE=record DVF_CACHE_DIR=data/raw/dvf python scraper/run_gouv_spiders.py
+
+puis rejouées sans réseau ni MongoDB, directement dans les callbacks
+(``BienIciSpider.parse``, ``SeLogerSpider.parse``, ``GouvSpider.process_stream``).
+
+Usage :
+    python benchmarks/bench_spiders.py [--store data/raw/fixtures] [--spider bienici] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(os.path.join(ROOT, 'scraper'))
+
+from scrapy.http import Request  # noqa: E402
+from scrapy.responsetypes import responsetypes  # noqa: E402
+
+from config import HTTP_FIXTURES_CONFIG  # noqa: E402
+from http_fixtures import FixtureStore  # noqa: E402
+from items import PropertyItem  # noqa: E402
+from spiders.bienici_spider import BienIciSpider  # noqa: E402
+from spiders.gouv_spider import GouvSpider  # noqa: E402
+from spiders.seloger_spider import SeLogerSpider  # noqa: E402
+from zone_cache import ZoneIdCache  # noqa: E402
+
+SPIDERS = {
+    'bienici': BienIciSpider,
+    'seloger': SeLogerSpider,
+    'gouv': GouvSpider,
+}
+
+
+def offline_spider(spider_class):
+    """Spider sans MongoDB, file de travail ni checkpoint : seuls les parseurs sont mesurés"""
+    spider = spider_class.__new__(spider_class)
+    spider.pages_scraped = 0
+    spider._shutdown_requested = False
+    spider.work_queue = None
+    spider.checkpoint = None
+    spider.seen_index = None
+    spider.zone_cache = ZoneIdCache(os.path.join(tempfile.mkdtemp(), 'zones.json'))
+    return spider
+
+
+def load_responses(store: FixtureStore, spider_name: str):
+    """Reconstruit les réponses des pages d'annonces (callback ``parse``) d'un spider"""
+    responses = []
+    for fixture in store.fixtures(spider_name):
+        if fixture.get('callback') not in (None, 'parse'):
+            continue
+        body = store.read_body(fixture)
+        request = Request(fixture['url'], method=fixture['method'], meta=fixture.get('meta') or {},
+                          cb_kwargs=fixture.get('cb_kwargs') or {}, dont_filter=True)
+        response_class = responsetypes.from_args(headers=fixture['headers'], url=fixture['url'],
+                                                 body=body)
+        responses.append(response_class(url=fixture['url'], status=fixture['status'],
+                                        headers=fixture['headers'], body=body, request=request))
+    return responses
+
+
+def bench_pages(spider_class, store: FixtureStore, repeat: int):
+    """Pages d'annonces : temps passé dans ``parse`` (les requêtes produites ne sont pas suivies)"""
+    spider = offline_spider(spider_class)
+    responses = load_responses(store, spider_class.name)
+    items = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for response in responses:
+            for result in spider.parse(response, **response.request.cb_kwargs):
+                if isinstance(result, PropertyItem):
+                    items += 1
+    return len(responses) * repeat, items, time.perf_counter() - start
+
+
+def bench_dvf(spider_class, store: FixtureStore, repeat: int):
+    """Archives DVF : décompression et transformation avec le moteur configuré (DVF_ENGINE)"""
+    spider = offline_spider(spider_class)
+    fixtures = list(store.fixtures(spider_class.name))
+    items = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for fixture in fixtures:
+            with store.open_body(fixture) as raw:
+                items += sum(1 for _ in spider.process_stream(raw))
+    return len(fixtures) * repeat, items, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--store', default=HTTP_FIXTURES_CONFIG['path'],
+                        help="Répertoire des réponses enregistrées")
+    parser.add_argument('--spider', choices=sorted(SPIDERS), action='append',
+                        help="Spider à mesurer (répétable, tous par défaut)")
+    parser.add_argument('--repeat', type=int, default=3, help="Nombre de passes sur les réponses")
+    args = parser.parse_args()
+
+    store = FixtureStore(args.store)
+    for name in args.spider or sorted(SPIDERS):
+        spider_class = SPIDERS[name]
+        bench = bench_dvf if spider_class is GouvSpider else bench_pages
+        pages, items, elapsed = bench(spider_class, store, args.repeat)
+        if not pages:
+            print(f"{name:>8}: aucune réponse enregistrée dans {args.store}")
+            continue
+        unit = 'fichiers' if spider_class is GouvSpider else 'pages'
+        print(f"{name:>8}: {pages} {unit}, {items} propriétés en {elapsed:.2f}s - "
+              f"{pages / elapsed:,.1f} {unit}/s, {items / elapsed:,.0f} propriétés/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Mesure le temps de démarrage et la mémoire des spiders, avec et sans Spark
+
+Chaque mode est lancé dans un processus séparé qui importe le spider, le
+construit (connexion MongoDB comprise) puis, en mode ``spark``, force la
+création de la session Spark du sink. La mémoire rapportée est le RSS du
+processus et de ses descendants (la JVM de Spark est un processus fils).
+
+Usage :
+    MONGO_HOST=localhost python benchmarks/bench_startup.py [--spider bienici] [--runs 3]
+
+Le mode ``spark`` nécessite Java et le connecteur MongoDB Spark.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+SCRAPER_DIR = os.path.join(ROOT, 'scraper')
+
+SPIDERS = {
+    'bienici': ('spiders.bienici_spider', 'BienIciSpider'),
+    'seloger': ('spiders.seloger_spider', 'SeLogerSpider'),
+}
+
+# Exécuté dans le processus mesuré
+CHILD = """
+import json, os, sys, time
+start = time.perf_counter()
+import importlib
+module = importlib.import_module({module!r})
+spider = getattr(module, {cls!r})()
+if {spark!r}:
+    spider.spark.range(1).count()
+elapsed = time.perf_counter() - start
+
+def rss_kb(pid):
+    try:
+        with open(f"/proc/{{pid}}/status") as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+def descendants(pid):
+    children = []
+    for task in os.listdir(f"/proc/{{pid}}/task"):
+        try:
+            with open(f"/proc/{{pid}}/task/{{task}}/children") as f:
+                children += [int(child) for child in f.read().split()]
+        except OSError:
+            pass
+    return children + [d for child in children for d in descendants(child)]
+
+pids = [os.getpid()] + descendants(os.getpid())
+print(json.dumps({{'seconds': elapsed, 'rss_mb': sum(rss_kb(pid) for pid in pids) / 1024,
+                   'pyspark_loaded': 'pyspark' in sys.modules}}))
+if spider.spark_sink is not None:
+    spider.spark_sink.close()
+spider.mongo_client.close()
+"""
+
+
+def run(spider: str, spark: bool) -> dict:
+    module, cls = SPIDERS[spider]
+    env = dict(os.environ, SPARK_SINK_ENABLED='true' if spark else 'false')
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD.format(module=module, cls=cls, spark=spark)],
+        cwd=SCRAPER_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        mode = 'spark' if spark else 'python'
+        sys.exit(f"Échec du démarrage ({mode}) :\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--spider', choices=sorted(SPIDERS), default='bienici')
+    parser.add_argument('--runs', type=int, default=3, help="Nombre de démarrages par mode")
+    parser.add_argument('--modes', default='python,spark', help="Modes mesurés (python, spark)")
+    args = parser.parse_args()
+
+    for mode in args.modes.split(','):
+        results = [run(args.spider, spark=(mode == 'spark')) for _ in range(args.runs)]
+        seconds = sorted(result['seconds'] for result in results)[len(results) // 2]
+        rss = max(result['rss_mb'] for result in results)
+        print(f"{mode:>7}: démarrage {seconds:.2f}s (médiane), RSS {rss:.0f} Mo, "
+              f"pyspark chargé : {results[0]['pyspark_loaded']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+import threading
+from typing import Dict, Optional
+
+# Motif d'envoi d'un lot : nombre de documents visé, taille visée en octets, ou flush explicite
+# (checkpoint, fin de lot de jobs, fin de run) qui écrit un tampon incomplet
+COUNT_CAP = 'count'
+BYTE_CAP = 'bytes'
+FINAL_FLUSH = 'final'
+
+
+class AdaptiveBatchPolicy:
+    """Taille des lots d'écriture MongoDB ajustée selon le volume et la latence observée
+
+    Un lot part dès qu'il atteint le nombre de documents visé ou le plafond en
+    octets : quelques grosses annonces Bien'ici suffisent à remplir un lot, là
+    où il faut des milliers de mutations DVF. Après chaque ``bulk_write``, la
+    limite qui a déclenché le lot (documents ou octets) est agrandie si
+    l'écriture a été rapide et réduite proportionnellement si elle a dépassé
+    la latence cible, dans les bornes ``[min_docs, max_docs]`` et
+    ``[min_bytes, max_bytes]``. Les tampons incomplets écrits par un flush
+    (``FINAL_FLUSH``) ne sont pas pris en compte.
+    """
+
+    # Facteur de croissance quand les écritures sont nettement sous la latence cible
+    GROWTH = 1.25
+
+    def __init__(self, min_docs: int = 100, max_docs: int = 5000, initial_docs: int = 1000,
+                 max_bytes: int = 8 * 1024 * 1024, target_latency: float = 0.5,
+                 min_bytes: int = 64 * 1024):
+        self.min_docs = min_docs
+        self.max_docs = max(min_docs, max_docs)
+        self.min_bytes = min(min_bytes, max_bytes)
+        self.max_bytes = max_bytes
+        self.target_latency = target_latency
+        self.batch_docs = min(max(initial_docs, self.min_docs), self.max_docs)
+        self.batch_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        # Statistiques exportées en fin de run
+        self._batches = 0
+        self._docs_total = 0
+        self._bytes_total = 0
+        self._min_batch = None
+        self._max_batch = 0
+        self._latency_total = 0.0
+        self._observed = 0
+
+    def flush_reason(self, doc_count: int, byte_count: int) -> Optional[str]:
+        """Limite atteinte par le tampon courant (``COUNT_CAP``, ``BYTE_CAP``) ou None"""
+        if doc_count >= self.batch_docs:
+            return COUNT_CAP
+        if byte_count >= self.batch_bytes:
+            return BYTE_CAP
+        return None
+
+    def should_flush(self, doc_count: int, byte_count: int) -> bool:
+        """Indique si le tampon courant doit être écrit"""
+        return self.flush_reason(doc_count, byte_count) is not None
+
+    def record_flush(self, doc_count: int, byte_count: int) -> None:
+        """Enregistre la taille d'un lot au moment où il part en écriture"""
+        with self._lock:
+            self._batches += 1
+            self._docs_total += doc_count
+            self._bytes_total += byte_count
+            self._min_batch = (doc_count if self._min_batch is None
+                               else min(self._min_batch, doc_count))
+            self._max_batch = max(self._max_batch, doc_count)
+
+    def observe(self, doc_count: int, latency: float, byte_count: int = 0,
+                reason: str = COUNT_CAP) -> None:
+        """Ajuste la limite qui a déclenché un lot d'après la latence de son ``bulk_write``
+
+        Args:
+            doc_count (int): Nombre de documents du lot
+            latency (float): Durée du ``bulk_write`` en secondes
+            byte_count (int): Taille BSON du lot
+            reason (str): Motif d'envoi du lot (voir ``flush_reason``)
+        """
+        with self._lock:
+            self._observed += 1
+            self._latency_total += latency
+            # Les tampons incomplets (flush) ne disent rien de la capacité du serveur
+            if reason == FINAL_FLUSH:
+                return
+            if reason == BYTE_CAP:
+                if latency > self.target_latency and byte_count:
+                    target = byte_count * self.target_latency / latency
+                    self.batch_bytes = max(self.min_bytes, int(min(target, self.batch_bytes)))
+                elif latency < self.target_latency / 2:
+                    self.batch_bytes = min(self.max_bytes, int(self.batch_bytes * self.GROWTH) + 1)
+            elif latency > self.target_latency:
+                target = doc_count * self.target_latency / latency
+                self.batch_docs = max(self.min_docs, int(min(target, self.batch_docs)))
+            elif latency < self.target_latency / 2:
+                self.batch_docs = min(self.max_docs, int(self.batch_docs * self.GROWTH) + 1)
+
+    def stats(self) -> Dict:
+        """Statistiques des lots choisis pendant le run"""
+        with self._lock:
+            return {
+                'batches': self._batches,
+                'batch_size_min': self._min_batch or 0,
+                'batch_size_max': self._max_batch,
+                'batch_size_avg': self._docs_total / max(1, self._batches),
+                'batch_bytes_avg': self._bytes_total / max(1, self._batches),
+                'batch_latency_avg': self._latency_total / max(1, self._observed),
+                'batch_size_final': self.batch_docs,
+                'batch_bytes_final': self.batch_bytes,
+            }
@@ -1,9 +1,20 @@
 import os
+import yaml
 from dotenv import load_dotenv
 
 # Chargement des variables d'environnement
 load_dotenv()
 
+# Configuration globale du projet (config/global_config.yaml), absente dans certains conteneurs
+GLOBAL_CONFIG_PATH = os.getenv(
+    'GLOBAL_CONFIG_PATH',
+    os.path.join(os.path.dirname(__file__), '..', 'config', 'global_config.yaml')
+)
+GLOBAL_CONFIG = {}
+if os.path.exists(GLOBAL_CONFIG_PATH):
+    with open(GLOBAL_CONFIG_PATH, 'r', encoding='utf-8') as f:
+        GLOBAL_CONFIG = yaml.safe_load(f) or {}
+
 # Configuration MongoDB
 MONGO_CONFIG = {
     'host': os.getenv('MONGO_HOST', 'localhost'),
@@ -20,3 +31,164 @@ SCRAPING_CONFIG = {
     'download_delay': int(os.getenv('DOWNLOAD_DELAY', 2)),
     'concurrent_requests': int(os.getenv('CONCURRENT_REQUESTS', 1))
 }
+
+
+# Cadence adaptative par hôte : concurrence et délai ajustés selon la latence et les erreurs
+RATE_CONTROL_CONFIG = {
+    'enabled': os.getenv('ADAPTIVE_RATE_ENABLED', 'true').lower() in ('1', 'true'),
+    'hosts': {
+        'bienici.com': {'initial_concurrency': 2, 'max_concurrency': 8, 'initial_delay': 0.5,
+                        'target_latency': 2.0},
+        'res.bienici.com': {'initial_concurrency': 2, 'max_concurrency': 4, 'initial_delay': 0.25,
+                            'target_latency': 1.0},
+        'seloger.com': {'initial_concurrency': 1, 'max_concurrency': 3, 'initial_delay': 2.0,
+                        'min_delay': 0.5, 'backoff_delay': 5.0, 'target_latency': 3.0},
+        'files.data.gouv.fr': {'initial_concurrency': 1, 'max_concurrency': 4, 'initial_delay': 1.0,
+                               'target_latency': 10.0, 'window': 5},
+        **GLOBAL_CONFIG.get('rate_control', {}).get('hosts', {}),
+    },
+    'window': int(os.getenv('RATE_WINDOW', 20)),
+    'max_error_rate': float(os.getenv('RATE_MAX_ERROR_RATE', 0.1)),
+}
+
+
+# Checkpoints de progression (départements terminés, pages traitées) pour reprendre un crawl
+# interrompu
+CHECKPOINT_CONFIG = {
+    'enabled': os.getenv('CHECKPOINT_ENABLED', 'true').lower() in ('1', 'true'),
+    'path': os.getenv('CHECKPOINT_PATH') or os.path.join(
+        GLOBAL_CONFIG.get('paths', {}).get('raw_data', 'data/raw'), 'checkpoints'
+    ),
+    'interval': float(os.getenv('CHECKPOINT_INTERVAL', 30)),
+}
+
+# Crawl incrémental : pages triées par date, arrêt d'un département après N pages sans nouveauté
+INCREMENTAL_CONFIG = {
+    'enabled': os.getenv('INCREMENTAL_CRAWL', 'false').lower() in ('1', 'true'),
+    # Index local des annonces vues (URL -> prix), amorcé depuis MongoDB au premier run
+    'path': os.getenv('SEEN_INDEX_PATH') or os.path.join(
+        GLOBAL_CONFIG.get('paths', {}).get('raw_data', 'data/raw'), 'cache', 'seen_index.sqlite'
+    ),
+    # Pages consécutives sans annonce nouvelle ou modifiée avant d'arrêter la pagination
+    'stop_after_pages': int(os.getenv('INCREMENTAL_STOP_AFTER_PAGES', 2)),
+}
+
+# Dédoublonnage en mémoire des annonces vues plusieurs fois pendant un run (pages, départements
+# voisins)
+RUN_DEDUP_CONFIG = {
+    'enabled': os.getenv('RUN_DEDUP', 'true').lower() in ('1', 'true'),
+    # Annonces prévues par run et taux maximal de faux positifs du filtre de Bloom
+    'capacity': int(os.getenv('RUN_DEDUP_CAPACITY', 1_000_000)),
+    'error_rate': float(os.getenv('RUN_DEDUP_ERROR_RATE', 1e-4)),
+}
+
+# Archive des annonces brutes (compressées), hors de la collection real_estate
+PAYLOAD_ARCHIVE_CONFIG = {
+    'enabled': os.getenv('PAYLOAD_ARCHIVE_ENABLED', 'true').lower() in ('1', 'true'),
+    'collection': os.getenv('PAYLOAD_ARCHIVE_COLLECTION', 'listing_payloads'),
+    'level': int(os.getenv('PAYLOAD_ARCHIVE_LEVEL', 6)),
+}
+
+# Enregistrement / rejeu des réponses HTTP (benchmarks et tests hors ligne)
+HTTP_FIXTURES_CONFIG = {
+    # 'off', 'record' (les réponses sont enregistrées) ou 'replay' (servies sans réseau)
+    'mode': os.getenv('HTTP_FIXTURES_MODE', 'off').lower(),
+    'path': os.getenv('HTTP_FIXTURES_PATH') or os.path.join(
+        GLOBAL_CONFIG.get('paths', {}).get('raw_data', 'data/raw'), 'fixtures'
+    ),
+}
+
+# File de travail partagée : les réplicas d'un spider se répartissent les départements
+WORK_QUEUE_CONFIG = {
+    'enabled': os.getenv('WORK_QUEUE_ENABLED', 'false').lower() in ('1', 'true'),
+    # 'mongo' (partagée entre conteneurs) ou 'sqlite' (équivalent local)
+    'backend': os.getenv('WORK_QUEUE_BACKEND', 'mongo'),
+    'path': os.getenv('WORK_QUEUE_PATH') or os.path.join(
+        GLOBAL_CONFIG.get('paths', {}).get('raw_data', 'data/raw'), 'cache', 'work_queue.sqlite'
+    ),
+    # Identifiant du lancement partagé par les réplicas (obligatoire avec la file, fourni
+    # par `make`)
+    'run_id': os.getenv('WORK_QUEUE_RUN_ID', ''),
+    'lease_seconds': int(os.getenv('WORK_QUEUE_LEASE_SECONDS', 600)),
+    'max_attempts': int(os.getenv('WORK_QUEUE_MAX_ATTEMPTS', 3)),
+    # Départements réservés à la fois par un réplica
+    'batch_size': int(os.getenv('WORK_QUEUE_BATCH_SIZE', 4)),
+}
+
+
+# Cache des identifiants de zone Bien'ici (partagé entre runs et spiders)
+ZONE_CACHE_CONFIG = {
+    'path': os.getenv('ZONE_CACHE_PATH') or os.path.join(
+        GLOBAL_CONFIG.get('paths', {}).get('raw_data', 'data/raw'), 'cache', 'bienici_zones.json'
+    ),
+    'ttl_days': int(os.getenv('ZONE_CACHE_TTL_DAYS', 30))
+}
+
+# Écritures MongoDB en arrière-plan
+WRITER_CONFIG = {
+    'threads': int(os.getenv('WRITER_THREADS', 1)),
+    'max_pending_batches': int(os.getenv('WRITER_MAX_PENDING_BATCHES', 4))
+}
+
+# Taille adaptative des lots d'écriture MongoDB (bornes en documents, plafond en octets BSON)
+BATCH_CONFIG = {
+    'min_docs': int(os.getenv('BATCH_MIN_DOCS', 100)),
+    'max_docs': int(os.getenv('BATCH_MAX_DOCS', 5000)),
+    'initial_docs': int(os.getenv('BATCH_INITIAL_DOCS', 1000)),
+    'max_bytes': int(os.getenv('BATCH_MAX_BYTES', 8 * 1024 * 1024)),
+    # Plancher de la taille en octets visée, réduite quand les lots plafonnés en octets sont lents
+    'min_bytes': int(os.getenv('BATCH_MIN_BYTES', 64 * 1024)),
+    'target_latency': float(os.getenv('BATCH_TARGET_LATENCY', 0.5))
+}
+
+# Empreintes de contenu : les annonces inchangées ne reçoivent qu'une mise à jour de last_seen_at
+FINGERPRINT_CONFIG = {
+    'enabled': os.getenv('SKIP_UNCHANGED', 'true').lower() in ('1', 'true'),
+    'cache_size': int(os.getenv('FINGERPRINT_CACHE_SIZE', 500_000))
+}
+
+# Sink Spark optionnel : sans lui, les scrapers tournent en pur Python (pas de JVM)
+SPARK_SINK_CONFIG = {
+    'enabled': os.getenv('SPARK_SINK_ENABLED', 'false').lower() in ('1', 'true'),
+    'master': os.getenv('SPARK_MASTER', 'local[*]'),
+    'driver_memory': os.getenv('SPARK_DRIVER_MEMORY', '2g'),
+    'packages': os.getenv('SPARK_JARS_PACKAGES',
+                          'org.mongodb.spark:mongo-spark-connector_2.12:10.2.1'),
+    'collection': os.getenv('SPARK_SINK_COLLECTION', 'real_estate_spark'),
+    'rows_per_flush': int(os.getenv('SPARK_SINK_ROWS_PER_FLUSH', 50_000))
+}
+
+# Zone d'atterrissage Parquet (optionnelle), partitionnée par source, année et département
+LANDING_ZONE_CONFIG = {
+    'enabled': os.getenv(
+        'LANDING_ZONE_ENABLED',
+        str(GLOBAL_CONFIG.get('landing_zone', {}).get('enabled', False))
+    ).lower() in ('1', 'true'),
+    'path': os.getenv(
+        'LANDING_ZONE_PATH',
+        os.path.join(GLOBAL_CONFIG.get('paths', {}).get('raw_data', 'data/raw'), 'landing_zone')
+    ),
+    'compression': GLOBAL_CONFIG.get('landing_zone', {}).get('compression', 'zstd'),
+}
+
+# Runner commun des spiders (run_spiders.py) : un reactor partagé ou un pool de processus
+RUNNER_CONFIG = {
+    'spiders': [name.strip()
+                for name in os.getenv('RUNNER_SPIDERS', 'seloger,bienici,gouv').split(',')
+                if name.strip()],
+    # 'reactor' : spiders dans un même reactor (sauf ceux marqués SHARED_REACTOR = False) ;
+    # 'processes' : un processus par spider
+    'mode': os.getenv('RUNNER_MODE', 'reactor'),
+    'processes': int(os.getenv('RUNNER_PROCESSES', 0)),
+    # Budget global de requêtes simultanées, réparti entre les spiders lancés ensemble
+    # (0 = pas de limite)
+    'max_concurrency': int(os.getenv('RUNNER_MAX_CONCURRENCY', 32)),
+    # Budgets par spider, par exemple "bienici=8,seloger=2"
+    'spider_concurrency': {
+        name.strip(): int(value)
+        for name, value in (item.split('=', 1)
+                            for item in os.getenv('RUNNER_SPIDER_CONCURRENCY', '').split(',')
+                            if '=' in item)
+    },
+    'report_collection': os.getenv('RUNNER_REPORT_COLLECTION', 'run_reports'),
+}
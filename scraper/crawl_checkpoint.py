@@ -0,0 +1,131 @@
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Set
+
+from utils import read_json, write_json_atomic
+
+
+def compress_pages(pages: Iterable[int]) -> str:
+    """Écrit un ensemble de pages sous forme de plages (``{1, 2, 3, 5}`` -> ``"1-3,5"``)"""
+    ranges = []
+    for page in sorted(set(pages)):
+        if ranges and page == ranges[-1][1] + 1:
+            ranges[-1][1] = page
+        else:
+            ranges.append([page, page])
+    return ','.join(str(start) if start == end else f"{start}-{end}" for start, end in ranges)
+
+
+def expand_pages(ranges: str) -> Set[int]:
+    """Inverse de ``compress_pages``"""
+    pages = set()
+    for part in filter(None, (ranges or '').split(',')):
+        start, _, end = part.partition('-')
+        pages.update(range(int(start), int(end or start) + 1))
+    return pages
+
+
+class CrawlCheckpoint:
+    """Progression d'un crawl par département et par page, pour reprendre après un arrêt
+
+    Le fichier JSON (un par spider) liste les départements terminés et, pour
+    les départements en cours, les pages déjà traitées sous forme de plages,
+    le nombre de pages attendu et les paramètres nécessaires pour redemander
+    les pages manquantes. Il est réécrit de façon atomique, au plus toutes les
+    ``interval`` secondes, une fois les propriétés en attente écrites.
+    """
+
+    def __init__(self, path: str, interval: float = 30.0):
+        """
+        Args:
+            path (str): Fichier JSON du checkpoint
+            interval (float): Délai minimum entre deux écritures périodiques (secondes)
+        """
+        self.path = path
+        self.interval = interval
+        state = read_json(path)
+        self.departments_done: Set[str] = set(state.get('departments_done', []))
+        self.departments: Dict[str, Dict] = {}
+        for department, entry in state.get('departments', {}).items():
+            self.departments[department] = {**entry, 'pages': expand_pages(entry.get('pages'))}
+        self.resumed = bool(state)
+        self._dirty = False
+        self._last_save = time.monotonic()
+        if self.resumed:
+            logging.info(f"Reprise du crawl depuis {path}: "
+                         f"{len(self.departments_done)} départements terminés, "
+                         f"{len(self.departments)} en cours")
+
+    def is_done(self, department: str) -> bool:
+        return department in self.departments_done
+
+    def progress(self, department: str) -> Optional[Dict]:
+        """Avancement d'un département en cours (pages traitées, pages attendues, paramètres)"""
+        return self.departments.get(department)
+
+    def missing_pages(self, department: str) -> Optional[Set[int]]:
+        """Pages restant à traiter
+
+        None si le nombre de pages du département n'est pas encore connu.
+        """
+        entry = self.departments.get(department)
+        if not entry or not entry.get('max_pages'):
+            return None
+        return set(range(1, entry['max_pages'] + 1)) - entry['pages']
+
+    def start_department(self, department: str, max_pages: int, **params) -> None:
+        """Enregistre le nombre de pages d'un département et les paramètres de ses requêtes"""
+        entry = self.departments.setdefault(department, {'pages': set()})
+        entry.update(params, max_pages=max(1, max_pages))
+        self._dirty = True
+
+    def page_done(self, department: str, page: int) -> None:
+        """Marque une page comme traitée
+
+        Le département est terminé quand toutes ses pages le sont.
+        """
+        entry = self.departments.setdefault(department, {'pages': set()})
+        entry['pages'].add(page)
+        self._dirty = True
+        if self.missing_pages(department) == set():
+            self.department_done(department)
+
+    def department_done(self, department: str) -> None:
+        self.departments.pop(department, None)
+        self.departments_done.add(department)
+        self._dirty = True
+
+    def due(self) -> bool:
+        """Indique si une écriture périodique est nécessaire"""
+        return self._dirty and time.monotonic() - self._last_save >= self.interval
+
+    def save(self) -> None:
+        """Écrit le checkpoint (à appeler une fois les propriétés en attente écrites)"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        write_json_atomic(self.path, {
+            'updated_at': datetime.now().isoformat(),
+            'departments_done': sorted(self.departments_done),
+            'departments': {
+                department: {**entry, 'pages': compress_pages(entry['pages'])}
+                for department, entry in sorted(self.departments.items())
+            },
+        })
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+    def flush(self) -> None:
+        """Écrit le checkpoint s'il a changé depuis la dernière écriture"""
+        if self._dirty:
+            self.save()
+
+    def clear(self) -> None:
+        """Crawl terminé : le prochain run repart de zéro"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.departments_done.clear()
+        self.departments.clear()
+        self._dirty = False
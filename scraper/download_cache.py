@@ -0,0 +1,183 @@
+import gzip
+import hashlib
+import logging
+import os
+from datetime import datetime
+from typing import Dict, NamedTuple, Optional
+from urllib.parse import urlparse
+
+import requests
+
+from rate_control import throttled_get
+from utils import read_json, write_json_atomic
+
+# Taille des blocs lus sur le disque
+CHUNK_SIZE = 1024 * 1024
+# Taille des blocs lus sur le réseau (au plus un bloc perdu en cas de coupure)
+NETWORK_CHUNK_SIZE = 64 * 1024
+
+
+class CachedFile(NamedTuple):
+    """Fichier disponible dans le cache local"""
+    path: str
+    # True si le contenu n'a pas encore été traité avec succès (cf. mark_processed)
+    changed: bool
+
+
+class DownloadCache:
+    """Cache disque des fichiers téléchargés (archives DVF)
+
+    - requêtes conditionnelles (If-None-Match / If-Modified-Since) : un fichier
+      inchangé côté serveur n'est pas retéléchargé ;
+    - reprise des téléchargements interrompus avec Range / If-Range ;
+    - contrôle d'intégrité (taille annoncée, CRC gzip, empreinte SHA-256).
+
+    Chaque fichier est rangé sous ``cache_dir/<hôte>/<chemin de l'URL>`` avec
+    un fichier ``.meta.json`` décrivant la version en cache.
+    """
+
+    def __init__(self, cache_dir: str, session: Optional[requests.Session] = None,
+                 timeout: int = 60, rate_controller=None):
+        self.cache_dir = cache_dir
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        # Cadence de l'hôte (HostRateController) : attente et backoff sur 429/403
+        self.rate_controller = rate_controller
+
+    def _local_path(self, url: str) -> str:
+        parsed = urlparse(url)
+        return os.path.join(self.cache_dir, parsed.netloc, *parsed.path.strip('/').split('/'))
+
+    @staticmethod
+    def _sha256(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _check_gzip(path: str) -> None:
+        """Décompresse le fichier jusqu'au bout pour valider le CRC gzip"""
+        with gzip.open(path, 'rb') as f:
+            while f.read(CHUNK_SIZE):
+                pass
+
+    @staticmethod
+    def _discard_part(part_path: str) -> None:
+        for stale_path in (part_path, f"{part_path}.json"):
+            if os.path.exists(stale_path):
+                os.remove(stale_path)
+
+    def _is_valid(self, path: str, meta: Dict) -> bool:
+        """Vérifie que le fichier en cache correspond à ses métadonnées"""
+        if not meta or not os.path.exists(path):
+            return False
+        if os.path.getsize(path) != meta.get('size'):
+            return False
+        return self._sha256(path) == meta.get('sha256')
+
+    def fetch(self, url: str) -> CachedFile:
+        """Met à jour le cache pour une URL et retourne le fichier local
+
+        Args:
+            url (str): URL du fichier à télécharger
+
+        Returns:
+            CachedFile: Chemin du fichier local et indicateur de changement
+        """
+        path = self._local_path(url)
+        meta_path = f"{path}.meta.json"
+        part_path = f"{path}.part"
+        part_meta_path = f"{part_path}.json"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        meta = read_json(meta_path)
+        if meta and not self._is_valid(path, meta):
+            logging.warning(f"Fichier en cache corrompu, nouveau téléchargement: {path}")
+            meta = {}
+
+        headers = {}
+        offset = 0
+        part_meta = read_json(part_meta_path)
+        validator = part_meta.get('etag') or part_meta.get('last_modified')
+        if os.path.exists(part_path) and validator:
+            # Reprise d'un téléchargement interrompu, seulement si la version distante est la même
+            offset = os.path.getsize(part_path)
+            headers['Range'] = f"bytes={offset}-"
+            headers['If-Range'] = validator
+        elif meta:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        with throttled_get(self.session, url, self.rate_controller,
+                           headers=headers, stream=True, timeout=self.timeout) as response:
+            if response.status_code == 304 and meta:
+                logging.info(f"Fichier inchangé sur le serveur, utilisation du cache: {path}")
+                return CachedFile(path, meta.get('sha256') != meta.get('processed_sha256'))
+            if response.status_code == 416:
+                # Fragment partiel inutilisable : il sera retéléchargé au prochain essai
+                self._discard_part(part_path)
+            response.raise_for_status()
+
+            if response.status_code == 206:
+                content_range = response.headers.get('Content-Range', '')
+                if not content_range.startswith(f"bytes {offset}-"):
+                    raise IOError(f"Content-Range inattendu pour {url}: {content_range}")
+                expected_size = int(content_range.rsplit('/', 1)[1])
+                mode = 'ab'
+                logging.info(f"Reprise du téléchargement de {url} à l'octet {offset}")
+            else:
+                content_length = response.headers.get('Content-Length')
+                expected_size = int(content_length) if content_length else None
+                mode = 'wb'
+
+            write_json_atomic(part_meta_path, {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+            })
+            with open(part_path, mode) as f:
+                for chunk in response.iter_content(chunk_size=NETWORK_CHUNK_SIZE):
+                    f.write(chunk)
+
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+
+        # Contrôle d'intégrité avant de remplacer la version en cache
+        size = os.path.getsize(part_path)
+        if expected_size is not None and size != expected_size:
+            raise IOError(f"Téléchargement incomplet pour {url}: {size}/{expected_size} octets")
+        if path.endswith('.gz'):
+            try:
+                self._check_gzip(part_path)
+            except (OSError, EOFError) as e:
+                self._discard_part(part_path)
+                raise IOError(f"Archive corrompue pour {url}: {str(e)}")
+
+        sha256 = self._sha256(part_path)
+        os.replace(part_path, path)
+        os.remove(part_meta_path)
+        new_meta = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'size': size,
+            'sha256': sha256,
+            'downloaded_at': datetime.now().isoformat(),
+        }
+        if meta.get('sha256') == sha256:
+            # Contenu identique malgré de nouveaux en-têtes : il reste traité
+            new_meta['processed_sha256'] = meta.get('processed_sha256')
+        write_json_atomic(meta_path, new_meta)
+        logging.info(f"Fichier téléchargé dans le cache: {path} ({size} octets)")
+        return CachedFile(path, new_meta.get('processed_sha256') != sha256)
+
+    def mark_processed(self, url: str) -> None:
+        """Marque la version en cache comme traitée avec succès"""
+        meta_path = f"{self._local_path(url)}.meta.json"
+        meta = read_json(meta_path)
+        if meta:
+            meta['processed_sha256'] = meta.get('sha256')
+            write_json_atomic(meta_path, meta)
@@ -0,0 +1,170 @@
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterator, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+# Colonnes DVF réellement utilisées par la transformation
+DVF_USECOLS = [
+    'id_mutation', 'date_mutation', 'numero_disposition', 'nature_mutation', 'valeur_fonciere',
+    'adresse_numero', 'adresse_suffixe', 'adresse_nom_voie', 'code_postal', 'nom_commune',
+    'code_departement', 'type_local', 'surface_reelle_bati', 'nombre_pieces_principales',
+] + [f'lot{i}_surface_carrez' for i in range(1, 6)]
+
+PROPERTY_TYPES = {'Maison': 'maison', 'Appartement': 'appartement'}
+
+# Taille par défaut des blocs lus dans le CSV
+CHUNK_SIZE = 50_000
+
+
+def bucket_key(department: str, date_mutation: str) -> str:
+    """Clé de regroupement d'une mutation : département et mois de la mutation"""
+    return f"{department}|{date_mutation[:7]}"
+
+
+def bucket_keys(chunk: pd.DataFrame) -> pd.Series:
+    """Version colonne de bucket_key pour un bloc de lignes DVF"""
+    return chunk['code_departement'] + '|' + chunk['date_mutation'].str.slice(0, 7)
+
+
+def _to_float(values: pd.Series) -> pd.Series:
+    """Convertit une colonne texte en float, NaN pour les valeurs vides ou invalides"""
+    try:
+        return values.replace('', 'nan').astype(float)
+    except (TypeError, ValueError):
+        return pd.to_numeric(values, errors='coerce')
+
+
+def _join_non_empty(left: pd.Series, right: pd.Series) -> pd.Series:
+    """Concatène deux colonnes texte avec un espace, en ignorant les valeurs vides"""
+    joined = (left + ' ' + right).where(right != '', left)
+    return joined.where(left != '', right)
+
+
+def transform_chunk(chunk: pd.DataFrame, source: str) -> List[Dict]:
+    """Transforme un bloc de lignes DVF en propriétés, par opérations sur colonnes
+
+    Produit les mêmes documents que ``GouvSpider.process_row`` (à la conversion
+    Decimal -> float près, faite de toute façon avant l'écriture MongoDB).
+
+    Args:
+        chunk (pd.DataFrame): Lignes DVF brutes, toutes les colonnes en texte
+        source (str): Nom du spider à l'origine des données
+
+    Returns:
+        List[Dict]: Propriétés prêtes à être sauvegardées
+    """
+    chunk = chunk[
+        (chunk['nature_mutation'] == 'Vente')
+        & (chunk['valeur_fonciere'] != '')
+        & chunk['type_local'].isin(list(PROPERTY_TYPES))
+    ]
+    if chunk.empty:
+        return []
+
+    # Une valeur non vide mais non numérique invalide la ligne (comme l'exception du traitement
+    # ligne à ligne)
+    invalid = np.zeros(len(chunk), dtype=bool)
+
+    # Surface Carrez totale sur les 5 lots, sinon surface réelle bâtie
+    surface_carrez = np.zeros(len(chunk))
+    for i in range(1, 6):
+        raw_lot = chunk[f'lot{i}_surface_carrez']
+        lot = _to_float(raw_lot).to_numpy()
+        invalid |= np.isnan(lot) & (raw_lot.str.strip() != '').to_numpy()
+        surface_carrez += np.nan_to_num(lot)
+    bati = _to_float(chunk['surface_reelle_bati']).to_numpy()
+    # La surface bâtie n'est lue qu'en l'absence de surface Carrez
+    bati_present = (chunk['surface_reelle_bati'] != '').to_numpy()
+    invalid |= (surface_carrez == 0) & np.isnan(bati) & bati_present
+    surface = np.where(surface_carrez != 0, surface_carrez, np.nan_to_num(bati))
+
+    price = _to_float(chunk['valeur_fonciere']).to_numpy()
+    invalid |= np.isnan(price)
+
+    raw_rooms = chunk['nombre_pieces_principales']
+    rooms = _to_float(raw_rooms).to_numpy()
+    has_rooms = (raw_rooms != '').to_numpy()
+    invalid |= has_rooms & ~raw_rooms.str.strip().str.fullmatch(r'[+-]?\d+').to_numpy(dtype=bool)
+
+    keep = ~invalid & (surface > 0) & (price > 0)
+    if not keep.any():
+        return []
+    chunk = chunk[keep]
+    surface = surface[keep]
+    price = price[keep]
+    rooms = rooms[keep]
+    has_rooms = has_rooms[keep]
+
+    # Adresse : numéro, suffixe et voie séparés par un espace en ignorant les parties vides
+    address = chunk['adresse_numero']
+    for part in (chunk['adresse_suffixe'], chunk['adresse_nom_voie']):
+        address = _join_non_empty(address, part)
+
+    # np.round n'est pas identique à round() sur les demi-centimes : on garde l'arrondi Python
+    price_per_m2 = [round(value, 2) for value in (price / surface).tolist()]
+    rooms = [int(value) if present else None
+             for value, present in zip(rooms.tolist(), has_rooms.tolist())]
+    listing_url = ('dvf_' + chunk['id_mutation'] + '_' + chunk['numero_disposition']).tolist()
+    description = ('Mutation du ' + chunk['date_mutation'] + ' - '
+                   + chunk['nature_mutation']).tolist()
+    property_type = chunk['type_local'].map(PROPERTY_TYPES).tolist()
+    now = datetime.now()
+
+    # Assemblage final à partir de listes natives (DataFrame.to_dict est bien plus lent)
+    return [
+        {
+            'listing_url': url,
+            'source': source,
+            'department': department,
+            'price': row_price,
+            'price_per_m2': row_price_per_m2,
+            'surface_m2': row_surface,
+            'rooms': row_rooms,
+            'bedrooms': None,
+            'address': row_address,
+            'city': city,
+            'postal_code': postal_code,
+            'property_type': row_type,
+            'features': [],
+            'description': row_description,
+            'date_mutation': date_mutation,
+            'first_seen_at': now,
+            'last_seen_at': now,
+        }
+        for url, department, row_price, row_price_per_m2, row_surface, row_rooms, row_address,
+        city, postal_code, row_type, row_description, date_mutation in zip(
+            listing_url, chunk['code_departement'].tolist(), price.tolist(), price_per_m2,
+            surface.tolist(), rooms, address.tolist(), chunk['nom_commune'].tolist(),
+            chunk['code_postal'].tolist(), property_type, description,
+            chunk['date_mutation'].tolist(),
+        )
+    ]
+
+
+def iter_dvf_records(raw: BinaryIO, source: str, chunk_size: int = CHUNK_SIZE,
+                     buckets: Optional[Set[str]] = None) -> Iterator[List[Dict]]:
+    """Lit un CSV DVF compressé par blocs et produit les propriétés de chaque bloc
+
+    Args:
+        raw (BinaryIO): Flux binaire compressé en gzip
+        source (str): Nom du spider à l'origine des données
+        chunk_size (int): Nombre de lignes CSV par bloc
+        buckets (Optional[Set[str]]): Départements-mois à conserver (tous si None)
+
+    Yields:
+        List[Dict]: Propriétés d'un bloc
+    """
+    reader = pd.read_csv(
+        raw,
+        compression='gzip',
+        usecols=DVF_USECOLS,
+        dtype=str,
+        keep_default_na=False,
+        chunksize=chunk_size,
+    )
+    with reader:
+        for chunk in reader:
+            if buckets is not None:
+                chunk = chunk[bucket_keys(chunk).isin(buckets)]
+            yield transform_chunk(chunk, source)
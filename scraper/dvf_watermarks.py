@@ -0,0 +1,72 @@
+from datetime import datetime
+from typing import BinaryIO, Dict, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+from dvf_transform import CHUNK_SIZE, bucket_keys
+
+
+def compute_watermark(raw: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Dict:
+    """Calcule le filigrane d'un fichier DVF en un passage
+
+    Chaque ligne est hachée sur l'ensemble de ses colonnes ; les empreintes
+    sont additionnées (modulo 2**64) par département et par mois, ce qui rend
+    la somme indépendante de l'ordre des lignes dans le fichier.
+
+    Args:
+        raw (BinaryIO): Flux binaire compressé en gzip
+        chunk_size (int): Nombre de lignes CSV par bloc
+
+    Returns:
+        Dict: ``checksums`` par département-mois et ``max_date_mutation``
+    """
+    sums: Dict[str, int] = {}
+    max_date: Optional[str] = None
+    reader = pd.read_csv(raw, compression='gzip', dtype=str, keep_default_na=False,
+                         chunksize=chunk_size)
+    with reader:
+        for chunk in reader:
+            if chunk.empty:
+                continue
+            hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+            codes, buckets = pd.factorize(bucket_keys(chunk))
+            totals = np.zeros(len(buckets), dtype=np.uint64)
+            np.add.at(totals, codes, hashes)
+            for bucket, total in zip(buckets, totals.tolist()):
+                sums[bucket] = (sums.get(bucket, 0) + total) % 2 ** 64
+
+            chunk_max = chunk['date_mutation'].max()
+            if chunk_max and (max_date is None or chunk_max > max_date):
+                max_date = chunk_max
+
+    return {
+        'checksums': {bucket: f"{total:016x}" for bucket, total in sums.items()},
+        'max_date_mutation': max_date,
+    }
+
+
+def changed_buckets(previous: Dict[str, str], current: Dict[str, str]) -> Set[str]:
+    """Retourne les départements-mois nouveaux ou modifiés depuis le filigrane précédent"""
+    return {bucket for bucket, checksum in current.items() if previous.get(bucket) != checksum}
+
+
+class WatermarkStore:
+    """Filigranes des fichiers DVF déjà importés, un document MongoDB par fichier source"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def load(self, source: str) -> Dict:
+        return self.collection.find_one({'_id': source}) or {}
+
+    def save(self, source: str, watermark: Dict) -> None:
+        self.collection.replace_one(
+            {'_id': source},
+            {
+                'checksums': watermark['checksums'],
+                'max_date_mutation': watermark['max_date_mutation'],
+                'updated_at': datetime.now(),
+            },
+            upsert=True,
+        )
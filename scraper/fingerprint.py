@@ -0,0 +1,72 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable
+
+import bson
+
+# Champs décrivant le contenu d'une annonce (hors horodatages et compteurs)
+CONTENT_FIELDS = [
+    'source', 'department', 'price', 'price_per_m2', 'surface_m2', 'rooms', 'bedrooms',
+    'address', 'city', 'postal_code', 'property_type', 'features', 'description',
+]
+
+
+def content_fingerprint(doc: Dict) -> str:
+    """Empreinte du contenu d'une annonce, stable d'un crawl à l'autre
+
+    Args:
+        doc (Dict): Propriété telle qu'écrite dans MongoDB (sans Decimal)
+
+    Returns:
+        str: Empreinte hexadécimale sur 128 bits
+    """
+    content = bson.encode({field: doc.get(field) for field in CONTENT_FIELDS})
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+class FingerprintIndex:
+    """Empreintes connues des annonces, servies depuis un cache local borné
+
+    Les empreintes absentes du cache sont lues en une seule requête ``$in``
+    projetée sur ``listing_url`` et ``content_hash`` pour tout un lot.
+    """
+
+    def __init__(self, collection, max_entries: int = 500_000):
+        self.collection = collection
+        self.max_entries = max_entries
+        self._cache: OrderedDict = OrderedDict()
+        # Cache alimenté par le parsing (lookup) et par le thread d'écriture (remember)
+        self._lock = threading.Lock()
+
+    def lookup(self, urls: Iterable[str]) -> Dict[str, str]:
+        """Retourne les empreintes stockées pour les URLs données (absentes si inconnues)"""
+        urls = list(dict.fromkeys(urls))
+        with self._lock:
+            missing = [url for url in urls if url not in self._cache]
+        if missing:
+            fetched = {url: None for url in missing}
+            cursor = self.collection.find(
+                {'listing_url': {'$in': missing}},
+                {'_id': 0, 'listing_url': 1, 'content_hash': 1}
+            )
+            for doc in cursor:
+                fetched[doc['listing_url']] = doc.get('content_hash')
+            for url, fingerprint in fetched.items():
+                self.remember(url, fingerprint)
+
+        found = {}
+        with self._lock:
+            for url in urls:
+                fingerprint = self._cache.get(url)
+                if fingerprint is not None:
+                    found[url] = fingerprint
+        return found
+
+    def remember(self, url: str, fingerprint) -> None:
+        """Enregistre l'empreinte écrite pour une annonce"""
+        with self._lock:
+            self._cache[url] = fingerprint
+            self._cache.move_to_end(url)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
@@ -0,0 +1,150 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterator, Optional
+from urllib.parse import urlparse
+
+from utils import read_json, write_json_atomic
+
+# Modes de HttpFixtureMiddleware : enregistrement des réponses ou rejeu sans réseau
+RECORD = 'record'
+REPLAY = 'replay'
+# En-têtes qui ne décrivent plus le corps enregistré (décompressé, longueur recalculée)
+DROPPED_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding')
+
+
+def json_safe(values: Dict) -> Dict:
+    """Garde les entrées sérialisables en JSON (cb_kwargs, meta de la requête)"""
+    safe = {}
+    for key, value in (values or {}).items():
+        try:
+            json.dumps(value)
+        except (TypeError, ValueError):
+            continue
+        safe[key] = value
+    return safe
+
+
+class FixtureStore:
+    """Réponses HTTP enregistrées pour rejouer les spiders hors ligne
+
+    Chaque réponse est rangée sous ``path/<hôte>/<clé>`` : un fichier
+    ``.json`` (URL, code, en-têtes, spider, callback et ses arguments) et le
+    corps compressé en gzip (``.body.gz``), ou tel quel s'il l'est déjà
+    (archives ``.gz`` de DVF). La clé est l'empreinte de la méthode, de l'URL
+    et du corps de la requête.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @staticmethod
+    def key(url: str, method: str = 'GET', body: bytes = b'') -> str:
+        digest = hashlib.sha1(f"{method.upper()} {url}".encode())
+        digest.update(body or b'')
+        return digest.hexdigest()
+
+    def _base_path(self, url: str, method: str = 'GET', body: bytes = b'') -> str:
+        return os.path.join(self.path, urlparse(url).netloc or 'local', self.key(url, method, body))
+
+    def _write_meta(self, base_path: str, fixture: Dict) -> None:
+        write_json_atomic(f"{base_path}.json",
+                          {**fixture, 'recorded_at': datetime.now().isoformat()})
+
+    def save(self, url: str, body: bytes, status: int = 200, headers: Optional[Dict] = None,
+             method: str = 'GET', request_body: bytes = b'', **context) -> str:
+        """Enregistre une réponse
+
+        Args:
+            url (str): URL de la requête
+            body (bytes): Corps de la réponse, déjà décompressé
+            status (int): Code HTTP
+            headers (Optional[Dict]): En-têtes de la réponse
+            method (str): Méthode de la requête
+            request_body (bytes): Corps de la requête (POST)
+            **context: Spider, callback, cb_kwargs et meta nécessaires au rejeu
+
+        Returns:
+            str: Clé de la réponse enregistrée
+        """
+        base_path = self._base_path(url, method, request_body)
+        os.makedirs(os.path.dirname(base_path), exist_ok=True)
+        compressed = not url.endswith('.gz')
+        body_path = f"{base_path}.body.gz" if compressed else f"{base_path}.body"
+        tmp_path = f"{body_path}.tmp"
+        with (gzip.open(tmp_path, 'wb', compresslevel=6) if compressed
+              else open(tmp_path, 'wb')) as f:
+            f.write(body)
+        os.replace(tmp_path, body_path)
+        self._write_meta(base_path, {
+            'url': url,
+            'method': method.upper(),
+            'status': status,
+            'headers': {name: value for name, value in (headers or {}).items()
+                        if name.lower() not in DROPPED_HEADERS},
+            'body_path': os.path.basename(body_path),
+            'size': len(body),
+            **context,
+        })
+        return self.key(url, method, request_body)
+
+    def save_file(self, url: str, source_path: str, **context) -> str:
+        """Enregistre un fichier téléchargé (archive DVF) sans le charger en mémoire"""
+        base_path = self._base_path(url)
+        os.makedirs(os.path.dirname(base_path), exist_ok=True)
+        body_path = f"{base_path}.body"
+        shutil.copyfile(source_path, f"{body_path}.tmp")
+        os.replace(f"{body_path}.tmp", body_path)
+        self._write_meta(base_path, {
+            'url': url, 'method': 'GET', 'status': 200, 'headers': {},
+            'body_path': os.path.basename(body_path), 'size': os.path.getsize(body_path), **context,
+        })
+        return self.key(url)
+
+    def get(self, url: str, method: str = 'GET', request_body: bytes = b'') -> Optional[Dict]:
+        """Métadonnées de la réponse enregistrée pour une requête, None si absente"""
+        base_path = self._base_path(url, method, request_body)
+        fixture = read_json(f"{base_path}.json")
+        if not fixture:
+            return None
+        fixture['body_path'] = os.path.join(os.path.dirname(base_path), fixture['body_path'])
+        return fixture
+
+    def open_body(self, fixture: Dict) -> BinaryIO:
+        """Ouvre le corps enregistré (décompressé à la lecture s'il a été compressé à l'écriture)"""
+        if fixture['body_path'].endswith('.body.gz'):
+            return gzip.open(fixture['body_path'], 'rb')
+        return open(fixture['body_path'], 'rb')
+
+    def read_body(self, fixture: Dict) -> bytes:
+        with self.open_body(fixture) as f:
+            return f.read()
+
+    def fixtures(self, spider: Optional[str] = None) -> Iterator[Dict]:
+        """Parcourt les réponses enregistrées dans l'ordre d'enregistrement
+
+        Args:
+            spider (Optional[str]): Seulement les réponses de ce spider (toutes si None)
+        """
+        found = []
+        if not os.path.isdir(self.path):
+            return iter(found)
+        for host in sorted(os.listdir(self.path)):
+            host_dir = os.path.join(self.path, host)
+            if not os.path.isdir(host_dir):
+                continue
+            for name in os.listdir(host_dir):
+                if not name.endswith('.json'):
+                    continue
+                fixture = read_json(os.path.join(host_dir, name))
+                if not fixture or (spider is not None and fixture.get('spider') != spider):
+                    continue
+                fixture['body_path'] = os.path.join(host_dir, fixture['body_path'])
+                found.append(fixture)
+        found.sort(key=lambda fixture: fixture.get('recorded_at', ''))
+        logging.debug(f"{len(found)} réponses enregistrées dans {self.path}")
+        return iter(found)
@@ -0,0 +1,29 @@
+import scrapy
+
+
+class PropertyItem(scrapy.Item):
+    """Annonce ou mutation immobilière produite par les spiders"""
+
+    listing_url = scrapy.Field()
+    source = scrapy.Field()
+    department = scrapy.Field()
+    price = scrapy.Field()
+    price_per_m2 = scrapy.Field()
+    surface_m2 = scrapy.Field()
+    rooms = scrapy.Field()
+    bedrooms = scrapy.Field()
+    address = scrapy.Field()
+    city = scrapy.Field()
+    postal_code = scrapy.Field()
+    property_type = scrapy.Field()
+    features = scrapy.Field()
+    description = scrapy.Field()
+    # Annonce brute (Bien'ici), archivée à part par PayloadArchive et jamais écrite dans real_estate
+    raw_payload = scrapy.Field()
+    # Date de la mutation (DVF uniquement)
+    date_mutation = scrapy.Field()
+    first_seen_at = scrapy.Field()
+    last_seen_at = scrapy.Field()
+    last_updated_at = scrapy.Field()
+    update_count = scrapy.Field()
+    is_active = scrapy.Field()
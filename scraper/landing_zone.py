@@ -0,0 +1,119 @@
+import json
+import logging
+import os
+import uuid
+from datetime import datetime
+from typing import Dict, List
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+# Schéma fixe des fichiers : évite les types inférés différemment d'un lot à l'autre
+LANDING_ZONE_SCHEMA = pa.schema([
+    ('listing_url', pa.string()),
+    ('source', pa.string()),
+    ('year', pa.int32()),
+    ('department', pa.string()),
+    ('price', pa.float64()),
+    ('price_per_m2', pa.float64()),
+    ('surface_m2', pa.float64()),
+    ('rooms', pa.int64()),
+    ('bedrooms', pa.int64()),
+    ('address', pa.string()),
+    ('city', pa.string()),
+    ('postal_code', pa.string()),
+    ('property_type', pa.string()),
+    ('description', pa.string()),
+    ('features', pa.string()),
+    ('date_mutation', pa.string()),
+    ('first_seen_at', pa.timestamp('us')),
+    ('last_seen_at', pa.timestamp('us')),
+])
+
+PARTITION_COLUMNS = ['source', 'year', 'department']
+
+
+def _to_int(value):
+    return int(value) if value is not None else None
+
+
+def _to_float(value):
+    return float(value) if value is not None else None
+
+
+class ParquetLandingZone:
+    """Zone d'atterrissage Parquet partitionnée par source, année et département
+
+    Les propriétés sont accumulées puis écrites par gros lots afin de produire
+    des fichiers de taille raisonnable, lisibles par Spark avec élagage de
+    partitions (``source=.../year=.../department=...``).
+    """
+
+    def __init__(self, base_path: str, compression: str = 'zstd', rows_per_flush: int = 100_000):
+        self.base_path = base_path
+        self.compression = compression
+        self.rows_per_flush = rows_per_flush
+        self.rows_written = 0
+        self._columns: Dict[str, List] = {name: [] for name in LANDING_ZONE_SCHEMA.names}
+        os.makedirs(base_path, exist_ok=True)
+
+    @staticmethod
+    def _year(record: Dict) -> int:
+        """Année de partition : date de mutation pour DVF, sinon date de première découverte"""
+        if record.get('date_mutation'):
+            return int(record['date_mutation'][:4])
+        return (record.get('first_seen_at') or datetime.now()).year
+
+    def add(self, records: List[Dict], source: str) -> None:
+        """Ajoute des propriétés au tampon et l'écrit s'il est plein"""
+        columns = self._columns
+        for record in records:
+            features = record.get('features')
+            columns['listing_url'].append(record.get('listing_url'))
+            columns['source'].append(source)
+            columns['year'].append(self._year(record))
+            columns['department'].append(str(record.get('department') or 'inconnu'))
+            columns['price'].append(_to_float(record.get('price')))
+            columns['price_per_m2'].append(_to_float(record.get('price_per_m2')))
+            columns['surface_m2'].append(_to_float(record.get('surface_m2')))
+            columns['rooms'].append(_to_int(record.get('rooms')))
+            columns['bedrooms'].append(_to_int(record.get('bedrooms')))
+            columns['address'].append(record.get('address'))
+            columns['city'].append(record.get('city'))
+            columns['postal_code'].append(record.get('postal_code'))
+            columns['property_type'].append(record.get('property_type'))
+            columns['description'].append(record.get('description'))
+            columns['features'].append(
+                json.dumps(features, default=str, ensure_ascii=False) if features else None
+            )
+            columns['date_mutation'].append(record.get('date_mutation'))
+            columns['first_seen_at'].append(record.get('first_seen_at'))
+            columns['last_seen_at'].append(record.get('last_seen_at'))
+
+        if len(columns['listing_url']) >= self.rows_per_flush:
+            self.flush()
+
+    def flush(self) -> None:
+        """Écrit le tampon dans la zone d'atterrissage"""
+        row_count = len(self._columns['listing_url'])
+        if not row_count:
+            return
+
+        table = pa.Table.from_pydict(self._columns, schema=LANDING_ZONE_SCHEMA)
+        file_format = ds.ParquetFileFormat()
+        ds.write_dataset(
+            table,
+            self.base_path,
+            format=file_format,
+            file_options=file_format.make_write_options(compression=self.compression),
+            partitioning=ds.partitioning(
+                pa.schema([LANDING_ZONE_SCHEMA.field(name) for name in PARTITION_COLUMNS]),
+                flavor='hive',
+            ),
+            # Nom unique par écriture : les lots successifs s'ajoutent aux partitions existantes
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+            existing_data_behavior='overwrite_or_ignore',
+        )
+        self.rows_written += row_count
+        self._columns = {name: [] for name in LANDING_ZONE_SCHEMA.names}
+        logging.info(f"{row_count} propriétés écrites dans la zone d'atterrissage {self.base_path}")
@@ -0,0 +1,127 @@
+import logging
+import time
+
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.defer import maybe_deferred_to_future
+from twisted.internet.task import deferLater
+
+from config import HTTP_FIXTURES_CONFIG
+from http_fixtures import RECORD, REPLAY, FixtureStore, json_safe
+from rate_control import parse_retry_after
+
+# Middlewares communs aux spiders immobiliers (à reprendre dans custom_settings).
+# Après RetryMiddleware (550) : chaque tentative est cadencée et sa réponse observée.
+RATE_CONTROL_MIDDLEWARES = {'middlewares.AdaptiveRateMiddleware': 950}
+# Avant tous les autres : en rejeu, la réponse enregistrée court-circuite cadence et
+# téléchargement ; en enregistrement, la réponse est vue en dernier (décompressée, après les
+# nouvelles tentatives).
+HTTP_FIXTURE_MIDDLEWARES = {'middlewares.HttpFixtureMiddleware': 50}
+
+
+async def _sleep(seconds: float) -> None:
+    from twisted.internet import reactor
+    await maybe_deferred_to_future(deferLater(reactor, seconds))
+
+
+class AdaptiveRateMiddleware:
+    """Cadence les requêtes de chaque hôte avec le RateControl du spider
+
+    Une requête vers un hôte contrôlé attend qu'un emplacement se libère et
+    que le délai courant soit écoulé ; sa réponse (code, latence, Retry-After)
+    ajuste ensuite la concurrence et le délai de l'hôte.
+    """
+
+    def __init__(self, crawler=None):
+        self.crawler = crawler
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def _controller(self, request, spider):
+        spider = spider if spider is not None else self.crawler.spider
+        rate_control = getattr(spider, 'rate_control', None)
+        return rate_control.controller_for(request.url) if rate_control is not None else None
+
+    async def process_request(self, request, spider=None):
+        controller = self._controller(request, spider)
+        if controller is None:
+            return None
+        wait = controller.try_acquire()
+        while wait > 0:
+            await _sleep(wait)
+            wait = controller.try_acquire()
+        request.meta['rate_control_start'] = time.monotonic()
+        return None
+
+    def _finish(self, request, spider, status, retry_after=None):
+        start = request.meta.pop('rate_control_start', None)
+        if start is None:
+            return
+        controller = self._controller(request, spider)
+        controller.release()
+        controller.observe(status, time.monotonic() - start, retry_after=retry_after)
+
+    def process_response(self, request, response, spider=None):
+        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+        self._finish(request, spider, response.status, retry_after)
+        return response
+
+    def process_exception(self, request, exception, spider=None):
+        self._finish(request, spider, None)
+        return None
+
+
+class HttpFixtureMiddleware:
+    """Enregistre les réponses dans un FixtureStore ou les rejoue sans réseau
+
+    Inactif sauf si ``HTTP_FIXTURES_MODE`` vaut ``record`` ou ``replay``. En
+    rejeu, une requête sans réponse enregistrée est ignorée (IgnoreRequest).
+    """
+
+    def __init__(self, store: FixtureStore, mode: str, crawler=None):
+        self.store = store
+        self.mode = mode
+        self.crawler = crawler
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        mode = HTTP_FIXTURES_CONFIG['mode']
+        if mode not in (RECORD, REPLAY):
+            raise NotConfigured
+        logging.info(f"Réponses HTTP en mode {mode}: {HTTP_FIXTURES_CONFIG['path']}")
+        return cls(FixtureStore(HTTP_FIXTURES_CONFIG['path']), mode, crawler)
+
+    def _stats(self, key):
+        if self.crawler is not None and self.crawler.stats is not None:
+            self.crawler.stats.inc_value(f"http_fixtures/{key}")
+
+    def process_request(self, request, spider=None):
+        if self.mode != REPLAY:
+            return None
+        fixture = self.store.get(request.url, request.method, request.body)
+        if fixture is None:
+            self._stats('missing')
+            raise IgnoreRequest(f"Aucune réponse enregistrée pour {request.method} {request.url}")
+        body = self.store.read_body(fixture)
+        response_class = responsetypes.from_args(headers=fixture['headers'], url=request.url,
+                                                 body=body)
+        self._stats('replayed')
+        return response_class(url=request.url, status=fixture['status'], headers=fixture['headers'],
+                              body=body, request=request, flags=['fixture'])
+
+    def process_response(self, request, response, spider=None):
+        if self.mode != RECORD:
+            return response
+        spider = spider if spider is not None else self.crawler.spider
+        self.store.save(
+            request.url, response.body, status=response.status,
+            headers=response.headers.to_unicode_dict(), method=request.method,
+            request_body=request.body,
+            spider=spider.name if spider is not None else None,
+            callback=request.callback.__name__ if callable(request.callback) else request.callback,
+            cb_kwargs=json_safe(request.cb_kwargs), meta=json_safe(request.meta),
+        )
+        self._stats('recorded')
+        return response
@@ -0,0 +1,101 @@
+import logging
+from datetime import datetime
+from typing import Iterable
+
+import pymongo
+from pymongo import IndexModel
+
+# Index de la collection real_estate, déclarés au même endroit que les requêtes qui les utilisent
+REAL_ESTATE_INDEXES = [
+    IndexModel([('listing_url', pymongo.ASCENDING)], name='listing_url_1', unique=True),
+    # Balayage d'inactivité : égalités (source, department, is_active) puis intervalle sur
+    # last_seen_at
+    IndexModel(
+        [('source', pymongo.ASCENDING), ('department', pymongo.ASCENDING),
+         ('is_active', pymongo.ASCENDING), ('last_seen_at', pymongo.ASCENDING)],
+        name='source_department_active_last_seen'
+    ),
+]
+
+# Code d'erreur MongoDB d'une clé dupliquée
+DUPLICATE_KEY = 11000
+
+
+def has_unique_listing_url(collection) -> bool:
+    """Indique si l'unicité de listing_url est garantie par un index"""
+    index = collection.index_information().get('listing_url_1', {})
+    return bool(index.get('unique'))
+
+
+def ensure_indexes(collection) -> None:
+    """Crée les index manquants de la collection real_estate
+
+    Si des doublons hérités empêchent la création de l'index unique, ils sont
+    supprimés puis la création est relancée.
+    """
+    try:
+        collection.create_indexes(REAL_ESTATE_INDEXES)
+    except pymongo.errors.OperationFailure as e:
+        if e.code != DUPLICATE_KEY:
+            raise
+        logging.warning("Duplicate listing_url values prevent the unique index, removing them")
+        remove_duplicate_listings(collection)
+        collection.create_indexes(REAL_ESTATE_INDEXES)
+
+
+def mark_inactive_listings(collection, source: str, departments: Iterable[str],
+                           cutoff: datetime) -> int:
+    """Désactive les annonces d'une source non revues depuis ``cutoff``
+
+    Le balayage est limité aux départements parcourus pendant le run : une
+    annonce d'un département non crawlé n'a pas pu être revue.
+
+    Returns:
+        int: Nombre d'annonces désactivées
+    """
+    departments = sorted({str(department) for department in departments if department})
+    if not departments:
+        return 0
+    result = collection.update_many(
+        {
+            'source': source,
+            'department': {'$in': departments},
+            'is_active': True,
+            'last_seen_at': {'$lt': cutoff},
+        },
+        {'$set': {'is_active': False}}
+    )
+    return result.modified_count
+
+
+def remove_duplicate_listings(collection) -> int:
+    """Supprime les doublons de listing_url en parcourant l'index, sans ``$group``
+
+    Avec l'index unique en place il ne peut pas y avoir de doublon et rien
+    n'est lu. Sinon, les documents sont parcourus dans l'ordre de l'index
+    ``listing_url`` : les doublons sont adjacents et seul le document courant
+    est gardé en mémoire. Le premier document de chaque URL est conservé.
+
+    Returns:
+        int: Nombre de documents supprimés
+    """
+    if has_unique_listing_url(collection):
+        return 0
+
+    cursor = collection.find({}, {'_id': 1, 'listing_url': 1}).sort(
+        [('listing_url', pymongo.ASCENDING), ('_id', pymongo.ASCENDING)]
+    ).allow_disk_use(True)
+    removed = 0
+    previous_url = object()
+    duplicate_ids = []
+    for doc in cursor:
+        url = doc.get('listing_url')
+        if url == previous_url:
+            duplicate_ids.append(doc['_id'])
+            if len(duplicate_ids) >= 1000:
+                removed += collection.delete_many({'_id': {'$in': duplicate_ids}}).deleted_count
+                duplicate_ids = []
+        previous_url = url
+    if duplicate_ids:
+        removed += collection.delete_many({'_id': {'$in': duplicate_ids}}).deleted_count
+    return removed
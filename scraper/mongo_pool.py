@@ -0,0 +1,51 @@
+import threading
+from typing import Dict, Optional
+
+import pymongo
+
+from config import MONGO_CONFIG
+
+# Clients partagés par URI, avec le nombre de spiders qui les utilisent
+_clients: Dict[str, pymongo.MongoClient] = {}
+_users: Dict[str, int] = {}
+_lock = threading.Lock()
+
+
+def mongo_uri(config: Optional[Dict] = None) -> str:
+    """URI MongoDB de la configuration (MONGO_CONFIG par défaut)"""
+    config = config or MONGO_CONFIG
+    return (f"mongodb://{config['user']}:{config['password']}"
+            f"@{config['host']}:{config['port']}/{config['database']}")
+
+
+def acquire_client(uri: str) -> pymongo.MongoClient:
+    """Client MongoDB partagé par tous les spiders d'un même processus
+
+    Un MongoClient tient son propre pool de connexions et peut servir
+    plusieurs threads : les spiders lancés dans un même reactor partagent
+    donc un seul pool au lieu d'en ouvrir un chacun.
+    """
+    with _lock:
+        client = _clients.get(uri)
+        if client is None:
+            client = _clients[uri] = pymongo.MongoClient(uri)
+            _users[uri] = 0
+        _users[uri] += 1
+        return client
+
+
+def release_client(client: Optional[pymongo.MongoClient]) -> None:
+    """Rend un client obtenu par ``acquire_client`` (fermé par son dernier utilisateur)"""
+    if client is None:
+        return
+    with _lock:
+        uri = next((uri for uri, shared in _clients.items() if shared is client), None)
+        if uri is None:
+            # Client hors du pool (créé directement)
+            client.close()
+            return
+        _users[uri] -= 1
+        if _users[uri] > 0:
+            return
+        del _clients[uri], _users[uri]
+    client.close()
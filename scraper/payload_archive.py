@@ -0,0 +1,191 @@
+import hashlib
+import logging
+import threading
+import zlib
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import pymongo
+from bson import Binary
+
+from utils import dumps_json, loads_json
+from writer import BackgroundBulkWriter
+
+# Format des annonces archivées : JSON compressé avec zlib
+PAYLOAD_ENCODING = 'zlib+json'
+
+
+def encode_payload(payload: Dict) -> Tuple[bytes, str]:
+    """Sérialise une annonce brute (clés triées)
+
+    Returns:
+        Tuple[bytes, str]: JSON de l'annonce et empreinte de son contenu
+    """
+    data = dumps_json(payload, sort_keys=True)
+    return data, hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def decompress_payload(blob: bytes) -> Dict:
+    return loads_json(zlib.decompress(blob))
+
+
+class PayloadArchive:
+    """Annonces brutes compressées, rangées hors de la collection real_estate
+
+    Les documents de real_estate ne gardent que les champs normalisés ; la
+    réponse complète de chaque annonce est archivée dans une collection à
+    part (``_id`` = ``listing_url``) et relue à la demande avec ``get``.
+
+    S'utilise comme sink du PropertyStore : ``add`` reçoit chaque lot et
+    archive le champ ``raw_payload`` des propriétés qui en ont un. Une
+    annonce dont le contenu n'a pas changé depuis son archivage n'est pas
+    réécrite.
+    """
+
+    def __init__(self, collection, level: int = 6, writer_threads: int = 1,
+                 max_pending_batches: int = 4):
+        """
+        Args:
+            collection: Collection MongoDB des annonces archivées
+            level (int): Niveau de compression zlib
+            writer_threads (int): Nombre de threads d'écriture
+            max_pending_batches (int): Lots en attente avant de bloquer le parsing
+        """
+        self.collection = collection
+        self.level = level
+        self.writer_threads = writer_threads
+        self.max_pending_batches = max_pending_batches
+        self._writer = None
+        self._stats_lock = threading.Lock()
+        self.archived = 0
+        self.unchanged = 0
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+
+    @property
+    def writer(self) -> BackgroundBulkWriter:
+        # Threads d'écriture démarrés au premier lot : une archive en lecture seule n'en a pas
+        # besoin
+        if self._writer is None:
+            self._writer = BackgroundBulkWriter(self.collection, threads=self.writer_threads,
+                                                max_pending=self.max_pending_batches)
+        return self._writer
+
+    def _known_hashes(self, urls: List[str]) -> Dict[str, str]:
+        cursor = self.collection.find({'_id': {'$in': urls}}, {'content_hash': 1})
+        return {doc['_id']: doc.get('content_hash') for doc in cursor}
+
+    def add(self, properties: List[Dict], source: str) -> None:
+        """Archive les annonces brutes d'un lot de propriétés (écriture en arrière-plan)"""
+        operations = self._operations(properties, source)
+        if operations:
+            self.writer.submit(operations, len(operations))
+
+    def _operations(self, properties: List[Dict], source: str) -> List:
+        """Remplacements à écrire pour les annonces nouvelles ou modifiées d'un lot"""
+        payloads = {prop['listing_url']: prop['raw_payload'] for prop in properties
+                    if prop.get('raw_payload') and prop.get('listing_url')}
+        if not payloads:
+            return []
+        known = self._known_hashes(list(payloads))
+        now = datetime.now()
+        operations = []
+        raw_bytes = compressed_bytes = 0
+        for url, payload in payloads.items():
+            data, content_hash = encode_payload(payload)
+            if known.get(url) == content_hash:
+                continue
+            blob = zlib.compress(data, self.level)
+            raw_bytes += len(data)
+            compressed_bytes += len(blob)
+            operations.append(pymongo.ReplaceOne({'_id': url}, {
+                'source': source,
+                'encoding': PAYLOAD_ENCODING,
+                'content_hash': content_hash,
+                'payload': Binary(blob),
+                'archived_at': now,
+            }, upsert=True))
+
+        with self._stats_lock:
+            self.archived += len(operations)
+            self.unchanged += len(payloads) - len(operations)
+            self.raw_bytes += raw_bytes
+            self.compressed_bytes += compressed_bytes
+        return operations
+
+    def flush(self) -> None:
+        if self._writer is not None:
+            self._writer.flush()
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+    def get(self, listing_url: str) -> Optional[Dict]:
+        """Annonce brute d'une propriété, None si elle n'a pas été archivée"""
+        doc = self.collection.find_one({'_id': listing_url}, {'payload': 1})
+        return decompress_payload(doc['payload']) if doc else None
+
+    def get_many(self, listing_urls: Iterable[str]) -> Dict[str, Dict]:
+        """Annonces brutes de plusieurs propriétés (une seule requête ``$in``)"""
+        cursor = self.collection.find({'_id': {'$in': list(listing_urls)}}, {'payload': 1})
+        return {doc['_id']: decompress_payload(doc['payload']) for doc in cursor}
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            return {
+                'archived': self.archived,
+                'unchanged': self.unchanged,
+                'raw_bytes': self.raw_bytes,
+                'compressed_bytes': self.compressed_bytes,
+                'compression_ratio': (round(self.raw_bytes / self.compressed_bytes, 2)
+                                      if self.compressed_bytes else None),
+            }
+
+
+def archive_embedded_payloads(collection, archive: PayloadArchive, source: str,
+                              project: Callable[[Dict], Dict], batch_size: int = 500) -> int:
+    """Déplace vers l'archive les annonces complètes encore stockées dans ``features``
+
+    Migration des documents écrits avant la projection des champs : l'annonce
+    complète est archivée puis ``features`` est remplacé par sa projection.
+
+    Args:
+        collection: Collection MongoDB real_estate
+        archive (PayloadArchive): Archive des annonces brutes
+        source (str): Spider dont les documents sont migrés
+        project (Callable): Projection de l'annonce complète sur les champs conservés
+        batch_size (int): Documents migrés par lot
+
+    Returns:
+        int: Nombre de documents migrés
+    """
+    # Seules les annonces complètes portent les photos et la position floutée
+    query = {'source': source, '$or': [{'features.photos': {'$exists': True}},
+                                       {'features.blurInfo': {'$exists': True}}]}
+    migrated = 0
+    batch = []
+    for doc in collection.find(query, {'listing_url': 1, 'features': 1}):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            migrated += _migrate_batch(collection, archive, source, project, batch)
+            batch = []
+    if batch:
+        migrated += _migrate_batch(collection, archive, source, project, batch)
+    logging.info(f"{migrated} annonces {source} déplacées vers l'archive")
+    return migrated
+
+
+def _migrate_batch(collection, archive, source, project, batch) -> int:
+    # Écriture synchrone dans l'archive (une erreur arrête la migration) avant de réduire features
+    operations = archive._operations(
+        [{'listing_url': doc['listing_url'], 'raw_payload': doc['features']} for doc in batch],
+        source
+    )
+    if operations:
+        archive.collection.bulk_write(operations, ordered=False)
+    result = collection.bulk_write([
+        pymongo.UpdateOne({'_id': doc['_id']}, {'$set': {'features': project(doc['features'])}})
+        for doc in batch
+    ], ordered=False)
+    return result.modified_count
@@ -0,0 +1,53 @@
+import logging
+from datetime import datetime
+
+from itemadapter import ItemAdapter
+
+from writer import WriteFailure
+
+# Pipelines communs aux spiders immobiliers (à reprendre dans custom_settings)
+PROPERTY_PIPELINES = {'pipelines.PropertyPipeline': 300}
+
+
+class PropertyPipeline:
+    """Persiste les items des spiders immobiliers par lots via le PropertyStore du spider
+
+    Les items sont convertis en documents (champs absents à None, horodatages
+    par défaut) puis confiés au store, qui décide quand écrire un lot.
+    """
+
+    def __init__(self, crawler=None):
+        self.crawler = crawler
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def _spider(self, spider):
+        return spider if spider is not None else self.crawler.spider
+
+    @staticmethod
+    def to_document(item, source: str) -> dict:
+        """Convertit un item en document prêt pour le store"""
+        doc = ItemAdapter(item).asdict()
+        now = datetime.now()
+        doc.setdefault('source', source)
+        doc.setdefault('first_seen_at', now)
+        doc.setdefault('last_seen_at', now)
+        for field in ('department', 'price', 'price_per_m2', 'surface_m2', 'rooms', 'bedrooms',
+                      'address', 'city', 'postal_code', 'property_type', 'features', 'description'):
+            doc.setdefault(field, None)
+        return doc
+
+    def process_item(self, item, spider=None):
+        spider = self._spider(spider)
+        spider.store.add(self.to_document(item, spider.name))
+        return item
+
+    def close_spider(self, spider=None):
+        # Dernier lot et attente des écritures, avant closed() qui enregistre les statistiques
+        try:
+            self._spider(spider).store.close()
+        except WriteFailure as e:
+            # Lots comptés dans store.failed_batches, examinés par closed()
+            logging.error(f"Écritures MongoDB en échec à la fermeture: {str(e)}")
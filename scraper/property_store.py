@@ -0,0 +1,323 @@
+import logging
+import threading
+from decimal import Decimal
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+
+import bson
+import pymongo
+
+from batching import FINAL_FLUSH, AdaptiveBatchPolicy
+from fingerprint import FingerprintIndex, content_fingerprint
+from seen_index import SeenIndex
+from seen_set import RunSeenSet
+from writer import BackgroundBulkWriter
+
+
+class PropertyStore:
+    """Persistance par lots des propriétés d'une source
+
+    Tamponne les propriétés, les écrit dans MongoDB par lots (taille adaptative,
+    écriture en arrière-plan, annonces inchangées réduites à ``last_seen_at``)
+    et, s'ils sont fournis, dans la zone d'atterrissage Parquet et les autres
+    sinks (``add``/``flush``, par exemple ``SparkMongoSink``). Utilisé par
+    ``PropertyPipeline`` pour les items des spiders et directement par les
+    processus de travail DVF.
+    """
+
+    def __init__(self, collection, source: str, landing_zone=None, mongo_sink: bool = True,
+                 batch_policy: Optional[AdaptiveBatchPolicy] = None,
+                 fingerprints: Optional[FingerprintIndex] = None,
+                 writer_threads: int = 1, max_pending_batches: int = 4,
+                 sinks: Optional[List] = None, seen: Optional[RunSeenSet] = None,
+                 seen_index: Optional[SeenIndex] = None):
+        """
+        Args:
+            collection: Collection MongoDB real_estate
+            source (str): Nom du spider à l'origine des données
+            landing_zone: Zone d'atterrissage Parquet (optionnelle)
+            mongo_sink (bool): Écrit aussi les propriétés dans MongoDB
+            batch_policy (AdaptiveBatchPolicy): Taille des lots d'écriture
+            fingerprints (FingerprintIndex): Empreintes connues (None = toujours réécrire)
+            writer_threads (int): Nombre de threads d'écriture MongoDB
+            max_pending_batches (int): Lots en attente avant de bloquer le parsing
+            sinks (list): Sinks supplémentaires recevant chaque lot (optionnels)
+            seen (RunSeenSet): Annonces déjà reçues pendant le run (None = pas de dédoublonnage)
+            seen_index (SeenIndex): Index du crawl incrémental, mis à jour une fois chaque lot écrit
+        """
+        self.source = source
+        self.landing_zone = landing_zone
+        self.sinks = [sink for sink in [landing_zone, *(sinks or [])] if sink is not None]
+        self.mongo_sink = mongo_sink
+        self.batch_policy = batch_policy or AdaptiveBatchPolicy()
+        self.fingerprints = fingerprints
+        self.seen = seen
+        # Annonces d'un lot en échec : le filtre du run les croit écrites, leurs copies suivantes
+        # sont donc réécrites sans le consulter (un filtre de Bloom ne permet pas de les retirer)
+        self._unsaved_urls = set()
+        self.seen_index = seen_index
+        self.properties = []
+        self._pending_bytes = 0
+        self._closed = False
+
+        self.properties_scraped = 0
+        self.properties_new = 0
+        self.properties_updated = 0
+        self.properties_unchanged = 0
+        # Lots en échec des autres processus (voir ``merge``)
+        self._merged_failed_batches = 0
+        # Départements effectivement parcourus, pour limiter le balayage d'inactivité
+        self.crawled_departments = set()
+        self._stats_lock = threading.Lock()
+
+        # Les lots sont écrits en arrière-plan pendant que le parsing continue
+        self.writer = BackgroundBulkWriter(
+            collection,
+            threads=writer_threads,
+            max_pending=max_pending_batches,
+            on_result=self._on_batch_written
+        )
+
+    def add(self, property_data: Dict) -> None:
+        """Ajoute une propriété au tampon et écrit le lot s'il a atteint sa taille"""
+        # Annonce déjà reçue pendant ce run (autre page, département voisin) : une seule écriture
+        url = property_data.get('listing_url')
+        if self.seen is not None and not self._take_unsaved(url) and self.seen.check_and_add(url):
+            return
+        # Conversion Decimal -> float faite ici une fois pour toutes (bson ne sait pas encoder
+        # Decimal)
+        doc = {key: float(value) if isinstance(value, Decimal) else value
+               for key, value in property_data.items()}
+        self.properties.append(doc)
+        self.crawled_departments.add(doc.get('department'))
+        # Taille du document écrit dans real_estate : l'annonce brute part dans l'archive
+        if 'raw_payload' in doc:
+            doc = {key: value for key, value in doc.items() if key != 'raw_payload'}
+        self._pending_bytes += len(bson.encode(doc))
+        reason = self.batch_policy.flush_reason(len(self.properties), self._pending_bytes)
+        if reason is not None:
+            self.save(reason)
+
+    def should_flush(self) -> bool:
+        """Indique si le tampon a atteint la taille de lot courante"""
+        return self.batch_policy.should_flush(len(self.properties), self._pending_bytes)
+
+    def save(self, reason: str = FINAL_FLUSH) -> None:
+        """Envoie le tampon vers MongoDB et, si activée, vers la zone d'atterrissage
+
+        Args:
+            reason (str): Motif d'envoi du lot, transmis à la politique de taille des lots
+        """
+        if not self.properties:
+            return
+
+        byte_count = self._pending_bytes
+        self.batch_policy.record_flush(len(self.properties), byte_count)
+        self._pending_bytes = 0
+
+        for sink in self.sinks:
+            try:
+                sink.add(self.properties, self.source)
+            except Exception as e:
+                logging.error(f"Error writing to {type(sink).__name__}: {str(e)}")
+
+        if not self.mongo_sink:
+            with self._stats_lock:
+                self.properties_scraped += len(self.properties)
+            self._record_seen([(prop.get('listing_url'), prop.get('price'))
+                               for prop in self.properties])
+            self.properties = []
+            return
+
+        try:
+            # Empreintes déjà stockées : les annonces inchangées ne reçoivent que last_seen_at
+            known = {}
+            if self.fingerprints is not None:
+                known = self.fingerprints.lookup(prop['listing_url'] for prop in self.properties)
+
+            # Prepare MongoDB bulk operations
+            bulk_ops = []
+            unchanged = 0
+            # Empreintes mises en cache une fois le lot écrit : un lot en échec ne laisse pas
+            # d'empreinte absente de MongoDB (une copie suivante serait réduite à last_seen_at)
+            fingerprints = []
+            for mongo_doc in self.properties:
+                filter_doc = {'listing_url': mongo_doc['listing_url']}
+
+                content_hash = None
+                if self.fingerprints is not None:
+                    content_hash = content_fingerprint(mongo_doc)
+                    if known.get(mongo_doc['listing_url']) == content_hash:
+                        unchanged += 1
+                        bulk_ops.append(pymongo.UpdateOne(filter_doc, {
+                            '$set': {'last_seen_at': mongo_doc['last_seen_at'], 'is_active': True}
+                        }))
+                        continue
+                    fingerprints.append((mongo_doc['listing_url'], content_hash))
+
+                # Define update operation
+                update_doc = {
+                    '$set': {
+                        'source': self.source,
+                        'department': mongo_doc['department'],
+                        'price': mongo_doc['price'],
+                        'price_per_m2': mongo_doc['price_per_m2'],
+                        'surface_m2': mongo_doc['surface_m2'],
+                        'rooms': mongo_doc['rooms'],
+                        'bedrooms': mongo_doc['bedrooms'],
+                        'address': mongo_doc['address'],
+                        'city': mongo_doc['city'],
+                        'postal_code': mongo_doc['postal_code'],
+                        'property_type': mongo_doc['property_type'],
+                        'features': mongo_doc['features'],
+                        'description': mongo_doc['description'],
+                        'last_seen_at': mongo_doc['last_seen_at'],
+                        'is_active': True
+                    },
+                    '$setOnInsert': {
+                        'first_seen_at': mongo_doc['first_seen_at']
+                    },
+                    '$inc': {'update_count': 1}
+                }
+                if content_hash is not None:
+                    update_doc['$set']['content_hash'] = content_hash
+
+                bulk_ops.append(pymongo.UpdateOne(filter_doc, update_doc, upsert=True))
+
+            with self._stats_lock:
+                self.properties_unchanged += unchanged
+
+            # Hand the batch over to the background writer (blocks if too many batches are pending)
+            if bulk_ops:
+                listings = None
+                if self.seen_index is not None:
+                    # Annonces du lot enregistrées dans l'index seulement une fois le lot écrit
+                    listings = [(prop['listing_url'], prop.get('price'))
+                                for prop in self.properties]
+                urls = []
+                if self.seen is not None:
+                    urls = [prop['listing_url'] for prop in self.properties]
+                on_written = partial(self._on_batch_done, len(self.properties), byte_count, reason,
+                                     listings, fingerprints)
+                self.writer.submit(bulk_ops, len(self.properties), on_written=on_written,
+                                   on_failed=partial(self._on_batch_failed, urls))
+
+            # Clear properties once queued
+            self.properties = []
+
+        except Exception as e:
+            logging.error(f"Error saving properties: {str(e)}")
+
+    def _on_batch_written(self, result, document_count, latency):
+        """Met à jour les compteurs après l'écriture d'un lot (thread d'écriture)"""
+        with self._stats_lock:
+            self.properties_scraped += document_count
+            self.properties_new += result.upserted_count
+            self.properties_updated += result.modified_count
+        logging.info(f"Batch save complete - Inserted: {result.upserted_count}, "
+                     f"Modified: {result.modified_count}, Matched: {result.matched_count} "
+                     f"({latency:.2f}s)")
+
+    def _on_batch_done(self, document_count, byte_count, reason, listings, fingerprints, result,
+                       latency):
+        """Suites propres à un lot écrit
+
+        Taille des lots suivants, empreintes et index des annonces vues.
+        """
+        self.batch_policy.observe(document_count, latency, byte_count=byte_count, reason=reason)
+        for url, content_hash in fingerprints:
+            self.fingerprints.remember(url, content_hash)
+        if listings is not None:
+            self._record_seen(listings)
+
+    def _take_unsaved(self, url) -> bool:
+        """Vrai (une seule fois) si l'annonce appartenait à un lot en échec
+
+        L'annonce repart alors dans un lot sans passer par le filtre du run.
+        """
+        if not self._unsaved_urls:
+            return False
+        with self._stats_lock:
+            if url in self._unsaved_urls:
+                self._unsaved_urls.discard(url)
+                return True
+        return False
+
+    def _on_batch_failed(self, urls, error):
+        """Annonces d'un lot non écrit : leurs copies suivantes du run ne sont plus écartées"""
+        if urls:
+            with self._stats_lock:
+                self._unsaved_urls.update(urls)
+
+    def _record_seen(self, listings: List[Tuple[str, Any]]) -> None:
+        if self.seen_index is None:
+            return
+        try:
+            self.seen_index.record(listings)
+        except Exception as e:
+            # Index non à jour : les annonces seront simplement revues au prochain run
+            logging.error(f"Error updating seen index: {str(e)}")
+
+    @property
+    def failed_batches(self) -> int:
+        """Lots MongoDB en échec depuis la création du store (workers DVF compris)"""
+        return self.writer.failed_batches + self._merged_failed_batches
+
+    def flush(self) -> None:
+        """Écrit les propriétés en attente et attend la fin des écritures en arrière-plan
+
+        Raises:
+            WriteFailure: Des lots ont échoué depuis le flush précédent
+        """
+        self.save()
+        try:
+            self.writer.flush()
+        finally:
+            self._flush_sinks()
+
+    def close(self) -> None:
+        """Écrit les propriétés en attente puis arrête les threads d'écriture
+
+        Lève WriteFailure comme ``flush``.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self.save()
+        try:
+            self.writer.close()
+        finally:
+            self._flush_sinks(close=True)
+
+    def _flush_sinks(self, close: bool = False) -> None:
+        for sink in self.sinks:
+            try:
+                # Les sinks qui tiennent une ressource (session Spark) la libèrent à la fermeture
+                if close and hasattr(sink, 'close'):
+                    sink.close()
+                else:
+                    sink.flush()
+            except Exception as e:
+                logging.error(f"Error flushing {type(sink).__name__}: {str(e)}")
+
+    def summary(self) -> Dict:
+        """Compteurs de la source, transmissibles d'un processus à l'autre"""
+        with self._stats_lock:
+            return {
+                'properties_scraped': self.properties_scraped,
+                'properties_new': self.properties_new,
+                'properties_updated': self.properties_updated,
+                'properties_unchanged': self.properties_unchanged,
+                'departments': sorted(str(d) for d in self.crawled_departments if d),
+                'failed_batches': self.writer.failed_batches,
+            }
+
+    def merge(self, summary: Dict) -> None:
+        """Ajoute les compteurs d'un autre processus (voir ``summary``)"""
+        with self._stats_lock:
+            self.properties_scraped += summary['properties_scraped']
+            self.properties_new += summary['properties_new']
+            self.properties_updated += summary['properties_updated']
+            self.properties_unchanged += summary['properties_unchanged']
+            self.crawled_departments.update(summary['departments'])
+            self._merged_failed_batches += summary.get('failed_batches', 0)
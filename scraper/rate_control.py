@@ -0,0 +1,260 @@
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+# Réponses indiquant que le site nous limite : ralentissement immédiat
+BACKOFF_STATUSES = (403, 429)
+# Attente entre deux vérifications quand toutes les requêtes autorisées sont en vol
+POLL_INTERVAL = 0.05
+
+
+def parse_retry_after(value) -> Optional[float]:
+    """Délai en secondes d'un en-tête Retry-After (seule la forme numérique est gérée)"""
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        value = value.decode('latin-1')
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class HostRateController:
+    """Concurrence et délai entre requêtes adaptés à un hôte
+
+    Les réponses sont évaluées par fenêtres de ``window`` requêtes : la
+    concurrence augmente et le délai diminue tant que la latence moyenne et le
+    taux d'erreurs restent sous leurs seuils, l'inverse sinon. Une réponse 429
+    ou 403 divise immédiatement la concurrence par deux et double le délai.
+    """
+
+    def __init__(self, host: str, min_concurrency: int = 1, max_concurrency: int = 8,
+                 initial_concurrency: int = 1, min_delay: float = 0.0, max_delay: float = 60.0,
+                 initial_delay: float = 1.0, backoff_delay: float = 1.0,
+                 target_latency: float = 2.0, max_error_rate: float = 0.1, window: int = 20,
+                 max_adjustments: int = 100):
+        """
+        Args:
+            host (str): Hôte contrôlé (les sous-domaines sont inclus)
+            min_concurrency (int): Requêtes simultanées minimum
+            max_concurrency (int): Requêtes simultanées maximum
+            initial_concurrency (int): Requêtes simultanées au démarrage
+            min_delay (float): Délai minimum entre deux requêtes (secondes)
+            max_delay (float): Délai maximum entre deux requêtes (secondes)
+            initial_delay (float): Délai au démarrage (secondes)
+            backoff_delay (float): Délai minimum après un 429/403 (secondes)
+            target_latency (float): Latence moyenne au-delà de laquelle on ralentit (secondes)
+            max_error_rate (float): Taux d'erreurs (5xx, exceptions) au-delà duquel on ralentit
+            window (int): Nombre de réponses par fenêtre d'évaluation
+            max_adjustments (int): Nombre d'ajustements conservés pour les statistiques
+        """
+        self.host = host
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max(min_concurrency, max_concurrency)
+        self.concurrency = min(max(initial_concurrency, min_concurrency), self.max_concurrency)
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.delay = min(max(initial_delay, min_delay), max_delay)
+        self.backoff_delay = backoff_delay
+        self.target_latency = target_latency
+        self.max_error_rate = max_error_rate
+        self.window = window
+        self.max_adjustments = max_adjustments
+
+        self.active = 0
+        self.responses = 0
+        self.backoffs = 0
+        self.rate = 0.0
+        self.adjustments: List[Dict] = []
+        self._next_start = 0.0
+        self._reset_window(None)
+
+    def _reset_window(self, now: Optional[float]) -> None:
+        self._latencies = []
+        self._errors = 0
+        self._window_responses = 0
+        self._window_start = now
+
+    def try_acquire(self, now: Optional[float] = None) -> float:
+        """Réserve un emplacement pour une requête
+
+        Returns:
+            float: 0 si la requête peut partir, sinon le temps d'attente conseillé (secondes)
+        """
+        now = time.monotonic() if now is None else now
+        if self.active >= self.concurrency:
+            return POLL_INTERVAL
+        if now < self._next_start:
+            return self._next_start - now
+        self.active += 1
+        self._next_start = now + self.delay
+        return 0.0
+
+    def release(self) -> None:
+        """Libère l'emplacement d'une requête terminée"""
+        self.active = max(0, self.active - 1)
+
+    def observe(self, status: Optional[int], latency: float, retry_after: Optional[float] = None,
+                now: Optional[float] = None) -> Optional[str]:
+        """Enregistre une réponse et ajuste la cadence si nécessaire
+
+        Args:
+            status (int): Code HTTP de la réponse (None si la requête a échoué)
+            latency (float): Durée de la requête (secondes)
+            retry_after (float): Délai demandé par le serveur (en-tête Retry-After)
+
+        Returns:
+            str: Motif de l'ajustement effectué, None si la cadence est inchangée
+        """
+        now = time.monotonic() if now is None else now
+        self.responses += 1
+        self._window_responses += 1
+        if self._window_start is None:
+            self._window_start = now - latency
+
+        if status in BACKOFF_STATUSES:
+            self.backoffs += 1
+            self.concurrency = max(self.min_concurrency, self.concurrency // 2)
+            self.delay = min(self.max_delay,
+                             max(self.delay * 2, self.backoff_delay, retry_after or 0))
+            # Pause immédiate : les requêtes en attente partent après le nouveau délai
+            self._next_start = max(self._next_start, now + self.delay)
+            self._measure_rate(now)
+            self._reset_window(now)
+            return self._record(f"HTTP {status}: backoff")
+
+        self._latencies.append(latency)
+        if status is None or status >= 500:
+            self._errors += 1
+        if len(self._latencies) < self.window:
+            return None
+
+        average = sum(self._latencies) / len(self._latencies)
+        error_rate = self._errors / len(self._latencies)
+        self._measure_rate(now)
+        self._reset_window(now)
+
+        concurrency, delay = self.concurrency, self.delay
+        if error_rate > self.max_error_rate:
+            self.concurrency = max(self.min_concurrency, self.concurrency - 1)
+            self.delay = min(self.max_delay, max(self.delay * 1.5, self.min_delay, 0.1))
+            reason = f"error rate {error_rate:.0%} > {self.max_error_rate:.0%}: slowdown"
+        elif average > self.target_latency:
+            self.concurrency = max(self.min_concurrency, self.concurrency - 1)
+            self.delay = min(self.max_delay, max(self.delay * 1.25, self.min_delay, 0.1))
+            reason = f"latency {average:.2f}s > {self.target_latency:.2f}s: slowdown"
+        elif average < self.target_latency / 2 and error_rate == 0:
+            self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+            self.delay = max(self.min_delay, self.delay * 0.75)
+            reason = f"latency {average:.2f}s, error rate {error_rate:.0%}: speedup"
+        else:
+            return None
+
+        if (self.concurrency, self.delay) == (concurrency, delay):
+            # Déjà en butée : rien à enregistrer
+            return None
+        return self._record(reason)
+
+    def _measure_rate(self, now: float) -> None:
+        """Débit observé (réponses par seconde) sur la fenêtre qui se termine"""
+        elapsed = now - self._window_start if self._window_start is not None else 0
+        if elapsed > 0:
+            self.rate = self._window_responses / elapsed
+
+    def _record(self, reason: str) -> str:
+        adjustment = {
+            'at': datetime.now(),
+            'concurrency': self.concurrency,
+            'delay': round(self.delay, 3),
+            'rate': round(self.rate, 2),
+            'reason': reason,
+        }
+        self.adjustments.append(adjustment)
+        del self.adjustments[:-self.max_adjustments]
+        logging.info(f"Cadence {self.host}: concurrence {self.concurrency}, "
+                     f"délai {self.delay:.2f}s, {self.rate:.2f} req/s ({reason})")
+        return reason
+
+    def stats(self) -> Dict:
+        """Statistiques de l'hôte pour scraping_stats"""
+        return {
+            'host': self.host,
+            'concurrency': self.concurrency,
+            'delay': round(self.delay, 3),
+            'rate': round(self.rate, 2),
+            'responses': self.responses,
+            'backoffs': self.backoffs,
+            'adjustments': list(self.adjustments),
+        }
+
+
+class RateControl:
+    """Contrôleurs de cadence des hôtes ciblés par un spider"""
+
+    def __init__(self, hosts: Dict[str, Dict], enabled: bool = True):
+        """
+        Args:
+            hosts (dict): Paramètres de HostRateController par hôte
+            enabled (bool): False pour ne contrôler aucun hôte
+        """
+        self.enabled = enabled
+        self.controllers = {host: HostRateController(host, **params)
+                            for host, params in hosts.items()}
+
+    def controller_for(self, url_or_host: str) -> Optional[HostRateController]:
+        """Contrôleur de l'hôte correspondant le plus spécifique
+
+        ``res.bienici.com`` l'emporte sur ``bienici.com``.
+        """
+        if not self.enabled:
+            return None
+        host = urlparse(url_or_host).hostname if '://' in url_or_host else url_or_host
+        if not host:
+            return None
+        best = None
+        for name in self.controllers:
+            matches = host == name or host.endswith(f".{name}")
+            if matches and (best is None or len(name) > len(best)):
+                best = name
+        return self.controllers[best] if best else None
+
+    def stats(self) -> List[Dict]:
+        """Statistiques des hôtes effectivement contactés"""
+        return [controller.stats() for controller in self.controllers.values()
+                if controller.responses]
+
+
+def throttled_get(session, url: str, controller: Optional[HostRateController], retries: int = 3,
+                  **kwargs):
+    """GET bloquant (requests) cadencé par le contrôleur de l'hôte
+
+    Les réponses 429/403 sont retentées après le délai de backoff, au plus
+    ``retries`` fois. La réponse est retournée telle quelle (``stream`` inclus).
+    """
+    if controller is None:
+        return session.get(url, **kwargs)
+
+    for attempt in range(retries + 1):
+        wait = controller.try_acquire()
+        while wait > 0:
+            time.sleep(wait)
+            wait = controller.try_acquire()
+        start = time.monotonic()
+        try:
+            response = session.get(url, **kwargs)
+        except Exception:
+            controller.observe(None, time.monotonic() - start)
+            raise
+        finally:
+            controller.release()
+
+        controller.observe(response.status_code, time.monotonic() - start,
+                           retry_after=parse_retry_after(response.headers.get('Retry-After')))
+        if response.status_code not in BACKOFF_STATUSES or attempt == retries:
+            return response
+        logging.warning(f"HTTP {response.status_code} pour {url}, "
+                        f"nouvel essai dans {controller.delay:.1f}s")
+        response.close()
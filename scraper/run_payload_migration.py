@@ -0,0 +1,37 @@
+import logging
+from datetime import datetime
+
+import pymongo
+
+from config import MONGO_CONFIG, PAYLOAD_ARCHIVE_CONFIG
+from mongo_pool import mongo_uri
+from payload_archive import PayloadArchive, archive_embedded_payloads
+from spiders.bienici_spider import FEATURE_FIELDS, BienIciSpider
+
+
+def project_features(ad):
+    """Champs de l'annonce conservés dans real_estate (cf. project_ad)"""
+    return {field: ad[field] for field in FEATURE_FIELDS if field in ad}
+
+
+def run_migration():
+    """Déplace les annonces Bien'ici complètes de real_estate vers l'archive des annonces brutes"""
+    start_time = datetime.now()
+    logging.info("Migration des annonces brutes vers l'archive...")
+    client = pymongo.MongoClient(mongo_uri())
+    try:
+        db = client[MONGO_CONFIG['database']]
+        archive = PayloadArchive(db[PAYLOAD_ARCHIVE_CONFIG['collection']],
+                                 level=PAYLOAD_ARCHIVE_CONFIG['level'])
+        archive_embedded_payloads(db['real_estate'], archive, BienIciSpider.name, project_features)
+        logging.info(f"Archive: {archive.stats()}")
+    except Exception as e:
+        logging.error(f"Erreur lors de la migration: {str(e)}")
+    finally:
+        client.close()
+        logging.info(f"Migration terminée en {datetime.now() - start_time}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    run_migration()
@@ -0,0 +1,250 @@
+"""Runner commun des spiders immobiliers
+
+Lance n'importe quel ensemble de spiders :
+- ``reactor`` : tous dans un même reactor Twisted (un seul processus, un seul
+  client MongoDB), sauf ceux qui ne rendent pas la main au reactor
+  (``SHARED_REACTOR = False``, par exemple GouvSpider) lancés dans un processus dédié ;
+- ``processes`` : chaque spider dans son propre processus (pool de RUNNER_PROCESSES).
+
+Le budget global de requêtes simultanées (RUNNER_MAX_CONCURRENCY) est réparti
+entre les spiders, chacun restant sous son propre budget (RUNNER_SPIDER_CONCURRENCY).
+Un rapport commun (durée, items, requêtes par spider) est écrit dans MongoDB.
+
+Usage :
+    python scraper/run_spiders.py [seloger bienici gouv] [--mode reactor|processes] [--processes 2]
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from scrapy.crawler import CrawlerProcess
+from scrapy.utils.misc import load_object
+from scrapy.utils.project import get_project_settings
+
+from config import MONGO_CONFIG, RUNNER_CONFIG
+from mongo_pool import acquire_client, mongo_uri, release_client
+
+# Arrêt des spiders du processus sur Ctrl+C : un seul gestionnaire SIGINT pour tout le reactor
+# (signal.signal ne garde que le dernier gestionnaire installé)
+_interrupt_handlers: List[Callable] = []
+
+# Spiders disponibles, importés seulement s'ils sont lancés
+SPIDERS = {
+    'seloger': 'spiders.seloger_spider.SeLogerSpider',
+    'bienici': 'spiders.bienici_spider.BienIciSpider',
+    'gouv': 'spiders.gouv_spider.GouvSpider',
+}
+
+
+def concurrency_budgets(requested: Dict[str, int], max_concurrency: int,
+                        spider_budgets: Dict[str, int]) -> Dict[str, int]:
+    """Requêtes simultanées accordées à chaque spider
+
+    Args:
+        requested (Dict[str, int]): CONCURRENT_REQUESTS demandé par chaque spider
+        max_concurrency (int): Budget global des spiders lancés ensemble (0 = pas de limite)
+        spider_budgets (Dict[str, int]): Budget maximal par spider
+
+    Returns:
+        Dict[str, int]: CONCURRENT_REQUESTS appliqué à chaque spider
+    """
+    budgets = {key: max(1, min(value, spider_budgets.get(key, value)))
+               for key, value in requested.items()}
+    total = sum(budgets.values())
+    if max_concurrency and total > max_concurrency:
+        # Budget global partagé au prorata des demandes, au moins une requête par spider
+        budgets = {key: max(1, value * max_concurrency // total) for key, value in budgets.items()}
+    return budgets
+
+
+def register_interrupt_handler(handler: Callable) -> None:
+    """Enregistre ``handler(signum, frame)``, appelé par le gestionnaire SIGINT du runner"""
+    _interrupt_handlers.append(handler)
+
+
+def unregister_interrupt_handler(handler: Callable) -> None:
+    if handler in _interrupt_handlers:
+        _interrupt_handlers.remove(handler)
+
+
+def interrupt_handler(process) -> Callable:
+    """Gestionnaire SIGINT/SIGTERM d'un processus de crawl
+
+    Chaque spider enregistré vide ses écritures en attente, puis tous les crawlers
+    sont arrêtés proprement (closed() enregistre leurs statistiques). Une seconde
+    interruption arrête le processus sans attendre.
+    """
+    def handle(signum, frame):
+        logging.info("Interruption détectée, nettoyage en cours...")
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        for handler in list(_interrupt_handlers):
+            try:
+                handler(signum, frame)
+            except Exception as e:
+                logging.error(f"Erreur lors de l'arrêt d'un spider: {str(e)}")
+        process.stop()
+
+    return handle
+
+
+def spider_report(key: str, crawler) -> Dict:
+    """Durée et volumes d'un spider, d'après les statistiques Scrapy de son crawler"""
+    stats = crawler.stats.get_stats() if crawler.stats is not None else {}
+    return {
+        'spider': key,
+        'name': crawler.spidercls.name,
+        'pid': os.getpid(),
+        'concurrency': crawler.settings.getint('CONCURRENT_REQUESTS'),
+        'started_at': stats.get('start_time'),
+        'finished_at': stats.get('finish_time'),
+        'duration_seconds': stats.get('elapsed_time_seconds'),
+        'finish_reason': stats.get('finish_reason'),
+        'items': stats.get('item_scraped_count', 0),
+        'requests': stats.get('downloader/request_count', 0),
+        'errors': stats.get('log_count/ERROR', 0),
+    }
+
+
+def crawl(keys: List[str], budgets: Dict[str, int]) -> List[Dict]:
+    """Lance des spiders dans le reactor du processus courant et retourne leurs rapports"""
+    process = CrawlerProcess(get_project_settings())
+    # Gestionnaire unique pour tous les spiders du reactor, à la place de celui de Scrapy
+    handler = interrupt_handler(process)
+    signal.signal(signal.SIGINT, handler)
+    signal.signal(signal.SIGTERM, handler)
+
+    crawlers = {}
+    for key in keys:
+        crawler = process.create_crawler(load_object(SPIDERS[key]))
+        # Priorité maximale : le budget l'emporte sur les custom_settings du spider
+        crawler.settings.set('CONCURRENT_REQUESTS', budgets[key], priority='cmdline')
+        process.crawl(crawler)
+        crawlers[key] = crawler
+
+    try:
+        process.start(install_signal_handlers=False)
+    except Exception as e:
+        logging.error(f"Erreur lors du scraping ({', '.join(keys)}): {str(e)}")
+    return [spider_report(key, crawler) for key, crawler in crawlers.items()]
+
+
+def save_report(report: Dict) -> None:
+    """Enregistre le rapport du run dans MongoDB"""
+    client = None
+    try:
+        client = acquire_client(mongo_uri())
+        client[MONGO_CONFIG['database']][RUNNER_CONFIG['report_collection']].insert_one(report)
+        logging.info("Rapport du run enregistré dans MongoDB")
+    except Exception as e:
+        logging.error(f"Erreur lors de l'enregistrement du rapport: {str(e)}")
+    finally:
+        release_client(client)
+
+
+def run_spiders(keys: Optional[List[str]] = None, mode: Optional[str] = None,
+                processes: Optional[int] = None, max_concurrency: Optional[int] = None) -> Dict:
+    """Lance un ensemble de spiders et enregistre un rapport commun
+
+    Args:
+        keys (List[str]): Spiders à lancer (clés de SPIDERS, RUNNER_SPIDERS par défaut)
+        mode (str): 'reactor' ou 'processes' (RUNNER_MODE par défaut)
+        processes (int): Taille du pool de processus (0 = un processus par spider)
+        max_concurrency (int): Budget global de requêtes simultanées (0 = pas de limite)
+
+    Returns:
+        Dict: Rapport du run (un rapport par spider dans ``spiders``)
+    """
+    keys = keys or RUNNER_CONFIG['spiders']
+    mode = mode or RUNNER_CONFIG['mode']
+    processes = RUNNER_CONFIG['processes'] if processes is None else processes
+    if max_concurrency is None:
+        max_concurrency = RUNNER_CONFIG['max_concurrency']
+    unknown = [key for key in keys if key not in SPIDERS]
+    if unknown:
+        raise ValueError(
+            f"Spiders inconnus: {', '.join(unknown)} (disponibles: {', '.join(SPIDERS)})"
+        )
+
+    start_time = datetime.now()
+    logging.info(f"Démarrage du scraping ({', '.join(keys)}, mode {mode})...")
+    settings = get_project_settings()
+    classes = {key: load_object(SPIDERS[key]) for key in keys}
+    default_concurrency = settings.getint('CONCURRENT_REQUESTS')
+    budgets = concurrency_budgets(
+        {key: int((cls.custom_settings or {}).get('CONCURRENT_REQUESTS', default_concurrency))
+         for key, cls in classes.items()},
+        max_concurrency,
+        RUNNER_CONFIG['spider_concurrency']
+    )
+
+    # Spiders du reactor principal et spiders lancés chacun dans leur processus
+    shared = [key for key in keys if mode == 'reactor' and classes[key].SHARED_REACTOR]
+    isolated = [key for key in keys if key not in shared]
+
+    reports = []
+    executor = None
+    futures = {}
+    if isolated:
+        # spawn : pas de client MongoDB hérité ; un processus par spider (le reactor ne
+        # redémarre pas)
+        executor = ProcessPoolExecutor(max_workers=processes or len(isolated),
+                                       mp_context=multiprocessing.get_context('spawn'),
+                                       max_tasks_per_child=1)
+        futures = {key: executor.submit(crawl, [key], budgets) for key in isolated}
+    try:
+        if shared:
+            reports += crawl(shared, budgets)
+        for key, future in futures.items():
+            try:
+                reports += future.result()
+            except Exception as e:
+                logging.error(f"Erreur lors du scraping ({key}): {str(e)}")
+                reports.append({'spider': key, 'concurrency': budgets[key],
+                                'finish_reason': f"error: {e}"})
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    finish_time = datetime.now()
+    report = {
+        'started_at': start_time,
+        'finished_at': finish_time,
+        'duration_seconds': (finish_time - start_time).total_seconds(),
+        'mode': mode,
+        'max_concurrency': max_concurrency,
+        'items': sum(spider.get('items', 0) for spider in reports),
+        'spiders': sorted(reports, key=lambda spider: keys.index(spider['spider'])),
+    }
+    for spider in report['spiders']:
+        logging.info(f"{spider['spider']}: {spider.get('items', 0)} items "
+                     f"en {spider.get('duration_seconds')}s ({spider.get('concurrency')} requêtes "
+                     f"simultanées, {spider.get('finish_reason')})")
+    save_report(report)
+    logging.info(f"Scraping terminé en {finish_time - start_time}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('spiders', nargs='*',
+                        help=f"Spiders à lancer parmi {', '.join(SPIDERS)} "
+                             "(RUNNER_SPIDERS par défaut)")
+    parser.add_argument('--mode', choices=('reactor', 'processes'), help="RUNNER_MODE par défaut")
+    parser.add_argument('--processes', type=int,
+                        help="Taille du pool de processus (RUNNER_PROCESSES par défaut)")
+    parser.add_argument('--max-concurrency', type=int, help="Budget global de requêtes simultanées")
+    args = parser.parse_args()
+    unknown = [key for key in args.spiders if key not in SPIDERS]
+    if unknown:
+        parser.error(f"spiders inconnus: {', '.join(unknown)}")
+    run_spiders(args.spiders, args.mode, args.processes, args.max_concurrency)
+
+
+if __name__ == "__main__":
+    main()
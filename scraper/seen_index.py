@@ -0,0 +1,125 @@
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# Nombre maximum de paramètres d'une requête SQLite (limite par défaut des anciennes versions)
+SQLITE_MAX_VARIABLES = 900
+
+
+def price_key(price: Any) -> Optional[float]:
+    """Prix comparable d'un run à l'autre (float, Decimal ou Decimal128 de MongoDB)"""
+    if price is None:
+        return None
+    if hasattr(price, 'to_decimal'):
+        price = price.to_decimal()
+    try:
+        return round(float(price), 2)
+    except (TypeError, ValueError):
+        return None
+
+
+class SeenIndex:
+    """Index local des annonces déjà vues (URL -> prix), conservé entre les runs
+
+    Sert au crawl incrémental : une page dont toutes les annonces sont
+    connues avec le même prix n'apporte rien de nouveau. L'index est un
+    fichier SQLite partagé par les spiders (une clé par source et par URL).
+
+    Les pages sont comparées à l'index au parsing (``count_changed``) ; les
+    annonces n'y sont enregistrées qu'une fois leur lot écrit dans MongoDB
+    (``record``, appelé par le thread d'écriture).
+    """
+
+    def __init__(self, path: str, source: str):
+        """
+        Args:
+            path (str): Fichier SQLite de l'index
+            source (str): Nom du spider propriétaire des annonces
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None,
+                                          check_same_thread=False)
+        self.source = source
+        # Connexion partagée entre le parsing et le thread d'écriture
+        self._lock = threading.Lock()
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS seen (
+                source TEXT, listing_url TEXT, price REAL, seen_at TEXT,
+                PRIMARY KEY (source, listing_url)
+            )
+        """)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM seen WHERE source = ?", (self.source,)
+            ).fetchone()[0]
+
+    def known_prices(self, urls: Iterable[str]) -> Dict[str, Optional[float]]:
+        """Prix connus des URLs données (absentes si jamais vues)"""
+        urls = list(urls)
+        known = {}
+        for start in range(0, len(urls), SQLITE_MAX_VARIABLES):
+            chunk = urls[start:start + SQLITE_MAX_VARIABLES]
+            placeholders = ','.join('?' * len(chunk))
+            with self._lock:
+                rows = self.connection.execute(
+                    "SELECT listing_url, price FROM seen "
+                    f"WHERE source = ? AND listing_url IN ({placeholders})",
+                    (self.source, *chunk)
+                ).fetchall()
+            known.update(rows)
+        return known
+
+    def _upsert(self, listings: Iterable[Tuple[str, Optional[float]]]) -> None:
+        now = datetime.now().isoformat()
+        with self._lock:
+            self.connection.executemany(
+                "INSERT INTO seen (source, listing_url, price, seen_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (source, listing_url) "
+                "DO UPDATE SET price = excluded.price, seen_at = excluded.seen_at",
+                ((self.source, url, price, now) for url, price in listings)
+            )
+
+    def count_changed(self, listings: Dict[str, Any]) -> int:
+        """Compte les annonces d'une page nouvelles ou dont le prix a changé (sans modifier l'index)
+
+        Args:
+            listings (Dict[str, Any]): Prix des annonces de la page, par URL
+
+        Returns:
+            int: Nombre d'annonces nouvelles ou dont le prix a changé
+        """
+        listings = {url: price_key(price) for url, price in listings.items() if url}
+        known = self.known_prices(listings)
+        return sum(1 for url, price in listings.items() if url not in known or known[url] != price)
+
+    def record(self, listings: Iterable[Tuple[str, Any]]) -> None:
+        """Enregistre des annonces écrites en base (URL, prix)"""
+        self._upsert((url, price_key(price)) for url, price in listings if url)
+
+    def seed(self, listings: Iterable[Tuple[str, Any]]) -> int:
+        """Amorce l'index avec des annonces déjà connues (par exemple celles en base)"""
+        count = 0
+        batch = []
+        for url, price in listings:
+            if not url:
+                continue
+            batch.append((url, price_key(price)))
+            if len(batch) >= 10_000:
+                self._upsert(batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            self._upsert(batch)
+            count += len(batch)
+        logging.info(f"Index des annonces vues amorcé avec {count} annonces ({self.source})")
+        return count
+
+    def close(self) -> None:
+        self.connection.close()
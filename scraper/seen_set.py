@@ -0,0 +1,90 @@
+import hashlib
+import math
+from typing import Dict, Iterator, Optional
+
+
+class BloomFilter:
+    """Filtre de Bloom de taille fixe (bits dans un bytearray)
+
+    ``capacity`` clés peuvent être ajoutées avec un taux de faux positifs
+    d'au plus ``error_rate`` ; il n'y a jamais de faux négatif.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, digest: bytes) -> Iterator[int]:
+        # Double hachage (Kirsch-Mitzenmacher) à partir d'une seule empreinte de 128 bits
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def __contains__(self, digest: bytes) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(digest))
+
+    def add(self, digest: bytes) -> None:
+        bits = self.bits
+        for position in self._positions(digest):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+
+class RunSeenSet:
+    """Annonces déjà reçues pendant un run, en mémoire bornée
+
+    La même annonce revient sur plusieurs pages de résultats et dans les
+    départements voisins : seule sa première occurrence doit être écrite.
+    Les URLs sont gardées dans des filtres de Bloom chaînés : quand un filtre
+    est plein, un filtre deux fois plus grand (et deux fois plus strict) est
+    ajouté, si bien que le taux global de faux positifs reste sous
+    ``error_rate`` quel que soit le nombre d'annonces. Un faux positif
+    reporte l'écriture d'une annonce au run suivant.
+    """
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 1e-4):
+        """
+        Args:
+            capacity (int): Annonces prévues par run (taille du premier filtre)
+            error_rate (float): Taux maximal de faux positifs, tous filtres confondus
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        # Taux des filtres successifs : error_rate/2, error_rate/4... (somme < error_rate)
+        self.filters = [BloomFilter(capacity, error_rate / 2)]
+        self.checked = 0
+        self.duplicates = 0
+
+    def check_and_add(self, listing_url: Optional[str]) -> bool:
+        """Enregistre une annonce et indique si elle a déjà été reçue pendant ce run"""
+        if not listing_url:
+            return False
+        self.checked += 1
+        digest = hashlib.blake2b(listing_url.encode(), digest_size=16).digest()
+        if any(digest in bloom for bloom in self.filters):
+            self.duplicates += 1
+            return True
+
+        current = self.filters[-1]
+        if current.count >= current.capacity:
+            current = BloomFilter(current.capacity * 2, current.error_rate / 2)
+            self.filters.append(current)
+        current.add(digest)
+        return False
+
+    def stats(self) -> Dict:
+        return {
+            'checked': self.checked,
+            'duplicates': self.duplicates,
+            'hit_rate': round(self.duplicates / self.checked, 4) if self.checked else 0.0,
+            'filters': len(self.filters),
+            'memory_bytes': sum(len(bloom.bits) for bloom in self.filters),
+            'error_rate': self.error_rate,
+        }
@@ -0,0 +1,136 @@
+import json
+import logging
+from typing import Dict, List, Optional
+
+# Colonnes écrites par le sink Spark, dans l'ordre des lignes du DataFrame
+SPARK_SINK_COLUMNS = [
+    'listing_url', 'source', 'department', 'price', 'price_per_m2', 'surface_m2', 'rooms',
+    'bedrooms', 'address', 'city', 'postal_code', 'property_type', 'description', 'features',
+    'date_mutation', 'first_seen_at', 'last_seen_at',
+]
+
+
+def build_spark_session(app_name: str, master: str = 'local[*]', driver_memory: str = '2g',
+                        packages: Optional[str] = None, mongo_uri: Optional[str] = None):
+    """Crée (ou récupère) la session Spark des scrapers
+
+    L'import de pyspark est local : le mode pur Python ne démarre jamais de JVM.
+    """
+    from pyspark.conf import SparkConf
+    from pyspark.sql import SparkSession
+
+    logging.getLogger('pyspark').setLevel(logging.WARNING)
+    conf = SparkConf() \
+        .setAppName(app_name) \
+        .setMaster(master) \
+        .set("spark.driver.memory", driver_memory) \
+        .set("spark.executor.memory", driver_memory)
+    if packages:
+        conf = conf.set("spark.jars.packages", packages)
+    if mongo_uri:
+        conf = conf.set("spark.mongodb.write.connection.uri", mongo_uri)
+
+    return SparkSession.builder \
+        .config(conf=conf) \
+        .getOrCreate()
+
+
+def _spark_schema():
+    from pyspark.sql.types import (
+        DoubleType, LongType, StringType, StructField, StructType, TimestampType
+    )
+
+    types = {
+        'price': DoubleType(), 'price_per_m2': DoubleType(), 'surface_m2': DoubleType(),
+        'rooms': LongType(), 'bedrooms': LongType(),
+        'first_seen_at': TimestampType(), 'last_seen_at': TimestampType(),
+    }
+    return StructType([StructField(name, types.get(name, StringType()), True)
+                       for name in SPARK_SINK_COLUMNS])
+
+
+def to_row(record: Dict, source: str) -> tuple:
+    """Convertit une propriété en ligne du DataFrame (types fixes, features en JSON)"""
+    row = []
+    for name in SPARK_SINK_COLUMNS:
+        value = source if name == 'source' else record.get(name)
+        if value is not None:
+            if name in ('price', 'price_per_m2', 'surface_m2'):
+                value = float(value)
+            elif name in ('rooms', 'bedrooms'):
+                value = int(value)
+            elif name == 'features':
+                value = json.dumps(value, default=str, ensure_ascii=False) if value else None
+            elif name not in ('first_seen_at', 'last_seen_at'):
+                value = str(value)
+        row.append(value)
+    return tuple(row)
+
+
+class SparkMongoSink:
+    """Sink optionnel écrivant les propriétés dans MongoDB via le connecteur Spark
+
+    Même interface que ``ParquetLandingZone`` (``add``/``flush``). La session
+    Spark n'est créée qu'au premier lot réellement écrit : un spider configuré
+    sans sink Spark ne charge ni pyspark ni la JVM.
+    """
+
+    def __init__(self, app_name: str, mongo_uri: str, database: str, collection: str,
+                 master: str = 'local[*]', driver_memory: str = '2g',
+                 packages: Optional[str] = None, rows_per_flush: int = 50_000):
+        self.app_name = app_name
+        self.mongo_uri = mongo_uri
+        self.database = database
+        self.collection = collection
+        self.master = master
+        self.driver_memory = driver_memory
+        self.packages = packages
+        self.rows_per_flush = rows_per_flush
+        self.rows_written = 0
+        self._rows: List[tuple] = []
+        self._spark = None
+
+    @property
+    def spark(self):
+        """Session Spark, créée au premier accès"""
+        if self._spark is None:
+            logging.info('Initialisation de la session Spark...')
+            self._spark = build_spark_session(
+                self.app_name, master=self.master, driver_memory=self.driver_memory,
+                packages=self.packages, mongo_uri=self.mongo_uri
+            )
+            logging.info("Spark session created successfully.")
+        return self._spark
+
+    def add(self, records: List[Dict], source: str) -> None:
+        """Ajoute des propriétés au tampon et l'écrit s'il est plein"""
+        self._rows.extend(to_row(record, source) for record in records)
+        if len(self._rows) >= self.rows_per_flush:
+            self.flush()
+
+    def flush(self) -> None:
+        """Écrit le tampon dans la collection cible (upsert sur listing_url)"""
+        if not self._rows:
+            return
+        rows, self._rows = self._rows, []
+        df = self.spark.createDataFrame(rows, schema=_spark_schema())
+        df.write.format("mongodb") \
+            .mode("append") \
+            .option("connection.uri", self.mongo_uri) \
+            .option("database", self.database) \
+            .option("collection", self.collection) \
+            .option("operationType", "replace") \
+            .option("idFieldList", "listing_url") \
+            .save()
+        self.rows_written += len(rows)
+        logging.info(f"{len(rows)} propriétés écrites par Spark dans "
+                     f"{self.database}.{self.collection}")
+
+    def close(self) -> None:
+        """Écrit le tampon restant puis arrête la session Spark si elle a été créée"""
+        try:
+            self.flush()
+        finally:
+            if self._spark is not None:
+                self._spark.stop()
+                self._spark = None
@@ -1,145 +1,492 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
-from decimal import Decimal
 import logging
-import pymongo
-from typing import Dict, List, Any
+import socket
+from typing import Dict, Any, Callable, Iterator, List
 import os
-import uuid
 from datetime import timedelta
 
-from config import MONGO_CONFIG
+from scrapy import signals
+from scrapy.exceptions import DontCloseSpider
+from twisted.internet import task
+
+from batching import AdaptiveBatchPolicy
+from config import (BATCH_CONFIG, CHECKPOINT_CONFIG, FINGERPRINT_CONFIG, INCREMENTAL_CONFIG,
+                    LANDING_ZONE_CONFIG, MONGO_CONFIG, PAYLOAD_ARCHIVE_CONFIG, RATE_CONTROL_CONFIG,
+                    RUN_DEDUP_CONFIG, SPARK_SINK_CONFIG, WORK_QUEUE_CONFIG, WRITER_CONFIG)
+from crawl_checkpoint import CrawlCheckpoint
+from fingerprint import FingerprintIndex
+from middlewares import HTTP_FIXTURE_MIDDLEWARES, RATE_CONTROL_MIDDLEWARES
+from mongo_pool import acquire_client, mongo_uri, release_client
+from mongo_indexes import ensure_indexes, mark_inactive_listings, remove_duplicate_listings
+from payload_archive import PayloadArchive
+from pipelines import PROPERTY_PIPELINES
+from property_store import PropertyStore
+from rate_control import RateControl
+from run_spiders import register_interrupt_handler, unregister_interrupt_handler
+from seen_index import SeenIndex
+from seen_set import RunSeenSet
+from writer import WriteFailure
+from work_queue import MongoWorkQueue, SqliteWorkQueue, claim_batch, has_open_jobs
 
 class RealEstateSpider(ABC):
     """Classe de base abstraite pour les spiders immobiliers"""
 
+    # Écriture des propriétés dans MongoDB (désactivable quand seule la zone Parquet est utile)
+    MONGO_SINK = True
+    # Pagination compatible avec le crawl incrémental (INCREMENTAL_CRAWL)
+    INCREMENTAL_CRAWL = True
+    # Une annonce vue plusieurs fois pendant le run (pages, départements voisins) n'est écrite
+    # qu'une fois
+    RUN_DEDUP = True
+    # Peut partager le reactor d'autres spiders dans run_spiders.py (sinon processus dédié)
+    SHARED_REACTOR = True
+    # Annonces non revues depuis 30 jours désactivées en fin de run (sources d'annonces en ligne)
+    SWEEP_INACTIVE = True
 
+    # Les items produits sont persistés par PropertyPipeline, les requêtes cadencées par hôte
+    custom_settings = {
+        'ITEM_PIPELINES': PROPERTY_PIPELINES,
+        'DOWNLOADER_MIDDLEWARES': {**RATE_CONTROL_MIDDLEWARES, **HTTP_FIXTURE_MIDDLEWARES},
+    }
 
-    def get_checkpoint_location(self):
-        checkpoint_base = "/opt/bitnami/spark/work/checkpoint"
-        checkpoint_dir = os.path.join(checkpoint_base, str(uuid.uuid4()))
-        os.makedirs(checkpoint_dir, exist_ok=True)
-        return checkpoint_dir
-    
     def __init__(self):
-        self.properties = []
-        self.properties_scraped = 0
-        self.properties_new = 0
-        self.properties_updated = 0
         self.pages_scraped = 0
         self.start_time = datetime.now()
-        
+        self._shutdown_requested = False
+        # Ctrl+C relayé par le gestionnaire unique de run_spiders.py (reactor partagé)
+        register_interrupt_handler(self._handle_sigint)
+        self._init_rate_control()
+
         # Initialisation MongoDB
         self._init_mongodb()
-        
+        self._init_landing_zone()
+        self._init_spark_sink()
+        self._init_payload_archive()
+        self._init_work_queue()
+        self._init_checkpoint()
+        self._init_seen_index()
+
+        # Persistance par lots, alimentée par PropertyPipeline (ou directement par les workers DVF)
+        self.store = PropertyStore(
+            self.mongo_collection,
+            self.name,
+            landing_zone=self.landing_zone,
+            mongo_sink=self.MONGO_SINK,
+            # Taille des lots ajustée selon leur poids BSON et la latence des écritures
+            batch_policy=AdaptiveBatchPolicy(**BATCH_CONFIG),
+            # Empreintes de contenu pour ne réécrire que les annonces modifiées
+            fingerprints=FingerprintIndex(self.mongo_collection, FINGERPRINT_CONFIG['cache_size'])
+            if FINGERPRINT_CONFIG['enabled'] else None,
+            writer_threads=WRITER_CONFIG['threads'],
+            max_pending_batches=WRITER_CONFIG['max_pending_batches'],
+            sinks=[self.payload_archive, self.spark_sink],
+            seen=RunSeenSet(RUN_DEDUP_CONFIG['capacity'], RUN_DEDUP_CONFIG['error_rate'])
+            if RUN_DEDUP_CONFIG['enabled'] and self.RUN_DEDUP else None,
+            # Crawl incrémental : l'index ne retient que les annonces effectivement écrites
+            seen_index=self.seen_index
+        )
+
+    def _init_rate_control(self):
+        """Crée les contrôleurs de cadence des hôtes ciblés (utilisés par AdaptiveRateMiddleware)"""
+        defaults = {
+            'window': RATE_CONTROL_CONFIG['window'],
+            'max_error_rate': RATE_CONTROL_CONFIG['max_error_rate'],
+        }
+        self.rate_control = RateControl(
+            {host: {**defaults, **params} for host, params in RATE_CONTROL_CONFIG['hosts'].items()},
+            enabled=RATE_CONTROL_CONFIG['enabled']
+        )
+
     def _init_mongodb(self):
         """Initialise la connexion MongoDB"""
         logging.info(f"Connecting to MongoDB at {MONGO_CONFIG['host']}:{MONGO_CONFIG['port']}")
-        mongo_uri = f"mongodb://{MONGO_CONFIG['user']}:{MONGO_CONFIG['password']}@{MONGO_CONFIG['host']}:{MONGO_CONFIG['port']}/{MONGO_CONFIG['database']}"
+        self.mongo_uri = mongo_uri()
         
         try:
-            self.mongo_client = pymongo.MongoClient(mongo_uri)
+            # Client partagé avec les autres spiders du processus (run_spiders.py)
+            self.mongo_client = acquire_client(self.mongo_uri)
             self.mongo_db = self.mongo_client[MONGO_CONFIG['database']]
             self.mongo_collection = self.mongo_db['real_estate']
             logging.info("Successfully connected to MongoDB")
             
-            # Create unique index on listing_url if it doesn't exist
-            self.mongo_collection.create_index("listing_url", unique=True)
-            logging.info("Created unique index on listing_url in MongoDB")
+            # Unique index on listing_url and the compound index used by the lifecycle sweep
+            ensure_indexes(self.mongo_collection)
+            logging.info("Ensured real_estate indexes in MongoDB")
         except Exception as e:
             logging.error(f"Error initializing MongoDB: {str(e)}")
             raise
     
-    def save_properties(self):
-        """Sauvegarde les propriétés dans MongoDB"""
-        if not self.properties:
+    def _init_landing_zone(self):
+        """Initialise la zone d'atterrissage Parquet si elle est activée"""
+        self.landing_zone = None
+        if LANDING_ZONE_CONFIG['enabled']:
+            # Import local : pyarrow n'est nécessaire que si la zone d'atterrissage est utilisée
+            from landing_zone import ParquetLandingZone
+            self.landing_zone = ParquetLandingZone(
+                LANDING_ZONE_CONFIG['path'],
+                compression=LANDING_ZONE_CONFIG['compression']
+            )
+            logging.info(f"Landing zone enabled at {LANDING_ZONE_CONFIG['path']}")
+
+    def _init_spark_sink(self):
+        """Configure le sink Spark s'il est activé (la session n'est créée qu'au premier lot)"""
+        self.spark_sink = None
+        if SPARK_SINK_CONFIG['enabled']:
+            from spark_sink import SparkMongoSink
+            self.spark_sink = SparkMongoSink(
+                self.name,
+                self.mongo_uri,
+                MONGO_CONFIG['database'],
+                SPARK_SINK_CONFIG['collection'],
+                master=SPARK_SINK_CONFIG['master'],
+                driver_memory=SPARK_SINK_CONFIG['driver_memory'],
+                packages=SPARK_SINK_CONFIG['packages'],
+                rows_per_flush=SPARK_SINK_CONFIG['rows_per_flush']
+            )
+            logging.info(f"Spark sink enabled "
+                         f"({MONGO_CONFIG['database']}.{SPARK_SINK_CONFIG['collection']})")
+
+    def _init_payload_archive(self):
+        """Configure l'archive des annonces brutes, écrite comme un sink du PropertyStore"""
+        self.payload_archive = None
+        if PAYLOAD_ARCHIVE_CONFIG['enabled']:
+            self.payload_archive = PayloadArchive(
+                self.mongo_db[PAYLOAD_ARCHIVE_CONFIG['collection']],
+                level=PAYLOAD_ARCHIVE_CONFIG['level'],
+                writer_threads=WRITER_CONFIG['threads'],
+                max_pending_batches=WRITER_CONFIG['max_pending_batches']
+            )
+
+    def _init_work_queue(self):
+        """Configure la file de travail partagée entre réplicas si elle est activée"""
+        self.work_queue = None
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        self._jobs: List[Dict] = []
+        # Lots en échec au moment de la réservation du lot de jobs courant
+        self._jobs_failed_batches = 0
+        # Fabrique des requêtes d'un département (voir ``department_start_requests``)
+        self._department_requests = None
+        self._heartbeat = None
+        if not WORK_QUEUE_CONFIG['enabled']:
             return
-            
+        run_id = WORK_QUEUE_CONFIG['run_id']
+        if not run_id:
+            # Une date ne distingue pas deux lancements du même jour, ni un crawl qui passe minuit
+            raise ValueError("WORK_QUEUE_RUN_ID must be set when WORK_QUEUE_ENABLED is true")
+        options = {
+            'lease_seconds': WORK_QUEUE_CONFIG['lease_seconds'],
+            'max_attempts': WORK_QUEUE_CONFIG['max_attempts'],
+        }
+        if WORK_QUEUE_CONFIG['backend'] == 'sqlite':
+            self.work_queue = SqliteWorkQueue(WORK_QUEUE_CONFIG['path'], self.name, run_id,
+                                              **options)
+        else:
+            self.work_queue = MongoWorkQueue(self.mongo_db['crawl_jobs'], self.name, run_id,
+                                             **options)
+        logging.info(f"Work queue enabled ({WORK_QUEUE_CONFIG['backend']}, run {run_id}, "
+                     f"worker {self.worker_id})")
+
+    def _init_checkpoint(self):
+        """Charge le checkpoint du spider (reprise après un arrêt) s'il est activé"""
+        self.checkpoint = None
+        if CHECKPOINT_CONFIG['enabled']:
+            # Avec la file de travail, chaque réplica a son fichier : ils ne s'écrasent pas leur
+            # progression
+            filename = f"{self.name}.json"
+            if self.work_queue is not None:
+                filename = f"{self.name}-{self.worker_id}.json"
+            self.checkpoint = CrawlCheckpoint(
+                os.path.join(CHECKPOINT_CONFIG['path'], filename),
+                interval=CHECKPOINT_CONFIG['interval']
+            )
+
+    def _init_seen_index(self):
+        """Ouvre l'index des annonces vues si le crawl incrémental est activé"""
+        self.seen_index = None
+        self.incremental_stats = {'pages': 0, 'listings': 0, 'changed': 0, 'early_stops': 0}
+        if not (INCREMENTAL_CONFIG['enabled'] and self.INCREMENTAL_CRAWL):
+            return
+        self.seen_index = SeenIndex(INCREMENTAL_CONFIG['path'], self.name)
+        if not len(self.seen_index):
+            # Premier crawl incrémental : les annonces déjà en base ne sont pas « nouvelles »
+            self.seen_index.seed(
+                (doc.get('listing_url'), doc.get('price'))
+                for doc in self.mongo_collection.find({'source': self.name},
+                                                      {'_id': 0, 'listing_url': 1, 'price': 1})
+            )
+        logging.info(f"Incremental crawl enabled (stop after "
+                     f"{INCREMENTAL_CONFIG['stop_after_pages']} pages without new listings)")
+
+    def update_stale_pages(self, listings: Dict[str, Any], stale_pages: int) -> int:
+        """Compare les annonces d'une page à l'index des annonces vues
+
+        Args:
+            listings (Dict[str, Any]): Prix des annonces de la page, par URL
+            stale_pages (int): Pages consécutives sans nouveauté avant celle-ci
+
+        Returns:
+            int: Pages consécutives sans nouveauté, celle-ci comprise (0 hors crawl incrémental)
+        """
+        if self.seen_index is None:
+            return 0
+        # Lecture seule : l'index est mis à jour par le store après l'écriture du lot
+        changed = self.seen_index.count_changed(listings)
+        self.incremental_stats['pages'] += 1
+        self.incremental_stats['listings'] += len(listings)
+        self.incremental_stats['changed'] += changed
+        return 0 if changed else stale_pages + 1
+
+    def stop_paginating(self, department: str, page: int, stale_pages: int) -> bool:
+        """Indique si le crawl incrémental peut arrêter la pagination d'un département"""
+        if self.seen_index is None or stale_pages < INCREMENTAL_CONFIG['stop_after_pages']:
+            return False
+        logging.info(f"Département {department} - {stale_pages} pages sans nouvelle annonce, "
+                     f"arrêt à la page {page} (crawl incrémental)")
+        self.incremental_stats['early_stops'] += 1
+        return True
+
+    def checkpoint_department(self, department: str, max_pages: int, **params):
+        """Enregistre le nombre de pages d'un département (et de quoi redemander ses pages)"""
+        if self.checkpoint is not None:
+            self.checkpoint.start_department(department, max_pages, **params)
+
+    def checkpoint_page(self, department: str, page: int, last: bool = False):
+        """Marque une page comme traitée (``last`` : le département est terminé)"""
+        if self.checkpoint is None:
+            return
+        if last:
+            self.checkpoint.department_done(department)
+        else:
+            self.checkpoint.page_done(department, page)
+        if self.checkpoint.due():
+            # Propriétés écrites d'abord : une page marquée traitée est forcément persistée
+            if self.writes_succeeded():
+                self.checkpoint.save()
+
+    def writes_succeeded(self) -> bool:
+        """Écrit les propriétés en attente et indique si aucun lot n'a échoué pendant le run
+
+        Après un lot en échec, la progression en mémoire couvre des pages non
+        écrites : le checkpoint n'est plus enregistré (la reprise repartira du
+        dernier checkpoint sain).
+        """
         try:
-            # Prepare MongoDB bulk operations
-            bulk_ops = []
-            for prop in self.properties:
-                # Convert Decimal to float for MongoDB
-                mongo_doc = {key: float(value) if isinstance(value, Decimal) else value 
-                           for key, value in prop.items()}
-                
-                # Define update operation
-                filter_doc = {'listing_url': mongo_doc['listing_url']}
-                update_doc = {
-                    '$set': {
-                        'source': self.name,
-                        'department': mongo_doc['department'],
-                        'price': mongo_doc['price'],
-                        'price_per_m2': mongo_doc['price_per_m2'],
-                        'surface_m2': mongo_doc['surface_m2'],
-                        'rooms': mongo_doc['rooms'],
-                        'bedrooms': mongo_doc['bedrooms'],
-                        'address': mongo_doc['address'],
-                        'city': mongo_doc['city'],
-                        'postal_code': mongo_doc['postal_code'],
-                        'property_type': mongo_doc['property_type'],
-                        'features': mongo_doc['features'],
-                        'description': mongo_doc['description'],
-                        'last_seen_at': mongo_doc['last_seen_at'],
-                        'is_active': True
-                    },
-                    '$setOnInsert': {
-                        'first_seen_at': mongo_doc['first_seen_at']
-                    },
-                    '$inc': {'update_count': 1}
-                }
-                
-                bulk_ops.append(pymongo.UpdateOne(filter_doc, update_doc, upsert=True))
-            
-            # Execute bulk write operation
-            if bulk_ops:
-                result = self.mongo_collection.bulk_write(bulk_ops, ordered=False)
-                self.properties_scraped += len(self.properties)
-                self.properties_new += result.upserted_count
-                self.properties_updated += result.modified_count
-                logging.info(f"Batch save complete - Inserted: {result.upserted_count}, Modified: {result.modified_count}, Matched: {result.matched_count}")
-                
-            # Clear properties after successful save
-            self.properties = []
-            
-        except pymongo.errors.BulkWriteError as bwe:
-            logging.error(f"Bulk write error: {bwe.details}")
-        except Exception as e:
-            logging.error(f"Error in save_properties: {str(e)}")
+            self.flush_pending_writes()
+        except WriteFailure as e:
+            logging.error(f"Écritures MongoDB en échec: {str(e)}")
+        if not self.store.failed_batches:
+            return True
+        if self.checkpoint is not None:
+            logging.warning(f"{self.store.failed_batches} lots non écrits : "
+                            f"checkpoint désactivé pour ce run")
+            self.checkpoint = None
+        return False
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        if getattr(spider, 'work_queue', None) is not None:
+            # Lot de départements terminé : on en réserve d'autres avant la fermeture du spider
+            crawler.signals.connect(spider._on_spider_idle, signal=signals.spider_idle)
+        return spider
+
+    def department_start_requests(self, departments: List[str],
+                                  department_requests: Callable[[str], Iterator]) -> Iterator:
+        """Requêtes de départ : tous les départements, ou ceux réservés dans la file de travail
+
+        Args:
+            departments (List[str]): Départements à parcourir
+            department_requests (Callable): Requêtes de départ d'un département
+                (reprise aussi pour les lots réservés ensuite)
+        """
+        if self.work_queue is None:
+            for department in departments:
+                yield from department_requests(department)
+            return
+        self._department_requests = department_requests
+        self.work_queue.seed(departments)
+        yield from self._claim_jobs()
+
+    def _claim_jobs(self) -> Iterator:
+        self._jobs = claim_batch(self.work_queue, self.worker_id, WORK_QUEUE_CONFIG['batch_size'])
+        self._jobs_failed_batches = self.store.failed_batches
+        if self._jobs and self._heartbeat is None:
+            self._heartbeat = task.LoopingCall(self._renew_leases)
+            self._heartbeat.start(max(1, WORK_QUEUE_CONFIG['lease_seconds'] // 3), now=False)
+        for job in self._jobs:
+            yield from self._department_requests(job['key'])
+
+    def _renew_leases(self):
+        for job in self._jobs:
+            try:
+                if not self.work_queue.heartbeat(job):
+                    logging.warning(f"Bail perdu pour le job {job['key']} "
+                                    f"(repris par un autre worker)")
+            except Exception as e:
+                logging.error(f"Erreur lors du heartbeat du job {job['key']}: {str(e)}")
+
+    def _on_spider_idle(self):
+        """Plus aucune requête en cours : le lot est terminé, on réserve le suivant"""
+        if self._shutdown_requested:
+            # Lot interrompu : closed() rend les jobs à la file
+            return
+        # Propriétés écrites d'abord : un job terminé est forcément persisté
+        try:
+            self.flush_pending_writes()
+        except WriteFailure as e:
+            logging.error(f"Écritures MongoDB en échec: {str(e)}")
+        if self.store.failed_batches == self._jobs_failed_batches:
+            for job in self._jobs:
+                self.work_queue.complete(job)
+        else:
+            # Lots du lot de jobs non écrits : les départements seront retentés
+            failed = self.store.failed_batches - self._jobs_failed_batches
+            logging.error(f"{failed} lots non écrits, "
+                          f"jobs {[job['key'] for job in self._jobs]} rendus à la file")
+            for job in self._jobs:
+                self.work_queue.release(job, error='write_failed')
+        self._jobs = []
+
+        requests = list(self._claim_jobs())
+        for request in requests:
+            self.crawler.engine.crawl(request)
+        if requests:
+            raise DontCloseSpider
+        # Jobs encore réservés par d'autres réplicas : on attend, pour reprendre ceux dont le bail
+        # expire
+        if has_open_jobs(self.work_queue.counts()):
+            raise DontCloseSpider
+
+    def _release_jobs(self, reason):
+        """Rend les jobs non terminés à la file (arrêt avant la fin du lot)"""
+        if self._heartbeat is not None and self._heartbeat.running:
+            self._heartbeat.stop()
+        for job in self._jobs:
+            try:
+                self.work_queue.release(job, error=reason)
+            except Exception as e:
+                logging.error(f"Erreur lors de la libération du job {job['key']}: {str(e)}")
+        self._jobs = []
+
+    @property
+    def spark(self):
+        """Session Spark du sink Spark, créée au premier accès (None en mode pur Python)"""
+        spark_sink = getattr(self, 'spark_sink', None)
+        return spark_sink.spark if spark_sink is not None else None
+
+    def flush_pending_writes(self, close=False):
+        """Écrit les propriétés en attente et attend la fin des écritures en arrière-plan
+
+        Args:
+            close (bool): Arrête aussi les threads d'écriture (fin du spider)
+        """
+        if close:
+            self.store.close()
+        else:
+            self.store.flush()
+
+    def _handle_sigint(self, signum, frame):
+        """Vide les écritures en attente et arrête la pagination
+
+        Appelé par le gestionnaire SIGINT de run_spiders.py, qui arrête ensuite
+        tous les crawlers du reactor (closed() enregistre les statistiques).
+        """
+        logging.info("Received SIGINT, flushing remaining properties...")
+        self._shutdown_requested = True
+        try:
+            self.flush_pending_writes()
+            logging.info("Saved all remaining data. Shutting down...")
+        except WriteFailure as e:
+            logging.error(f"Some data could not be saved: {str(e)}")
 
     def closed(self, reason):
         """Called when the spider is closed"""
+        unregister_interrupt_handler(self._handle_sigint)
         duration = datetime.now() - self.start_time
         
-        # Save any remaining properties
-        if self.properties:
-            self.save_properties()
-        
+        # Save any remaining properties and wait for the background writes
+        # (normally already done by PropertyPipeline.close_spider)
+        try:
+            self.flush_pending_writes(close=True)
+        except WriteFailure as e:
+            logging.error(f"Écritures MongoDB en échec: {str(e)}")
+        store = self.store
+        if store.failed_batches and self.checkpoint is not None:
+            # Progression non fiable : le prochain run reprend au dernier checkpoint enregistré
+            logging.warning(f"{store.failed_batches} lots non écrits : "
+                            f"checkpoint conservé en l'état")
+            self.checkpoint = None
+        if self.work_queue is not None:
+            self._release_jobs(reason)
+        if self.checkpoint is not None:
+            # Crawl complet : le prochain run repart de zéro ; sinon il reprendra ici
+            if reason == 'finished':
+                self.checkpoint.clear()
+            else:
+                self.checkpoint.flush()
+
         # Log final statistics
         logging.info(f"\nScraping completed - {reason}")
-        logging.info(f"Total properties scraped: {self.properties_scraped}")
+        logging.info(f"Total properties scraped: {store.properties_scraped}")
+        logging.info(f"New properties: {store.properties_new}")
+        logging.info(f"Updated properties: {store.properties_updated}")
+        logging.info(f"Unchanged properties (last_seen_at only): {store.properties_unchanged}")
         logging.info(f"Total pages scraped: {self.pages_scraped}")
+        if store.failed_batches:
+            logging.error(f"Failed write batches: {store.failed_batches}")
+        if store.seen is not None:
+            logging.info(f"Duplicate listings skipped during the run: {store.seen.duplicates}")
         logging.info(f"Duration: {duration}")
-        logging.info(f"Average properties per page: {self.properties_scraped / max(1, self.pages_scraped):.2f}")
-        logging.info(f"Average time per property: {duration.total_seconds() / max(1, self.properties_scraped):.2f} seconds")
+        logging.info(f"Average properties per page: "
+                     f"{store.properties_scraped / max(1, self.pages_scraped):.2f}")
+        logging.info(f"Average time per property: "
+                     f"{duration.total_seconds() / max(1, store.properties_scraped):.2f} seconds")
         
         try:
-            # Mark inactive listings
-            cutoff_time = datetime.now() - timedelta(days=30)  # Properties not seen in 30 days
-            result = self.mongo_collection.update_many(
-                {"last_seen_at": {"$lt": cutoff_time}, "is_active": True},
-                {"$set": {"is_active": False}}
-            )
-            logging.info(f"Marked {result.modified_count} listings as inactive")
+            inactive = 0
+            if self.SWEEP_INACTIVE and self.seen_index is None and not store.failed_batches:
+                # Mark inactive listings of this source in the departments crawled during this run
+                # (skipped for incremental crawls: older listings are not visited again,
+                # and after failed writes: listings seen this run may not have their last_seen_at)
+                cutoff_time = datetime.now() - timedelta(days=30)  # Properties not seen in 30 days
+                inactive = mark_inactive_listings(self.mongo_collection, self.name,
+                                                  store.crawled_departments, cutoff_time)
+                logging.info(f"Marked {inactive} listings as inactive")
+
+            # Duplicates can only exist if the unique index is missing
+            duplicates_removed = remove_duplicate_listings(self.mongo_collection)
+            if duplicates_removed > 0:
+                logging.info(f"Removed {duplicates_removed} duplicate listings from MongoDB")
             
             # Save final statistics
             stats_doc = {
                 'timestamp': datetime.now(),
+                'source': self.name,
                 'duration_seconds': duration.total_seconds(),
-                'total_properties': self.properties_scraped,
+                'total_properties': store.properties_scraped,
+                'new_properties': store.properties_new,
+                'updated_properties': store.properties_updated,
+                'unchanged_properties': store.properties_unchanged,
+                # Lots MongoDB en échec : les propriétés correspondantes n'ont pas été écrites
+                'failed_batches': store.failed_batches,
+                'inactive_properties': inactive,
                 'total_pages': self.pages_scraped,
-                'properties_per_page': self.properties_scraped / max(1, self.pages_scraped),
-                'time_per_property': duration.total_seconds() / max(1, self.properties_scraped),
+                # État de la file de travail partagée (jobs par état) pour ce crawl
+                'work_queue': self.work_queue.counts() if self.work_queue is not None else None,
+                'properties_per_page': store.properties_scraped / max(1, self.pages_scraped),
+                'time_per_property': duration.total_seconds() / max(1, store.properties_scraped),
+                'batching': store.batch_policy.stats(),
+                # Cadence finale par hôte et motifs des ajustements successifs
+                'rate_control': self.rate_control.stats(),
+                # Crawl incrémental : pages comparées à l'index, annonces nouvelles ou modifiées,
+                # arrêts anticipés
+                'incremental': self.incremental_stats if self.seen_index is not None else None,
+                # Annonces brutes archivées (nouvelles ou modifiées) et taux de compression
+                'payload_archive': (self.payload_archive.stats()
+                                    if self.payload_archive is not None else None),
+                # Annonces reçues plusieurs fois pendant le run, écartées avant les lots d'écriture
+                'dedup': store.seen.stats() if store.seen is not None else None,
                 'reason': reason
             }
             
@@ -149,37 +496,19 @@ class RealEstateSpider(ABC):
         except Exception as e:
             logging.info(f"Error in cleanup: {str(e)}")
         finally:
-            if self.mongo_client:
-                self.mongo_client.close()
-
-        # Remove duplicates in MongoDB
-        try:
-            result = self.mongo_collection.aggregate([
-                {"$group": {
-                    "_id": "$listing_url",
-                    "doc_id": {"$first": "$_id"},
-                    "count": {"$sum": 1}
-                }},
-                {"$match": {"count": {"$gt": 1}}}
-            ])
-            
-            duplicates_removed = 0
-            for doc in result:
-                delete_result = self.mongo_collection.delete_many({
-                    "listing_url": doc["_id"],
-                    "_id": {"$ne": doc["doc_id"]}
-                })
-                duplicates_removed += delete_result.deleted_count
-            
-            if duplicates_removed > 0:
-                logging.info(f"Removed {duplicates_removed} duplicate listings from MongoDB")
-        except Exception as e:
-            logging.info(f"Error removing duplicates from MongoDB: {str(e)}")
+            if self.seen_index is not None:
+                self.seen_index.close()
+            release_client(self.mongo_client)
     
     @abstractmethod
     def start_requests(self):
-        """Point d'entrée pour le scraping"""
+        """Point d'entrée pour le scraping (requêtes et/ou items)"""
         pass
+
+    async def start(self):
+        """Point d'entrée de Scrapy >= 2.13, qui n'appelle plus start_requests"""
+        for request_or_item in self.start_requests():
+            yield request_or_item
         
     @abstractmethod
     def parse(self, response) -> Dict[str, Any]:
@@ -1,24 +1,26 @@
 import os
 from datetime import datetime, timedelta
-from urllib.parse import urljoin
+from urllib.parse import urlencode
 import logging
+from config import RATE_CONTROL_CONFIG, ZONE_CACHE_CONFIG
+from items import PropertyItem
+from middlewares import HTTP_FIXTURE_MIDDLEWARES, RATE_CONTROL_MIDDLEWARES
+from pipelines import PROPERTY_PIPELINES
 from spiders.base_spider import RealEstateSpider
+from utils import loads_json
+from zone_cache import ZoneIdCache
 
 import pymongo
 import scrapy
-import requests
 import json
 import decimal
+import math
 # Configuration du logger
 # logging.basicConfig(level=logging.DEBUG)
 
 # Désactiver les logs de debug MongoDB
 logging.getLogger('pymongo').setLevel(logging.WARNING)
 logging.getLogger('urllib3').setLevel(logging.WARNING)
-logging.getLogger('pyspark').setLevel(logging.WARNING)
-from pyspark.sql import SparkSession
-from pyspark.conf import SparkConf
-import signal
 
 from dotenv import load_dotenv
 import os
@@ -35,53 +37,120 @@ MONGO_CONFIG = {
     'password': os.getenv('MONGO_PASSWORD', 'admin')
 }
 
+# Départements parcourus : 01 à 95 puis la Corse
+BIENICI_DEPARTMENTS = [f"{dept:02}" for dept in range(1, 96)] + ['2a', '2b']
+
+
+# Traduction des types de biens Bien'ici
+PROPERTY_TYPE_MAPPING = {
+    'house': 'maison',
+    'flat': 'appartement',
+    'programme': 'programme',
+    'loft': 'loft',
+    'castle': 'château',
+    'townhouse': 'maison de ville',
+}
+
+# Champs de l'annonce conservés dans ``features`` (photos, textes et métadonnées d'affichage ne
+# sont pas stockés)
+FEATURE_FIELDS = (
+    'id', 'reference', 'propertyType', 'newProperty', 'roomsQuantity', 'bedroomsQuantity',
+    'surfaceArea', 'landSurfaceArea', 'floor', 'floorQuantity', 'hasElevator', 'hasBalcony',
+    'hasTerrace', 'hasGarden', 'hasPool', 'hasCellar', 'parkingPlacesQuantity', 'heating',
+    'exposition', 'yearOfConstruction', 'energyClassification', 'energyValue',
+    'greenhouseGazClassification', 'greenhouseGazValue',
+    'publicationDate', 'modificationDate',
+)
+
+
+def _mean(value):
+    """Valeur d'un champ numérique (moyenne des lots quand l'annonce en regroupe plusieurs)"""
+    if isinstance(value, list):
+        return sum(filter(None, value)) / len(value) if value else 0
+    return value
+
+
+def project_ad(ad, department, seen_at):
+    """Convertit une annonce de realEstateAds.json en propriété, limitée aux champs persistés
+
+    Args:
+        ad (Dict): Annonce décodée
+        department (str): Département crawlé
+        seen_at (datetime): Horodatage de la page
+
+    Returns:
+        Dict: Propriété au format du pipeline
+    """
+    price = _mean(ad.get('price', 0))
+    price_per_m2 = _mean(ad.get('pricePerSquareMeter', 0))
+    surface_m2 = _mean(ad.get('surfaceArea', 0))
+    rooms = _mean(ad.get('roomsQuantity', 0))
+    bedrooms = _mean(ad.get('bedroomsQuantity', 0))
+    if price_per_m2 is None:
+        price_per_m2 = price // surface_m2 if price and surface_m2 and surface_m2 > 0 else 0
+    property_type = ad.get('propertyType')
+    return {
+        'department': department,
+        'price': float(price) if price is not None else 0,
+        'price_per_m2': float(price_per_m2),
+        'surface_m2': float(surface_m2) if surface_m2 is not None else 0,
+        'rooms': int(rooms) if rooms is not None else 0,
+        'bedrooms': int(bedrooms) if bedrooms is not None else 0,
+        'address': (ad.get('district') or {}).get('name', ''),
+        'city': ad.get('city', ''),
+        'postal_code': ad.get('postalCode', ''),
+        'property_type': PROPERTY_TYPE_MAPPING.get(property_type, property_type),
+        'listing_url': ad.get('id', ''),
+        'features': {field: ad[field] for field in FEATURE_FIELDS if field in ad},
+        'description': ad.get('description', ''),
+        'first_seen_at': seen_at,  # Date de première découverte
+        'last_seen_at': seen_at,   # Date de dernière vue
+        'last_updated_at': seen_at,  # Date de dernière modification
+        'update_count': 1,         # Nombre de mises à jour
+        'is_active': True          # Si l'annonce est toujours active
+    }
+
+
+def department_slot(department):
+    """Slot de téléchargement propre à un département"""
+    return f"bienici-{department}"
+
+
 class BienIciSpider(RealEstateSpider, scrapy.Spider):
     name = "bienici_spider"
     allowed_domains = ["bienici.com"]
     MIN_PAGES = int(os.getenv('MIN_PAGES', 1))
     MAX_PAGES = int(os.getenv('MAX_PAGES', 100))
     PAGE_SIZE = int(os.getenv('PAGE_SIZE', 25))
-    
-    # Track progress
-    properties_scraped = 0
-    properties_new = 0
-    properties_updated = 0
-    pages_scraped = 0
-    start_time = None
-    _shutdown_requested = False
-    checkpoint_location = None
+    # Tri du crawl incrémental : les annonces récemment publiées ou modifiées d'abord
+    INCREMENTAL_SORT = os.getenv('BIENICI_INCREMENTAL_SORT', 'modificationDate')
+
+    # Départements et pages sont téléchargés en parallèle par l'ordonnanceur Scrapy
+    custom_settings = {
+        'ITEM_PIPELINES': PROPERTY_PIPELINES,
+        'DOWNLOADER_MIDDLEWARES': {**RATE_CONTROL_MIDDLEWARES, **HTTP_FIXTURE_MIDDLEWARES},
+        # Plafond global : la cadence réelle de chaque hôte est fixée par AdaptiveRateMiddleware
+        'CONCURRENT_REQUESTS': int(os.getenv('BIENICI_CONCURRENT_REQUESTS', 16)),
+        # Un slot par département : ses pages ne monopolisent pas toutes les requêtes en vol
+        'DOWNLOAD_SLOTS': {
+            department_slot(dept): {
+                'concurrency': int(os.getenv('BIENICI_DEPARTMENT_CONCURRENCY', 2))
+            }
+            for dept in BIENICI_DEPARTMENTS
+        },
+        # Délai fixe et AutoThrottle seulement si la cadence adaptative est désactivée
+        'DOWNLOAD_DELAY': (0 if RATE_CONTROL_CONFIG['enabled']
+                           else float(os.getenv('BIENICI_DOWNLOAD_DELAY', 0.25))),
+        'AUTOTHROTTLE_ENABLED': not RATE_CONTROL_CONFIG['enabled'],
+        'RETRY_TIMES': 3,
+        'RETRY_HTTP_CODES': [429, 500, 502, 503, 504],
+    }
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        signal.signal(signal.SIGINT, self._handle_sigint)
-
-        # Initialiser la session Spark
-        self.logger.info('Initialisation de la session Spark...')
-        self.checkpoint_location = self.get_checkpoint_location()
-        # Configuration de la session Spark
-        conf = SparkConf() \
-            .setAppName("BienIciScraper") \
-            .setMaster(os.environ.get("SPARK_MASTER", "local[*]")) \
-            .set("spark.driver.memory", "2g") \
-            .set("spark.executor.memory", "2g") \
-            .set("spark.jars.packages", "org.mongodb.spark:mongo-spark-connector_2.12:10.2.1")
-
-        self.spark = SparkSession.builder \
-            .config(conf=conf) \
-            .getOrCreate()
-
-        self.logger.info("Spark session created successfully.")
-        # Initialiser une liste pour stocker les propriétés
-        self.properties = []
-
-    def _handle_sigint(self, signum, frame):
-        self.logger.info("Received SIGINT, saving remaining properties and stats...")
-        self._shutdown_requested = True
-        if self.properties:
-            self.save_properties()
-        self.save_stats()
-        self.logger.info("Saved all remaining data. Shutting down...")
-        sys.exit(0)
+        # Identifiants de zone conservés d'un run à l'autre
+        self.zone_cache = ZoneIdCache(ZONE_CACHE_CONFIG['path'],
+                                      timedelta(days=ZONE_CACHE_CONFIG['ttl_days']))
 
     cookies = {
         'AB-TESTING': '%7B%22relatedAdsPosition%22%3A%22relatedAdsAfterSlideShow%22%7D',
@@ -140,36 +209,106 @@ class BienIciSpider(RealEstateSpider, scrapy.Spider):
         'id': '679cacbe39f78700afc81ab0',
     }
 
-    def get_location_id(self, department):
-        url = 'https://res.bienici.com/suggest.json?q=%s' % department
-        response = requests.get(url, headers=self.headers)
-        assert response.status_code == 200
-        location_dict = response.json()[0]
-        location_ids_list = location_dict["zoneIds"]
-        return location_ids_list 
+    SEARCH_URL = 'https://www.bienici.com/realEstateAds.json'
+    SUGGEST_URL = 'https://res.bienici.com/suggest.json'
+
+    def suggest_request(self, department):
+        """Requête de résolution de l'identifiant de zone d'un département"""
+        return scrapy.Request(
+            f"{self.SUGGEST_URL}?{urlencode({'q': department})}",
+            headers=self.headers,
+            callback=self.parse_zone,
+            cb_kwargs={'department': department},
+            # Les résolutions de zone passent avant les pages de résultats
+            priority=1,
+            dont_filter=True,
+        )
+
+    def search_request(self, department, zone_id, page, from_, size, first_page=False,
+                       stale_pages=0):
+        """Requête d'une page de résultats pour une zone
+
+        Les premières pages passent avant les suivantes (priorité décroissante
+        avec le numéro de page) et chaque département a son propre slot de
+        téléchargement, dont la concurrence est bornée par DOWNLOAD_SLOTS.
+        En crawl incrémental, les résultats sont triés par date et
+        ``stale_pages`` compte les pages précédentes sans nouveauté.
+        """
+        sort_by = self.INCREMENTAL_SORT if self.seen_index is not None else 'relevance'
+        # Paramètres construits par requête : self.params est partagé entre requêtes concurrentes
+        params = dict(self.params)
+        params['filters'] = (
+            f'{{"size":{size},"from":{from_},"showAllModels":false,"filterType":"buy",'
+            f'"propertyType":["house","flat","loft","castle","townhouse"],"page":{page},'
+            f'"sortBy":"{sort_by}","sortOrder":"desc","onTheMarket":[true],'
+            f'"zoneIdsByTypes":{{"zoneIds":[{zone_id}]}}}}'
+        )
+        cb_kwargs = {'department': department, 'zone_id': zone_id, 'first_page': first_page}
+        if self.seen_index is not None:
+            cb_kwargs['stale_pages'] = stale_pages
+        return scrapy.Request(
+            f"{self.SEARCH_URL}?{urlencode(params)}",
+            headers=self.headers,
+            cookies=self.cookies,
+            callback=self.parse,
+            cb_kwargs=cb_kwargs,
+            priority=-page,
+            meta={'download_slot': department_slot(department)},
+            dont_filter=True,
+        )
+
+    def first_page_request(self, department, zone_ids):
+        return self.search_request(department, zone_ids[0], self.MIN_PAGES, 0, 24, first_page=True)
+
+    def department_requests(self, department):
+        if self.checkpoint is not None:
+            # Reprise : département terminé ignoré, pages manquantes redemandées directement
+            if self.checkpoint.is_done(department):
+                logging.debug(f"Département {department} déjà terminé (checkpoint)")
+                return
+            missing = self.checkpoint.missing_pages(department)
+            if missing:
+                progress = self.checkpoint.progress(department)
+                logging.info(f"Département {department} - Reprise de {len(missing)} pages "
+                             f"(checkpoint)")
+                # Crawl incrémental : pagination séquentielle, reprise à la première page manquante
+                pages = [min(missing)] if self.seen_index is not None else sorted(missing)
+                for page in pages:
+                    yield self.search_request(department, progress['zone_id'], page,
+                                              (page - 1) * progress['per_page'],
+                                              progress['per_page'])
+                return
 
+        # Zone lue dans le cache, sinon résolue via suggest.json
+        zone = self.zone_cache.get(department)
+        if zone:
+            yield self.first_page_request(department, zone)
+        else:
+            yield self.suggest_request(department)
 
     def start_requests(self):
-        # Générer les URLs pour les départements 1 à 95 donc 1,  96
-        for dept in range(1, 96):
-            dept_str = f"{dept:02}"  # Format en deux chiffres
-            zone = self.get_location_id(dept_str)
-            logging.debug(f"Location IDs for department {dept_str}: {zone}")
-            self.params['filters'] = f'{{"size":24,"from":0,"showAllModels":false,"filterType":"buy","propertyType":["house","flat","loft","castle","townhouse"],"page":{self.MIN_PAGES},"sortBy":"relevance","sortOrder":"desc","onTheMarket":[true],"zoneIdsByTypes":{{"zoneIds":[{zone[0]}]}}}}'
-            response = requests.get('https://www.bienici.com/realEstateAds.json', params=self.params, cookies=self.cookies, headers=self.headers)
-            self.parse(response, dept_str)
-
-        # Ajouter les exceptions pour la Corse
-        for dept in ['2a', '2b']:
-            zone = self.get_location_id(dept)
-            self.params['filters'] = f'{{"size":24,"from":0,"showAllModels":false,"filterType":"buy","propertyType":["house","flat","loft","castle","townhouse"],"page":{self.MIN_PAGES},"sortBy":"relevance","sortOrder":"desc","onTheMarket":[true],"zoneIdsByTypes":{{"zoneIds":[{zone[0]}]}}}}'
-            response = requests.get('https://www.bienici.com/realEstateAds.json', params=self.params, cookies=self.cookies, headers=self.headers)
-            self.parse(response, dept)
-
-    def parse(self, response, department):
+        # Départements 01 à 95 et Corse (ou seulement ceux réservés dans la file de travail)
+        yield from self.department_start_requests(BIENICI_DEPARTMENTS, self.department_requests)
+
+    def parse_zone(self, response, department):
+        """Lit l'identifiant de zone d'un département et demande sa première page"""
+        try:
+            zone = response.json()[0]["zoneIds"]
+        except (ValueError, IndexError, KeyError, TypeError) as e:
+            logging.error(f"Zone introuvable pour le département {department}: {str(e)}")
+            return
+        if not zone:
+            logging.error(f"Aucune zone retournée pour le département {department}")
+            return
+        logging.debug(f"Location IDs for department {department}: {zone}")
+        self.zone_cache.put(department, zone)
+        yield self.first_page_request(department, zone)
+
+    def parse(self, response, department, zone_id, first_page=False, stale_pages=0):
         logging.debug(f"Parsing department: {department}")
         try:
-            response_json = response.json()
+            # Décodage direct des octets de la réponse (orjson si disponible)
+            response_json = loads_json(response.body)
             if not isinstance(response_json, dict):
                 logging.error(f"Réponse invalide pour le département {department}: {response_json}")
                 return
@@ -195,7 +334,8 @@ class BienIciSpider(RealEstateSpider, scrapy.Spider):
         max_pages = self.MAX_PAGES
         if total:
             try:
-                max_pages = min(int(total) // perPage, self.MAX_PAGES)
+                # Dernière page incomplète comprise
+                max_pages = min(math.ceil(int(total) / perPage), self.MAX_PAGES)
                 current_page = (from_ // perPage) + 1
                 logging.info(f"Département {department} - Page {current_page}/{max_pages}")
             except (ValueError, IndexError) as e:
@@ -205,200 +345,68 @@ class BienIciSpider(RealEstateSpider, scrapy.Spider):
         if realEstateAds:
             logging.debug(f"Number of listings on current page: {len(realEstateAds)}")
         
+        current_page = (from_ // perPage) + 1
         if not realEstateAds:
             logging.debug(f"No listings found for department {department} on page {response.url}")
             logging.debug(response_json)
+            # Page vide : rien de plus à attendre (département vide dès la première page, ou fin
+            # de la pagination séquentielle du crawl incrémental)
+            self.checkpoint_page(department, current_page,
+                                 last=first_page or self.seen_index is not None)
             return
         
         self.pages_scraped += 1
         logging.debug(f"Found {len(realEstateAds)} listings on page {response.url}")
+        # Prix des annonces de la page, comparés à l'index des annonces vues (crawl incrémental)
+        page_listings = {}
         
+        current_time = datetime.now()
         for realEstate in realEstateAds:
-            # Prix et détails financiers
-            price = realEstate.get('price', 0)
-            # Extraire toutes les caractéristiques
-            features = realEstate
-
-            num_pieces = realEstate.get('roomsQuantity', 0)
-            surface_m2 = realEstate.get('surfaceArea', 0)
-            num_chambres = realEstate.get('bedroomsQuantity', 0)
-            price_per_m2 = realEstate.get('pricePerSquareMeter', 0)
-
-            if isinstance(price, list):
-                price = sum(filter(None, price)) / len(price) if price else 0
-
-            if isinstance(price_per_m2, list):
-                price_per_m2 = sum(filter(None, price_per_m2)) / len(price_per_m2) if price_per_m2 else 0
-
-            if isinstance(num_chambres, list):
-                num_chambres = int(sum(filter(None, num_chambres)) / len(num_chambres)) if num_chambres else 0
-
-            if isinstance(num_pieces, list):
-                num_pieces = int(sum(filter(None, num_pieces)) / len(num_pieces)) if num_pieces else 0
-
-            if isinstance(surface_m2, list):
-                surface_m2 = sum(filter(None, surface_m2)) / len(surface_m2) if surface_m2 else 0
-
-            if price_per_m2 is None:
-                price_per_m2 = price // surface_m2 if surface_m2 > 0 else 0
-            logging.debug(f"Price: {price}, Surface: {surface_m2}, Bedrooms: {num_chambres}, Price per m2: {price_per_m2}")
-
-            # Adresse
-            address = realEstate.get('district', '').get('name', '')
-            city = realEstate.get('city', '')
-            postal_code = realEstate.get('postalCode', '')
-
-            # Description
-            description = realEstate.get('description', '')
-
-            # Lien vers l'annonce
-            listing_url = realEstate.get('id', '')
-
-            # Dictionnaire de traduction des types de biens
-            property_type_mapping = {
-                'house': 'maison',
-                'flat': 'appartement',
-                'programme': 'programme',
-                'loft': 'loft',
-                'castle': 'château',
-                'townhouse': 'maison de ville',
-            }
+            property_data = project_ad(realEstate, department, current_time)
+            page_listings[property_data['listing_url']] = property_data['price']
+            # Annonce complète archivée à part (PayloadArchive), hors du document real_estate
+            property_data['raw_payload'] = realEstate
 
-            property_type = property_type_mapping.get(realEstate['propertyType'], realEstate['propertyType'])  # Utiliser 'inconnu' si le type n'est pas trouvé
-
-            # Transformation des données pour Spark
-            current_time = datetime.now()
-            price = float(price) if price is not None else 0
-            price_per_m2 = float(price_per_m2) if price_per_m2 is not None else 0
-            num_chambres = int(num_chambres) if num_chambres is not None else 0
-            num_pieces = int(num_pieces) if num_pieces is not None else 0
-            surface_m2 = float(surface_m2) if surface_m2 is not None else 0
-            property_data = {
-                'department': department,
-                'price': price,
-                'price_per_m2': price_per_m2,
-                'surface_m2': surface_m2,
-                'rooms': num_pieces,
-                'bedrooms': num_chambres,
-                'address': address,
-                'city': city,
-                'postal_code': postal_code,
-                'property_type': property_type,
-                'listing_url': listing_url,
-                'features': features,
-                'description': description,
-                'first_seen_at': current_time,  # Date de première découverte
-                'last_seen_at': current_time,   # Date de dernière vue
-                'last_updated_at': current_time, # Date de dernière modification
-                'update_count': 1,              # Nombre de mises à jour
-                'is_active': True               # Si l'annonce est toujours active
-            }
-            
             # Vérification des types avant d'ajouter des propriétés
             if property_data['property_type'] != 'programme':
-                self.properties.append(property_data)
+                yield PropertyItem(property_data)
             else:
-                logging.warning(f'Types incohérents trouvés dans: {property_data}')
-            
-            logging.info(f'Données collectées : {len(self.properties)}')
-            # Sauvegarde par lots de 1000 propriétés pour optimiser Spark
-            # ou si un shutdown a été demandé
-            if len(self.properties) >= 1000 or self._shutdown_requested:
-                if self.properties:
-                    logging.info('Création du DataFrame Spark...')
-                    df = self.spark.createDataFrame(self.properties)
-                    self.save_properties()
-                self.properties = []
-                if self._shutdown_requested:
-                    self.save_stats()
-                    logging.debug("Saved all remaining data. Shutting down...")
-                    return
-
-        # Gérer la pagination en utilisant un paramètre de requête
-        current_page = (from_ // perPage) + 1
+                logging.warning(f"Programme neuf ignoré: {property_data['listing_url']}")
+
+            # Arrêt demandé : les propriétés déjà produites sont écrites par le pipeline
+            if self._shutdown_requested:
+                logging.debug("Shutdown requested, stopping pagination")
+                return
+
+        # Page traitée (ses propriétés sont passées au pipeline) ; la première fixe le nombre de
+        # pages
+        if first_page:
+            self.checkpoint_department(department, max_pages, zone_id=zone_id, per_page=perPage)
+
+        if self.seen_index is not None:
+            # Crawl incrémental : pages demandées une à une, jusqu'à N pages consécutives sans
+            # nouveauté
+            stale_pages = self.update_stale_pages(page_listings, stale_pages)
+            if (current_page < max_pages
+                    and not self.stop_paginating(department, current_page, stale_pages)):
+                self.checkpoint_page(department, current_page)
+                yield self.search_request(department, zone_id, current_page + 1,
+                                          current_page * perPage, perPage, stale_pages=stale_pages)
+            else:
+                self.checkpoint_page(department, current_page, last=True)
+            return
+
+        self.checkpoint_page(department, current_page)
+
+        # Le total est connu dès la première page : toutes les pages suivantes sont demandées
+        # d'un coup
+        if not first_page:
+            return
         if current_page < max_pages:
-            next_page = current_page + 1
-            next_from = current_page * perPage
-            logging.info(f"Département {department} - Passage à la page {next_page}/{max_pages}")
-            zone = self.get_location_id(department)
-            self.params['filters'] = f'{{"size":{perPage},"from":{next_from},"showAllModels":false,"filterType":"buy","propertyType":["house","flat","loft","castle","townhouse"],"page":{next_page},"sortBy":"relevance","sortOrder":"desc","onTheMarket":[true],"zoneIdsByTypes":{{"zoneIds":[{zone[0]}]}}}}'
-            response = requests.get('https://www.bienici.com/realEstateAds.json', params=self.params, cookies=self.cookies, headers=self.headers)
-            self.parse(response, department)
+            logging.info(f"Département {department} - Planification des pages "
+                         f"{current_page + 1} à {max_pages}")
+            for next_page in range(current_page + 1, max_pages + 1):
+                yield self.search_request(department, zone_id, next_page, (next_page - 1) * perPage,
+                                          perPage)
         else:
-            logging.debug(f"Département {department} - Fin de la pagination à la page {current_page}/{max_pages}")
-            
-    def closed(self, reason):
-        """Called when the spider is closed"""
-        duration = datetime.now() - self.start_time
-        
-        # Save any remaining properties
-        if self.properties:
-            logging.info('Création du DataFrame Spark...')
-            df = self.spark.createDataFrame(self.properties)
-            self.save_properties()
-            self.properties = []
-        
-        # Log final statistics
-        logging.debug(f"\nScraping completed - {reason}")
-        logging.debug(f"Total properties scraped: {self.properties_scraped}")
-        logging.debug(f"New properties: {self.properties_new}")
-        logging.debug(f"Updated properties: {self.properties_updated}")
-        logging.debug(f"Total pages scraped: {self.pages_scraped}")
-        logging.debug(f"Duration: {duration}")
-        logging.debug(f"Average properties per page: {self.properties_scraped / max(1, self.pages_scraped):.2f}")
-        logging.debug(f"Average time per property: {duration.total_seconds() / max(1, self.properties_scraped):.2f} seconds")
-        
-        try:
-            # Mark inactive listings
-            cutoff_time = datetime.now() - timedelta(days=30)  # Properties not seen in 30 days
-            result = self.mongo_collection.update_many(
-                {"last_seen_at": {"$lt": cutoff_time}, "is_active": True},
-                {"$set": {"is_active": False}}
-            )
-            logging.debug(f"Marked {result.modified_count} listings as inactive")
-            
-            # Save final statistics
-            stats_doc = {
-                'timestamp': datetime.now(),
-                'duration_seconds': duration.total_seconds(),
-                'total_properties': self.properties_scraped,
-                'new_properties': self.properties_new,
-                'updated_properties': self.properties_updated,
-                'total_pages': self.pages_scraped,
-                'properties_per_page': self.properties_scraped / max(1, self.pages_scraped),
-                'time_per_property': duration.total_seconds() / max(1, self.properties_scraped),
-                'reason': reason
-            }
-            
-            self.mongo_db['scraping_stats'].insert_one(stats_doc)
-            logging.debug("Statistics saved to MongoDB")
-            
-        except Exception as e:
-            logging.warning(f"Error in cleanup: {str(e)}")
-        finally:
-            if self.mongo_client:
-                self.mongo_client.close()
-
-        # Remove duplicates in MongoDB
-        try:
-            result = self.mongo_collection.aggregate([
-                {"$group": {
-                    "_id": "$listing_url",
-                    "doc_id": {"$first": "$_id"},
-                    "count": {"$sum": 1}
-                }},
-                {"$match": {"count": {"$gt": 1}}}
-            ])
-            
-            duplicates_removed = 0
-            for doc in result:
-                delete_result = self.mongo_collection.delete_many({
-                    "listing_url": doc["_id"],
-                    "_id": {"$ne": doc["doc_id"]}
-                })
-                duplicates_removed += delete_result.deleted_count
-            
-            if duplicates_removed > 0:
-                logging.debug(f"Removed {duplicates_removed} duplicate listings from MongoDB")
-        except Exception as e:
-            logging.warning(f"Error removing duplicates from MongoDB: {str(e)}")
\ No newline at end of file
+            logging.debug(f"Département {department} - Une seule page ({current_page}/{max_pages})")
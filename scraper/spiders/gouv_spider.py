@@ -1,17 +1,68 @@
 import os
-import gzip
-import csv
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
+import multiprocessing
 import requests
 import logging
 from decimal import Decimal
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional, Set
 
 from .base_spider import RealEstateSpider
+from items import PropertyItem
+from pipelines import PROPERTY_PIPELINES
+from config import HTTP_FIXTURES_CONFIG
+from download_cache import DownloadCache
+from mongo_pool import release_client
+from dvf_transform import bucket_key, iter_dvf_records
+from dvf_watermarks import WatermarkStore, changed_buckets, compute_watermark
+from http_fixtures import RECORD, REPLAY, FixtureStore
+from rate_control import throttled_get
+from utils import iter_gzip_csv
+from writer import WriteFailure
 import scrapy
 
+DVF_BASE_URL = "https://files.data.gouv.fr/geo-dvf/latest/csv"
+DVF_YEARS = [2020, 2021, 2022, 2023, 2024]
+
+# Départements publiés par geo-dvf (l'Alsace-Moselle et Mayotte ne sont pas couverts par DVF)
+DVF_DEPARTMENTS = (
+    [f"{dept:02}" for dept in range(1, 20)]
+    + ['2A', '2B']
+    + [f"{dept:02}" for dept in range(21, 96) if dept not in (57, 67, 68)]
+    + ['971', '972', '973', '974']
+)
+
+
+def ingest_dvf_file(url: str) -> Dict:
+    """Traite un fichier DVF complet dans un processus de travail
+
+    Chaque processus instancie son propre spider, donc son propre client
+    MongoDB, et écrit directement dans son PropertyStore (pas de pipeline
+    Scrapy hors du processus principal).
+
+    Args:
+        url (str): URL du fichier CSV compressé à traiter
+
+    Returns:
+        Dict: Compteurs du fichier traité et départements rencontrés
+    """
+    spider = GouvSpider()
+    try:
+        for property_data in spider.download_and_process_file(url):
+            spider.store.add(property_data)
+        try:
+            spider.store.close()
+        except WriteFailure as e:
+            # Compté dans summary()['failed_batches'], le fichier n'a pas été marqué comme traité
+            logging.error(f"Écritures MongoDB en échec pour {url}: {str(e)}")
+        return spider.store.summary()
+    finally:
+        release_client(spider.mongo_client)
+
+
 class GouvSpider(scrapy.Spider, RealEstateSpider):
     custom_settings = {
+        'ITEM_PIPELINES': PROPERTY_PIPELINES,
         'ROBOTSTXT_OBEY': False,
         'CONCURRENT_REQUESTS': 1,
         'DOWNLOAD_DELAY': 1,
@@ -20,50 +71,159 @@ class GouvSpider(scrapy.Spider, RealEstateSpider):
     """Spider pour les données immobilières du gouvernement (DVF)"""
     
     name = "gouv_spider"
-    urls = [
-        "https://files.data.gouv.fr/geo-dvf/latest/csv/2020/full.csv.gz",
-        "https://files.data.gouv.fr/geo-dvf/latest/csv/2021/full.csv.gz",
-        "https://files.data.gouv.fr/geo-dvf/latest/csv/2022/full.csv.gz",
-        "https://files.data.gouv.fr/geo-dvf/latest/csv/2023/full.csv.gz",
-        "https://files.data.gouv.fr/geo-dvf/latest/csv/2024/full.csv.gz"
-    ]
+    urls = [f"{DVF_BASE_URL}/{year}/full.csv.gz" for year in DVF_YEARS]
+
+    # Nombre de processus de travail (1 = traitement séquentiel, 0 = un par cœur)
+    WORKERS = int(os.getenv('DVF_WORKERS', 1))
+    # Découpage du travail : un fichier par année ou par département et par année
+    SHARD_BY = os.getenv('DVF_SHARD_BY', 'year')
+    # Cache local des archives (chaîne vide = téléchargement direct sans cache)
+    CACHE_DIR = os.getenv('DVF_CACHE_DIR', os.path.join('data', 'raw', 'dvf'))
+    # Retraite les fichiers même s'ils n'ont pas changé depuis le dernier import
+    FORCE_RELOAD = os.getenv('DVF_FORCE_RELOAD', '0') == '1'
+    # Moteur de transformation : 'columnar' (pandas, par blocs) ou 'rows' (ligne à ligne)
+    ENGINE = os.getenv('DVF_ENGINE', 'columnar')
+    # Les mutations DVF peuvent n'être écrites que dans la zone d'atterrissage Parquet
+    MONGO_SINK = os.getenv('DVF_MONGO_SINK', '1') == '1'
+    # Import différentiel : seuls les départements-mois modifiés depuis le dernier import sont émis
+    DELTA = os.getenv('DVF_DELTA', '1') == '1'
+    # Pas de pagination : l'import différentiel (DVF_DELTA) tient lieu de crawl incrémental
+    INCREMENTAL_CRAWL = False
+    # Les lignes d'une même disposition partagent leur listing_url : la dernière doit l'emporter
+    RUN_DEDUP = False
+    # Les mutations DVF sont un historique, pas des annonces en ligne : l'import différentiel ne
+    # réécrit pas les départements-mois inchangés, qui ne doivent pas être désactivés pour autant
+    SWEEP_INACTIVE = False
+    # start_requests traite les fichiers DVF sans rendre la main au reactor : processus dédié dans
+    # run_spiders.py
+    SHARED_REACTOR = False
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         RealEstateSpider.__init__(self)
-        self.properties = []
-        self.properties_scraped = 0
-        self.properties_new = 0
-        self.properties_updated = 0
-        self.pages_scraped = 0
-        self.start_time = datetime.now()
-
-    def download_and_process_file(self, url: str) -> None:
-        """Télécharge et traite un fichier CSV compressé"""
+        # Les téléchargements (requests) passent par le contrôleur de cadence de files.data.gouv.fr
+        self.rate_controller = self.rate_control.controller_for(DVF_BASE_URL)
+        self.download_cache = DownloadCache(self.CACHE_DIR, rate_controller=self.rate_controller) \
+            if self.CACHE_DIR else None
+        self.watermarks = WatermarkStore(self.mongo_db['dvf_watermarks'])
+        # Archives enregistrées (HTTP_FIXTURES_MODE) : ces téléchargements ne passent pas par Scrapy
+        self.fixture_mode = HTTP_FIXTURES_CONFIG['mode']
+        self.fixtures = FixtureStore(HTTP_FIXTURES_CONFIG['path']) \
+            if self.fixture_mode in (RECORD, REPLAY) else None
+        if self.fixture_mode == RECORD and self.download_cache is None:
+            logging.warning("Archives DVF non enregistrées : l'enregistrement passe par le cache "
+                            "(DVF_CACHE_DIR)")
+
+    # scrapy.Spider précède RealEstateSpider dans le MRO : on reprend explicitement son start()
+    start = RealEstateSpider.start
+
+    def download_and_process_file(self, url: str) -> Iterator[Dict]:
+        """Télécharge un fichier CSV compressé et produit ses propriétés
+
+        Le fichier n'est marqué comme traité (cache et filigrane) qu'une fois le
+        générateur épuisé et les propriétés produites écrites sans lot en échec ;
+        sinon il est retraité au run suivant.
+        """
         try:
-            # Téléchargement du fichier
-            logging.info(f"Téléchargement du fichier: {url}")
-            response = requests.get(url, stream=True)
-            response.raise_for_status()
-
-            # Décompression et lecture du CSV
-            with gzip.open(response.raw) as gz_file:
-                csv_reader = csv.DictReader(gz_file.read().decode('utf-8').splitlines(), delimiter=',')
-                
-                for row in csv_reader:
-                    if row['nature_mutation'] == 'Vente' and row['valeur_fonciere'] and row['type_local'] in ['Maison', 'Appartement']:
-                        self.process_row(row)
-                        
-                        # Sauvegarde par lots de 1000 propriétés
-                        if len(self.properties) >= 1000:
-                            self.save_properties()
-                            self.properties = []
+            if self.fixture_mode == REPLAY:
+                yield from self.replay_file(url)
+                return
+
+            if self.download_cache is None:
+                # Téléchargement du fichier en flux (jamais chargé entièrement en mémoire)
+                logging.info(f"Téléchargement du fichier: {url}")
+                with throttled_get(requests, url, self.rate_controller, stream=True) as response:
+                    response.raise_for_status()
+                    # Laisse urllib3 gérer un éventuel Content-Encoding de transport
+                    response.raw.decode_content = True
+                    yield from self.process_stream(response.raw)
+                self.flush_pending_writes()
+                return
+
+            cached = self.download_cache.fetch(url)
+            if self.fixture_mode == RECORD:
+                self.fixtures.save_file(url, cached.path, spider=self.name)
+            if not cached.changed and not self.FORCE_RELOAD:
+                logging.info(f"Fichier inchangé depuis le dernier import, ignoré: {url}")
+                return
+
+            # Le filigrane nécessite une copie locale : il est calculé sur le fichier en cache
+            watermark = None
+            buckets = None
+            if self.DELTA:
+                with open(cached.path, 'rb') as raw:
+                    watermark = compute_watermark(raw)
+                if not self.FORCE_RELOAD:
+                    previous = self.watermarks.load(url)
+                    buckets = changed_buckets(previous.get('checksums', {}), watermark['checksums'])
+                    logging.info(f"{len(buckets)}/{len(watermark['checksums'])} départements-mois "
+                                 f"modifiés depuis le dernier import (mutations jusqu'au "
+                                 f"{watermark['max_date_mutation']}): {url}")
+
+            # Lots en échec avant ce fichier : seuls ceux qui suivent le concernent
+            failures = self.store.failed_batches
+            if buckets is None or buckets:
+                with open(cached.path, 'rb') as raw:
+                    yield from self.process_stream(raw, buckets)
+
+            # Le fichier n'est marqué comme traité qu'une fois toutes ses lignes sauvegardées
+            if not self.rows_saved(failures):
+                logging.error(f"Lots non écrits, fichier à retraiter au prochain run: {url}")
+                return
+            self.download_cache.mark_processed(url)
+            if watermark is not None:
+                self.watermarks.save(url, watermark)
 
         except Exception as e:
             logging.error(f"Erreur lors du traitement du fichier {url}: {str(e)}")
 
-    def process_row(self, row: Dict) -> None:
-        """Traite une ligne du CSV et la convertit au format attendu"""
+    def rows_saved(self, failures: int) -> bool:
+        """Écrit les propriétés en attente et indique si aucun lot n'a échoué depuis ``failures``
+
+        Args:
+            failures (int): Valeur de ``store.failed_batches`` au début du fichier
+        """
+        try:
+            self.flush_pending_writes()
+        except WriteFailure as e:
+            logging.error(f"Écritures MongoDB en échec: {str(e)}")
+        return self.store.failed_batches == failures
+
+    def replay_file(self, url: str) -> Iterator[Dict]:
+        """Rejoue une archive enregistrée, sans réseau ni cache de téléchargement"""
+        fixture = self.fixtures.get(url)
+        if fixture is None:
+            logging.warning(f"Aucune archive enregistrée pour {url}, fichier ignoré")
+            return
+        logging.info(f"Rejeu de l'archive enregistrée: {url}")
+        with self.fixtures.open_body(fixture) as raw:
+            yield from self.process_stream(raw)
+        self.flush_pending_writes()
+
+    def process_stream(self, raw, buckets: Optional[Set[str]] = None) -> Iterator[Dict]:
+        """Décompresse un fichier DVF et produit ses propriétés avec le moteur configuré
+
+        Args:
+            raw: Flux binaire compressé en gzip
+            buckets (Optional[Set[str]]): Départements-mois à traiter (tous si None)
+        """
+        if self.ENGINE == 'columnar':
+            for records in iter_dvf_records(raw, self.name, buckets=buckets):
+                yield from records
+            return
+
+        for row in iter_gzip_csv(raw):
+            if (buckets is not None
+                    and bucket_key(row['code_departement'], row['date_mutation']) not in buckets):
+                continue
+            if (row['nature_mutation'] == 'Vente' and row['valeur_fonciere']
+                    and row['type_local'] in ['Maison', 'Appartement']):
+                property_data = self.process_row(row)
+                if property_data is not None:
+                    yield property_data
+
+    def process_row(self, row: Dict) -> Optional[Dict]:
+        """Traite une ligne du CSV et la convertit au format attendu (None si ligne ignorée)"""
         try:
             # Calcul de la surface totale Carrez si plusieurs lots
             surface_carrez = 0
@@ -108,27 +268,69 @@ class GouvSpider(scrapy.Spider, RealEstateSpider):
                 'property_type': 'maison' if row['type_local'] == 'Maison' else 'appartement',
                 'features': [],
                 'description': f"Mutation du {row['date_mutation']} - {row['nature_mutation']}",
+                'date_mutation': row['date_mutation'],
                 'first_seen_at': datetime.now(),
                 'last_seen_at': datetime.now(),
             }
 
-            self.properties.append(property_data)
+            return property_data
 
         except Exception as e:
             logging.error(f"Erreur lors du traitement d'une ligne: {str(e)}")
+        return None
+
+    def get_shard_urls(self) -> List[str]:
+        """Retourne la liste des fichiers à traiter selon le découpage configuré"""
+        if self.SHARD_BY == 'department':
+            return [
+                f"{DVF_BASE_URL}/{year}/departements/{dept}.csv.gz"
+                for year in DVF_YEARS
+                for dept in DVF_DEPARTMENTS
+            ]
+        return list(self.urls)
 
-    def start_requests(self) -> None:
-        """Point d'entrée principal du spider"""
+    def process_files_in_parallel(self, urls: List[str], workers: int) -> None:
+        """Répartit les fichiers sur un pool de processus et fusionne les compteurs"""
+        logging.info(f"Traitement parallèle de {len(urls)} fichiers DVF sur {workers} processus")
+        # spawn plutôt que fork : le client MongoDB du processus parent n'est pas fork-safe
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            futures = {executor.submit(ingest_dvf_file, url): url for url in urls}
+            for future in as_completed(futures):
+                url = futures[future]
+                try:
+                    summary = future.result()
+                except Exception as e:
+                    logging.error(f"Erreur lors du traitement du fichier {url}: {str(e)}")
+                    continue
+
+                # Compteurs, lots en échec et départements des workers remontés au store principal
+                self.store.merge(summary)
+                logging.info(f"Fichier terminé: {url} - {summary['properties_scraped']} propriétés "
+                             f"({summary['properties_new']} nouvelles, "
+                             f"{summary['properties_updated']} mises à jour, "
+                             f"{summary['failed_batches']} lots en échec)")
+
+    def start_requests(self) -> Iterator[PropertyItem]:
+        """Point d'entrée principal du spider
+
+        En traitement séquentiel, les propriétés sont produites comme items et
+        persistées par PropertyPipeline ; avec un pool de processus, chaque
+        worker écrit directement dans son propre store.
+        """
         try:
-            for url in self.urls:
-                self.download_and_process_file(url)
-                
-            # Sauvegarde des dernières propriétés
-            if self.properties:
-                self.save_properties()
-                
+            urls = self.get_shard_urls()
+            workers = self.WORKERS or os.cpu_count() or 1
+            if workers > 1:
+                self.process_files_in_parallel(urls, workers)
+            else:
+                for url in urls:
+                    for property_data in self.download_and_process_file(url):
+                        yield PropertyItem(property_data)
+
         except Exception as e:
             logging.error(f"Erreur lors de l'exécution du spider: {str(e)}")
         finally:
-            logging.info(f"Spider terminé - {self.properties_scraped} propriétés traitées "
-                        f"({self.properties_new} nouvelles, {self.properties_updated} mises à jour)")
+            logging.info(f"Spider terminé - {self.store.properties_scraped} propriétés traitées "
+                         f"({self.store.properties_new} nouvelles, "
+                         f"{self.store.properties_updated} mises à jour)")
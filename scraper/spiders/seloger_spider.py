@@ -2,10 +2,15 @@ import os
 from datetime import datetime, timedelta
 from urllib.parse import urljoin
 import logging
+from config import RATE_CONTROL_CONFIG
+from items import PropertyItem
+from middlewares import HTTP_FIXTURE_MIDDLEWARES, RATE_CONTROL_MIDDLEWARES
+from pipelines import PROPERTY_PIPELINES
 from spiders.base_spider import RealEstateSpider
 
 import pymongo
 import scrapy
+from lxml import etree
 
 # Configuration du logger
 # logging.basicConfig(level=logging.DEBUG)
@@ -13,16 +18,11 @@ import scrapy
 # Désactiver les logs de debug MongoDB
 logging.getLogger('pymongo').setLevel(logging.WARNING)
 logging.getLogger('urllib3').setLevel(logging.WARNING)
-logging.getLogger('pyspark').setLevel(logging.WARNING)
-from pyspark.sql import SparkSession
-from pyspark.conf import SparkConf
-from pyspark.sql.types import StructType, StructField, StringType, IntegerType, DecimalType, TimestampType, ArrayType, DoubleType
 from scrapy.crawler import CrawlerProcess
 from scrapy.utils.project import get_project_settings
 from scrapy.linkextractors import LinkExtractor
 from scrapy_fake_useragent.middleware import RandomUserAgentMiddleware
-from decimal import Decimal
-import signal
+from decimal import Decimal, InvalidOperation
 
 from dotenv import load_dotenv
 import os
@@ -52,61 +52,110 @@ def convert_to_decimal(value, as_decimal=True):
         return None
     try:
         return Decimal(str(value)) if as_decimal else float(str(value))
-    except (ValueError, decimal.InvalidOperation):
+    except (ValueError, InvalidOperation):
         logging.warning(f"Could not convert value '{value}' to numeric type")
         return None
 
+
+# Sélecteurs des cartes d'annonces, compilés une fois pour toutes les pages
+CARD_XPATH = etree.XPath('//div[@data-testid="serp-core-classified-card-testid"]')
+TEXT_XPATH = etree.XPath('text()', smart_strings=False)
+DIV_TEXTS_XPATH = etree.XPath('.//div/text()', smart_strings=False)
+
+# Champ extrait pour chaque élément (balise, data-testid) d'une carte
+CARD_FIELDS = {
+    ('div', 'cardmfe-price-testid'): 'price',
+    ('div', 'cardmfe-keyfacts-testid'): 'keyfacts',
+    ('div', 'cardmfe-description-box-address'): 'address',
+    ('div', 'cardmfe-description-text-test-id'): 'description',
+    ('div', 'cardmfe-description-box-text-test-id'): 'description_box',
+    ('a', 'card-mfe-covering-link-testid'): 'listing_url',
+}
+# Champs formés des textes des div descendants (les autres gardent la première valeur trouvée)
+CARD_TEXT_LISTS = ('keyfacts', 'description', 'description_box')
+
+# Liste de mots-clés pour détecter le type de bien
+PROPERTY_KEYWORDS = ("maison", "appartement", "terrain", "studio", "villa", "loft")
+
+
+def extract_card(card) -> dict:
+    """Extrait les champs bruts d'une carte d'annonce en un seul parcours de ses éléments
+
+    Équivalent des sélecteurs CSS appliqués champ par champ (``::text`` du
+    prix et de l'adresse, textes des div des caractéristiques et des
+    descriptions, lien de la carte), sans réévaluer l'arbre pour chaque champ.
+
+    Args:
+        card: Élément lxml de la carte (``div[data-testid="serp-core-classified-card-testid"]``)
+
+    Returns:
+        dict: price, address et listing_url (str ou None), keyfacts, description et
+            description_box (listes de textes)
+    """
+    fields = {'price': None, 'address': None, 'listing_url': None,
+              'keyfacts': [], 'description': [], 'description_box': []}
+    for element in card.iter('div', 'a'):
+        testid = element.get('data-testid')
+        if testid is None:
+            continue
+        field = CARD_FIELDS.get((element.tag, testid))
+        if field is None:
+            continue
+        if field in CARD_TEXT_LISTS:
+            fields[field].extend(DIV_TEXTS_XPATH(element))
+        elif fields[field] is None:
+            if field == 'listing_url':
+                fields[field] = element.get('href')
+            else:
+                texts = TEXT_XPATH(element)
+                fields[field] = texts[0] if texts else None
+    return fields
+
+
+def parse_keyfacts(features):
+    """Nombre de pièces, surface (hors terrain) et nombre de chambres des keyfacts d'une carte"""
+    num_pieces = surface_m2 = num_chambres = None
+    for feature in features:
+        words = feature.split()
+        if not words:
+            continue
+        first = words[0]
+        if num_pieces is None and 'pièce' in feature and first.isdigit():
+            num_pieces = int(first)
+        if surface_m2 is None and 'm²' in feature and 'terrain' not in feature.lower():
+            value = first.replace(',', '.')
+            if value.replace('.', '').isdigit():
+                surface_m2 = float(value)
+        if num_chambres is None and 'chambre' in feature and first.isdigit():
+            num_chambres = int(first)
+    return num_pieces, surface_m2, num_chambres
+
+
+def property_type_from_text(text: str):
+    """Type de bien (premier mot-clé trouvé dans le texte, capitalisé) ou None"""
+    for keyword in PROPERTY_KEYWORDS:
+        if keyword in text:
+            return keyword.capitalize()
+    return None
+
+
 class SeLogerSpider(RealEstateSpider, scrapy.Spider):
     name = "seloger_spider"
     allowed_domains = ["seloger.com"]
     MIN_PAGES = int(os.getenv('MIN_PAGES', 1))
     MAX_PAGES = int(os.getenv('MAX_PAGES', 100))
     PAGE_SIZE = int(os.getenv('PAGE_SIZE', 25))
-    
-    # Track progress
-    properties_scraped = 0
-    properties_new = 0
-    properties_updated = 0
-    pages_scraped = 0
-    checkpoint_location = None
-    start_time = None
-    _shutdown_requested = False
-
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        signal.signal(signal.SIGINT, self._handle_sigint)
-
-        # Initialiser la session Spark
-        self.logger.info('Initialisation de la session Spark...')
-        self.checkpoint_location = self.get_checkpoint_location()
-        # Configuration de la session Spark
-        conf = SparkConf() \
-            .setAppName("SeLogerScraper") \
-            .setMaster(os.environ.get("SPARK_MASTER", "local[*]")) \
-            .set("spark.driver.memory", "2g") \
-            .set("spark.executor.memory", "2g") \
-            .set("spark.jars.packages", "org.mongodb.spark:mongo-spark-connector_2.12:10.2.1")
-
-        self.spark = SparkSession.builder \
-            .config(conf=conf) \
-            .getOrCreate()
-
-        self.logger.info("Spark session created successfully.")
-        self.properties = []
-
-    def _handle_sigint(self, signum, frame):
-        self.logger.info("Received SIGINT, saving remaining properties and stats...")
-        self._shutdown_requested = True
-        if self.properties:
-            self.save_properties()
-        self.save_stats()
-        self.logger.info("Saved all remaining data. Shutting down...")
-        sys.exit(0)
+    # Tri du crawl incrémental (paramètre de l'URL de recherche) : annonces les plus récentes
+    # d'abord
+    INCREMENTAL_SORT = os.getenv('SELOGER_INCREMENTAL_SORT', 'tri=d_dt_crea')
 
     custom_settings = {
+        'ITEM_PIPELINES': PROPERTY_PIPELINES,
         'COOKIES_ENABLED': True,
-        'DOWNLOAD_DELAY': 2,
-        'CONCURRENT_REQUESTS': 1,
+        # Délai fixe seulement si la cadence adaptative (AdaptiveRateMiddleware) est désactivée
+        'DOWNLOAD_DELAY': 0 if RATE_CONTROL_CONFIG['enabled'] else 2,
+        'CONCURRENT_REQUESTS': RATE_CONTROL_CONFIG['hosts']['seloger.com'].get('max_concurrency', 1)
+        if RATE_CONTROL_CONFIG['enabled'] else 1,
         'DEFAULT_REQUEST_HEADERS': {
             'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
             'accept-language': 'fr,en-US;q=0.9,en;q=0.8',
@@ -132,6 +181,8 @@ class SeLogerSpider(RealEstateSpider, scrapy.Spider):
             'scrapy_fake_useragent.middleware.RandomUserAgentMiddleware': None,
             'scrapy.downloadermiddlewares.retry.RetryMiddleware': 90,
             'scrapy.downloadermiddlewares.httpproxy.HttpProxyMiddleware': 110,
+            **RATE_CONTROL_MIDDLEWARES,
+            **HTTP_FIXTURE_MIDDLEWARES,
         },
         'RETRY_TIMES': 3,
         'RETRY_HTTP_CODES': [403, 429, 500, 502, 503, 504]
@@ -178,31 +229,29 @@ class SeLogerSpider(RealEstateSpider, scrapy.Spider):
         '_dd_s': 'logs=0&expire=1741562844525&rum=0'
     }
 
+    def department_requests(self, department):
+        page = self.MIN_PAGES
+        if self.checkpoint is not None:
+            # Reprise : département terminé ignoré, sinon reprise après la dernière page traitée
+            if self.checkpoint.is_done(department):
+                logging.debug(f"Département {department} déjà terminé (checkpoint)")
+                return
+            progress = self.checkpoint.progress(department)
+            if progress and progress['pages']:
+                page = max(progress['pages']) + 1
+                logging.info(f"Département {department} - Reprise à la page {page} (checkpoint)")
+        # Le numéro de page reste le dernier paramètre de l'URL (lu par parse)
+        sort = f"{self.INCREMENTAL_SORT}&" if self.seen_index is not None else ''
+        url = f'https://www.seloger.com/immobilier/achat/{department}/?{sort}LISTING-LISTpg={page}'
+        yield scrapy.Request(url=url, dont_filter=True, cookies=self.cookies, callback=self.parse,
+                             meta={'department': department, 'dont_redirect': True,
+                                   'handle_httpstatus_list': [403, 404, 429, 500, 502, 503, 504]})
+
     def start_requests(self):
-        # Générer les URLs pour les départements 1 à 95
-        for dept in range(1, 96):
-            dept_str = f"{dept:02}"  # Format en deux chiffres
-            url = f'https://www.seloger.com/immobilier/achat/{dept_str}/?LISTING-LISTpg={self.MIN_PAGES}'
-            yield scrapy.Request(url=url, dont_filter=True, cookies=self.cookies, callback=self.parse, meta={'department': dept_str, 'dont_redirect': True, 'handle_httpstatus_list': [403, 404, 429, 500, 502, 503, 504]})
-
-        # Ajouter les exceptions pour la Corse
-        for dept in ['2a', '2b']:
-            url = f'https://www.seloger.com/immobilier/achat/{dept}/?LISTING-LISTpg={self.MIN_PAGES}'
-            yield scrapy.Request(url=url, dont_filter=True, cookies=self.cookies, callback=self.parse, meta={'department': dept, 'dont_redirect': True, 'handle_httpstatus_list': [403, 404, 429, 500, 502, 503, 504]})
-        
-    def closed(self, reason):
-        """Called when the spider is closed"""
-        duration = datetime.now() - self.start_time
-        logging.debug(f"Spider closed: {reason}")
-        logging.debug(f"Total properties scraped: {self.properties_scraped}")
-        logging.debug(f"Total pages scraped: {self.pages_scraped}")
-        logging.debug(f"Duration: {duration}")
-        logging.debug(f"Average properties per page: {self.properties_scraped / max(1, self.pages_scraped):.2f}")
-        logging.debug(f"Average time per property: {duration.total_seconds() / max(1, self.properties_scraped):.2f} seconds")
+        # Départements 01 à 95 puis la Corse (ou seulement ceux réservés dans la file de travail)
+        departments = [f"{dept:02}" for dept in range(1, 96)] + ['2a', '2b']
+        yield from self.department_start_requests(departments, self.department_requests)
         
-        if self.mongo_client:
-            self.mongo_client.close()
-    
     def parse(self, response):
         department = response.meta['department']
         description = response.css('meta[name="description"]::attr(content)').get()
@@ -216,60 +265,56 @@ class SeLogerSpider(RealEstateSpider, scrapy.Spider):
                 logging.debug(f"Error parsing real estate number from description: {e}")
 
         # Extraire le nombre total d'annonces en comptant les cartes
-        listings = response.css('div[data-testid="serp-core-classified-card-testid"]')
+        listings = CARD_XPATH(response.selector.root)
         if listings:
             logging.debug(f"Number of listings on current page: {len(listings)}")
         
+        current_page = int(response.url.split('pg=')[1])
         if not listings:
+            if response.status != 200:
+                # Page de blocage (403, 429, 5xx) : le département reste ouvert pour la reprise
+                logging.warning(f"Département {department} - page {current_page} bloquée "
+                                f"(HTTP {response.status}), département laissé ouvert")
+                return
             logging.debug(f"No listings found for department {department} on page {response.url}")
+            # Plus d'annonces : le département est terminé
+            self.checkpoint_page(department, current_page, last=True)
             return
         
         self.pages_scraped += 1
         logging.debug(f"Found {len(listings)} listings on page {response.url}")
+        # Prix des annonces de la page, comparés à l'index des annonces vues (crawl incrémental)
+        page_listings = {}
         
         for listing in listings:
+            card = extract_card(listing)
+
             # Prix et détails financiers
-            price_text = listing.css('div[data-testid="cardmfe-price-testid"]::text').get()
+            price_text = card['price']
             price = int(''.join(c for c in price_text if c.isdigit())) if price_text else None
             
-            # Extraire toutes les caractéristiques
-            features_list = listing.css('div[data-testid="cardmfe-keyfacts-testid"] div::text').getall()
-
-            features = [f for f in features_list if f != '·']
-
-            num_pieces = next((int(f.split()[0]) for f in features if 'pièce' in f and f.split()[0].isdigit()), None)
-            surface_m2 = next((float(f.split()[0].replace(',', '.')) for f in features if 'm²' in f and 'terrain' not in f.lower() and f.split()[0].replace(',', '.').replace('.', '').isdigit()), None)
-            num_chambres = next((int(f.split()[0]) for f in features if 'chambre' in f and f.split()[0].isdigit()), None)
+            # Caractéristiques (pièces, surface, chambres)
+            features = [f for f in card['keyfacts'] if f != '·']
+            num_pieces, surface_m2, num_chambres = parse_keyfacts(features)
             price_per_m2 = price // surface_m2 if surface_m2 else None
 
             # Adresse
-            address = listing.css('div[data-testid="cardmfe-description-box-address"]::text').get()
+            address = card['address']
             city = address.split('(')[0].strip() if address else None
             postal_code = address.split('(')[1].replace(')', '').strip() if address and '(' in address else None
 
             # Description
-            description = listing.css('div[data-testid="cardmfe-description-text-test-id"] div::text').getall()
-            description = ''.join(description).strip()
+            description = ''.join(card['description']).strip()
 
             # Lien vers l'annonce
-            listing_url = listing.css('a[data-testid="card-mfe-covering-link-testid"]::attr(href)').get()
-
-            # Liste de mots-clés pour détecter le type de bien
-            property_keywords = ["maison", "appartement", "terrain", "studio", "villa", "loft"]
-
-            # Récupérer le texte de la description
-            description_text = ' '.join(listing.css('div[data-testid="cardmfe-description-box-text-test-id"] div::text').getall()).lower()
+            listing_url = card['listing_url']
 
-            # Initialiser le type de bien à None
-            property_type = None
+            # Type de bien d'après le texte de la description
+            property_type = property_type_from_text(' '.join(card['description_box']).lower())
 
-            # Vérifier les mots-clés dans le texte de la description
-            for keyword in property_keywords:
-                if keyword in description_text:
-                    property_type = keyword.capitalize()  # Capitaliser le mot trouvé
-                    break
+            page_listings[listing_url] = price
 
-            # Transformation des données pour Spark
+            # Transformation des données pour le pipeline
             current_time = datetime.now()
             property_data = {
                 'department': department,
@@ -292,24 +337,24 @@ class SeLogerSpider(RealEstateSpider, scrapy.Spider):
                 'is_active': True               # Si l'annonce est toujours active
             }
             
-            self.properties.append(property_data)
-            
-            # Sauvegarde par lots de 1000 propriétés pour optimiser Spark
-            # ou si un shutdown a été demandé
-            if len(self.properties) >= 1000 or self._shutdown_requested:
-                if len(self.properties) > 0:
-                    logging.info('Création du DataFrame Spark...')
-                    df = self.spark.createDataFrame(self.properties)
-                    self.save_properties()
-                self.properties = []
-                if self._shutdown_requested:
-                    self.save_stats()
-                    logging.debug("Saved all remaining data. Shutting down...")
-                    return
+            yield PropertyItem(property_data)
+
+            # Arrêt demandé : les propriétés déjà produites sont écrites par le pipeline
+            if self._shutdown_requested:
+                logging.debug("Shutdown requested, stopping pagination")
+                return
+
+        # Crawl incrémental : arrêt après N pages consécutives sans annonce nouvelle ou modifiée
+        stale_pages = self.update_stale_pages(page_listings, response.meta.get('stale_pages', 0))
+        last = (current_page >= max_pages
+                or self.stop_paginating(department, current_page, stale_pages))
+
+        # Page traitée (ses propriétés sont passées au pipeline)
+        self.checkpoint_department(department, max_pages)
+        self.checkpoint_page(department, current_page, last=last)
 
         # Gérer la pagination en utilisant un paramètre de requête
-        current_page = int(response.url.split('pg=')[1])
-        if current_page < max_pages:
+        if not last:
             next_page = current_page + 1
             next_page_url = response.url.replace(f'pg={current_page}', f'pg={next_page}')
             logging.debug(f"Moving to page {next_page} of {max_pages}")
@@ -321,84 +366,9 @@ class SeLogerSpider(RealEstateSpider, scrapy.Spider):
                 meta={
                     'dont_redirect': True,
                     'handle_httpstatus_list': [403, 404, 429, 500, 502, 503, 504],
-                    'department': department
+                    'department': department,
+                    'stale_pages': stale_pages
                 }
             )
         else:
-            logging.debug(f"Reached maximum number of pages ({max_pages}). Stopping.")
-            
-    def closed(self, reason):
-        """Called when the spider is closed"""
-        duration = datetime.now() - self.start_time
-        
-        # Save any remaining properties
-        if self.properties:
-            if len(self.properties) > 0:
-                logging.info('Création du DataFrame Spark...')
-                df = self.spark.createDataFrame(self.properties)
-                self.save_properties()
-        
-        # Log final statistics
-        logging.debug(f"\nScraping completed - {reason}")
-        logging.debug(f"Total properties scraped: {self.properties_scraped}")
-        logging.debug(f"New properties: {self.properties_new}")
-        logging.debug(f"Updated properties: {self.properties_updated}")
-        logging.debug(f"Total pages scraped: {self.pages_scraped}")
-        logging.debug(f"Duration: {duration}")
-        logging.debug(f"Average properties per page: {self.properties_scraped / max(1, self.pages_scraped):.2f}")
-        logging.debug(f"Average time per property: {duration.total_seconds() / max(1, self.properties_scraped):.2f} seconds")
-        
-        try:
-            # Mark inactive listings
-            cutoff_time = datetime.now() - timedelta(days=30)  # Properties not seen in 30 days
-            result = self.mongo_collection.update_many(
-                {"last_seen_at": {"$lt": cutoff_time}, "is_active": True},
-                {"$set": {"is_active": False}}
-            )
-            logging.debug(f"Marked {result.modified_count} listings as inactive")
-            
-            # Save final statistics
-            stats_doc = {
-                'timestamp': datetime.now(),
-                'duration_seconds': duration.total_seconds(),
-                'total_properties': self.properties_scraped,
-                'new_properties': self.properties_new,
-                'updated_properties': self.properties_updated,
-                'total_pages': self.pages_scraped,
-                'properties_per_page': self.properties_scraped / max(1, self.pages_scraped),
-                'time_per_property': duration.total_seconds() / max(1, self.properties_scraped),
-                'reason': reason
-            }
-            
-            self.mongo_db['scraping_stats'].insert_one(stats_doc)
-            logging.debug("Statistics saved to MongoDB")
-            
-        except Exception as e:
-            logging.warning(f"Error in cleanup: {str(e)}")
-        finally:
-            if self.mongo_client:
-                self.mongo_client.close()
-
-        # Remove duplicates in MongoDB
-        try:
-            result = self.mongo_collection.aggregate([
-                {"$group": {
-                    "_id": "$listing_url",
-                    "doc_id": {"$first": "$_id"},
-                    "count": {"$sum": 1}
-                }},
-                {"$match": {"count": {"$gt": 1}}}
-            ])
-            
-            duplicates_removed = 0
-            for doc in result:
-                delete_result = self.mongo_collection.delete_many({
-                    "listing_url": doc["_id"],
-                    "_id": {"$ne": doc["doc_id"]}
-                })
-                duplicates_removed += delete_result.deleted_count
-            
-            if duplicates_removed > 0:
-                logging.debug(f"Removed {duplicates_removed} duplicate listings from MongoDB")
-        except Exception as e:
-            logging.warning(f"Error removing duplicates from MongoDB: {str(e)}")
\ No newline at end of file
+            logging.debug(f"Reached last page ({current_page}/{max_pages}). Stopping.")
@@ -1,5 +1,20 @@
+from datetime import date, datetime, time
 from decimal import Decimal
+import csv
+import gzip
+import io
+import json
+import os
 import re
+import tempfile
+from typing import Any, BinaryIO, Dict, Iterator, Union
+
+try:
+    # Décodeur JSON rapide (optionnel) : le module json standard prend le relais s'il est absent
+    import orjson
+except ImportError:
+    orjson = None
+
 
 def convert_to_decimal(value: str, as_decimal: bool = True) -> Decimal:
     """Convertit une chaîne en Decimal ou float selon le besoin
@@ -26,3 +41,81 @@ def convert_to_decimal(value: str, as_decimal: bool = True) -> Decimal:
         return float(clean_value)
     except (ValueError, decimal.InvalidOperation):
         return None
+
+
+def iter_gzip_csv(fileobj: BinaryIO, delimiter: str = ',') -> Iterator[Dict[str, str]]:
+    """Lit un CSV compressé en gzip en flux, ligne par ligne
+
+    La décompression et le décodage sont incrémentaux : seule la ligne
+    courante (et les tampons internes de gzip) est gardée en mémoire, quelle
+    que soit la taille du fichier.
+
+    Args:
+        fileobj (BinaryIO): Flux binaire compressé (fichier local ou ``response.raw``)
+        delimiter (str): Séparateur de colonnes du CSV
+
+    Yields:
+        Dict[str, str]: Une ligne du CSV indexée par les noms de colonnes
+    """
+    with gzip.GzipFile(fileobj=fileobj, mode='rb') as gz_file:
+        with io.TextIOWrapper(gz_file, encoding='utf-8', newline='') as text_file:
+            yield from csv.DictReader(text_file, delimiter=delimiter)
+
+
+def loads_json(data: Union[bytes, str]) -> Any:
+    """Décode un document JSON avec orjson s'il est installé (ValueError si invalide)
+
+    Args:
+        data (Union[bytes, str]): Corps de la réponse, de préférence en octets (pas de décodage
+            texte préalable)
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_default(value: Any) -> str:
+    """Types non JSON : dates au format ISO 8601 comme orjson (``T``, décalage), sinon ``str``"""
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return str(value)
+
+
+def dumps_json(data: Any, sort_keys: bool = False) -> bytes:
+    """Encode un document en JSON (octets UTF-8), avec orjson s'il est installé
+
+    Les deux chemins produisent les mêmes octets : les empreintes des annonces archivées
+    ne dépendent pas de la présence d'orjson dans l'image.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=_json_default,
+                            option=orjson.OPT_SORT_KEYS if sort_keys else None)
+    return json.dumps(data, default=_json_default, sort_keys=sort_keys, ensure_ascii=False,
+                      separators=(',', ':')).encode()
+
+
+def read_json(path: str) -> Dict:
+    """Lit un fichier JSON, dictionnaire vide s'il est absent ou illisible"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_json_atomic(path: str, data: Dict) -> None:
+    """Écrit un fichier JSON de façon atomique (fichier temporaire puis renommage)
+
+    Le fichier temporaire a un nom unique dans le même répertoire : deux
+    processus qui écrivent le même fichier ne se marchent pas dessus.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.',
+                                    prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
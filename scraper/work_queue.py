@@ -0,0 +1,262 @@
+import logging
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+import pymongo
+from pymongo import ReturnDocument
+
+# États d'un job : en attente, réservé par un worker (bail en cours), terminé, abandonné
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class MongoWorkQueue:
+    """File de travail partagée entre réplicas, un job par clé (département)
+
+    Un worker réserve un job pour ``lease_seconds`` et renouvelle son bail
+    (``heartbeat``) tant qu'il y travaille. Un bail expiré, par exemple après
+    l'arrêt brutal d'un conteneur, rend le job à nouveau disponible, dans la
+    limite de ``max_attempts`` tentatives.
+    """
+
+    def __init__(self, collection, source: str, run_id: str, lease_seconds: int = 600,
+                 max_attempts: int = 3):
+        """
+        Args:
+            collection: Collection MongoDB des jobs
+            source (str): Nom du spider propriétaire des jobs
+            run_id (str): Identifiant du crawl partagé par les réplicas (ex. la date du jour)
+            lease_seconds (int): Durée d'un bail sans heartbeat
+            max_attempts (int): Nombre maximum de réservations d'un même job
+        """
+        self.collection = collection
+        self.source = source
+        self.run_id = run_id
+        self.lease = timedelta(seconds=lease_seconds)
+        self.max_attempts = max_attempts
+        self.collection.create_index(
+            [('source', pymongo.ASCENDING), ('run_id', pymongo.ASCENDING),
+             ('state', pymongo.ASCENDING), ('lease_expires_at', pymongo.ASCENDING)],
+            name='source_run_state_lease'
+        )
+
+    def _job_id(self, key: str) -> str:
+        return f"{self.source}:{self.run_id}:{key}"
+
+    def seed(self, keys: Iterable[str]) -> None:
+        """Crée les jobs absents (idempotent : chaque réplica peut appeler seed)"""
+        now = datetime.now()
+        operations = [
+            pymongo.UpdateOne(
+                {'_id': self._job_id(key)},
+                {'$setOnInsert': {
+                    'source': self.source, 'run_id': self.run_id, 'key': key, 'state': PENDING,
+                    'attempts': 0, 'lease_owner': None, 'lease_expires_at': None, 'created_at': now,
+                }},
+                upsert=True
+            )
+            for key in keys
+        ]
+        if operations:
+            self.collection.bulk_write(operations, ordered=False)
+
+    def claim(self, worker_id: str, now: Optional[datetime] = None) -> Optional[Dict]:
+        """Réserve un job en attente ou dont le bail a expiré"""
+        now = now or datetime.now()
+        scope = {'source': self.source, 'run_id': self.run_id}
+        # Baux expirés sans tentative restante : le job est abandonné
+        self.collection.update_many(
+            {**scope, 'state': LEASED, 'lease_expires_at': {'$lt': now},
+             'attempts': {'$gte': self.max_attempts}},
+            {'$set': {'state': FAILED, 'error': 'lease expired', 'updated_at': now}}
+        )
+        return self.collection.find_one_and_update(
+            {**scope, 'attempts': {'$lt': self.max_attempts},
+             '$or': [{'state': PENDING}, {'state': LEASED, 'lease_expires_at': {'$lt': now}}]},
+            {'$set': {'state': LEASED, 'lease_owner': worker_id,
+                      'lease_expires_at': now + self.lease, 'updated_at': now},
+             '$inc': {'attempts': 1}},
+            sort=[('attempts', pymongo.ASCENDING), ('key', pymongo.ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def heartbeat(self, job: Dict, now: Optional[datetime] = None) -> bool:
+        """Prolonge le bail d'un job ; False si le bail a été repris par un autre worker"""
+        now = now or datetime.now()
+        result = self.collection.update_one(
+            {'_id': job['_id'], 'state': LEASED, 'lease_owner': job['lease_owner']},
+            {'$set': {'lease_expires_at': now + self.lease, 'updated_at': now}}
+        )
+        return result.matched_count == 1
+
+    def complete(self, job: Dict) -> bool:
+        """Marque un job comme terminé"""
+        result = self.collection.update_one(
+            {'_id': job['_id'], 'lease_owner': job['lease_owner']},
+            {'$set': {'state': DONE, 'lease_expires_at': None, 'updated_at': datetime.now()}}
+        )
+        return result.matched_count == 1
+
+    def release(self, job: Dict, error: Optional[str] = None) -> None:
+        """Rend un job non terminé (arrêt du worker, erreur)
+
+        Il est retenté s'il lui reste des tentatives.
+        """
+        state = PENDING if job['attempts'] < self.max_attempts else FAILED
+        self.collection.update_one(
+            {'_id': job['_id'], 'lease_owner': job['lease_owner'], 'state': LEASED},
+            {'$set': {'state': state, 'lease_owner': None, 'lease_expires_at': None,
+                      'error': error, 'updated_at': datetime.now()}}
+        )
+
+    def counts(self) -> Dict[str, int]:
+        """Nombre de jobs par état pour ce crawl"""
+        pipeline = [
+            {'$match': {'source': self.source, 'run_id': self.run_id}},
+            {'$group': {'_id': '$state', 'count': {'$sum': 1}}},
+        ]
+        return {doc['_id']: doc['count'] for doc in self.collection.aggregate(pipeline)}
+
+
+class SqliteWorkQueue:
+    """Équivalent local de MongoWorkQueue dans un fichier SQLite
+
+    Même sémantique de baux ; plusieurs processus d'une même machine peuvent
+    partager le fichier (réservation dans une transaction ``BEGIN IMMEDIATE``).
+    """
+
+    def __init__(self, path: str, source: str, run_id: str, lease_seconds: int = 600,
+                 max_attempts: int = 3):
+        if not path or path == ':memory:':
+            # Base SQLite temporaire, propre au processus : les réplicas ne partageraient pas
+            # la file
+            raise ValueError(
+                "SqliteWorkQueue needs a file path shared by the replicas (WORK_QUEUE_PATH)"
+            )
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None,
+                                          check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.source = source
+        self.run_id = run_id
+        self.lease = timedelta(seconds=lease_seconds)
+        self.max_attempts = max_attempts
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                _id TEXT PRIMARY KEY, source TEXT, run_id TEXT, key TEXT, state TEXT,
+                attempts INTEGER, lease_owner TEXT, lease_expires_at TEXT, error TEXT,
+                updated_at TEXT
+            )
+        """)
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS source_run_state_lease "
+            "ON jobs (source, run_id, state, lease_expires_at)"
+        )
+
+    def _job_id(self, key: str) -> str:
+        return f"{self.source}:{self.run_id}:{key}"
+
+    def seed(self, keys: Iterable[str]) -> None:
+        """Crée les jobs absents (idempotent)"""
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO jobs (_id, source, run_id, key, state, attempts) "
+            "VALUES (?, ?, ?, ?, ?, 0)",
+            [(self._job_id(key), self.source, self.run_id, key, PENDING) for key in keys]
+        )
+
+    def claim(self, worker_id: str, now: Optional[datetime] = None) -> Optional[Dict]:
+        """Réserve un job en attente ou dont le bail a expiré"""
+        now = now or datetime.now()
+        scope = (self.source, self.run_id)
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            self.connection.execute(
+                "UPDATE jobs SET state = ?, error = 'lease expired', updated_at = ? "
+                "WHERE source = ? AND run_id = ? AND state = ? AND lease_expires_at < ? "
+                "AND attempts >= ?",
+                (FAILED, now.isoformat(), *scope, LEASED, now.isoformat(), self.max_attempts)
+            )
+            row = self.connection.execute(
+                "SELECT _id FROM jobs WHERE source = ? AND run_id = ? AND attempts < ? "
+                "AND (state = ? OR (state = ? AND lease_expires_at < ?)) "
+                "ORDER BY attempts, key LIMIT 1",
+                (*scope, self.max_attempts, PENDING, LEASED, now.isoformat())
+            ).fetchone()
+            if row is None:
+                self.connection.execute("COMMIT")
+                return None
+            self.connection.execute(
+                "UPDATE jobs SET state = ?, lease_owner = ?, lease_expires_at = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE _id = ?",
+                (LEASED, worker_id, (now + self.lease).isoformat(), now.isoformat(), row['_id'])
+            )
+            job = dict(self.connection.execute(
+                "SELECT * FROM jobs WHERE _id = ?", (row['_id'],)
+            ).fetchone())
+            self.connection.execute("COMMIT")
+            return job
+        except Exception:
+            self.connection.execute("ROLLBACK")
+            raise
+
+    def heartbeat(self, job: Dict, now: Optional[datetime] = None) -> bool:
+        """Prolonge le bail d'un job ; False si le bail a été repris par un autre worker"""
+        now = now or datetime.now()
+        cursor = self.connection.execute(
+            "UPDATE jobs SET lease_expires_at = ?, updated_at = ? "
+            "WHERE _id = ? AND state = ? AND lease_owner = ?",
+            ((now + self.lease).isoformat(), now.isoformat(), job['_id'], LEASED,
+             job['lease_owner'])
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job: Dict) -> bool:
+        """Marque un job comme terminé"""
+        cursor = self.connection.execute(
+            "UPDATE jobs SET state = ?, lease_expires_at = NULL, updated_at = ? "
+            "WHERE _id = ? AND lease_owner = ?",
+            (DONE, datetime.now().isoformat(), job['_id'], job['lease_owner'])
+        )
+        return cursor.rowcount == 1
+
+    def release(self, job: Dict, error: Optional[str] = None) -> None:
+        """Rend un job non terminé : il est retenté s'il reste des tentatives"""
+        state = PENDING if job['attempts'] < self.max_attempts else FAILED
+        self.connection.execute(
+            "UPDATE jobs SET state = ?, lease_owner = NULL, lease_expires_at = NULL, error = ?, "
+            "updated_at = ? WHERE _id = ? AND lease_owner = ? AND state = ?",
+            (state, error, datetime.now().isoformat(), job['_id'], job['lease_owner'], LEASED)
+        )
+
+    def counts(self) -> Dict[str, int]:
+        """Nombre de jobs par état pour ce crawl"""
+        rows = self.connection.execute(
+            "SELECT state, COUNT(*) AS count FROM jobs WHERE source = ? AND run_id = ? "
+            "GROUP BY state",
+            (self.source, self.run_id)
+        ).fetchall()
+        return {row['state']: row['count'] for row in rows}
+
+
+def has_open_jobs(counts: Dict[str, int]) -> bool:
+    """Reste-t-il des jobs en attente ou réservés (éventuellement par un worker arrêté) ?"""
+    return bool(counts.get(PENDING) or counts.get(LEASED))
+
+
+def claim_batch(queue, worker_id: str, size: int) -> List[Dict]:
+    """Réserve jusqu'à ``size`` jobs"""
+    jobs = []
+    while len(jobs) < size:
+        job = queue.claim(worker_id)
+        if job is None:
+            break
+        jobs.append(job)
+    if jobs:
+        logging.info(f"Jobs réservés par {worker_id}: {', '.join(job['key'] for job in jobs)}")
+    return jobs
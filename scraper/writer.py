@@ -0,0 +1,136 @@
+import logging
+import queue
+import threading
+import time
+from typing import Callable, List, Optional
+
+import pymongo
+
+# Marqueur de fin envoyé à chaque thread d'écriture
+_STOP = object()
+
+
+class WriteFailure(Exception):
+    """Des lots soumis au writer n'ont pas pu être écrits"""
+
+
+class BackgroundBulkWriter:
+    """Exécute les ``bulk_write`` MongoDB dans des threads dédiés
+
+    Le parsing dépose des lots d'opérations dans une file bornée et continue
+    pendant qu'un lot est en cours d'écriture. Quand la file est pleine,
+    ``submit`` bloque jusqu'à ce qu'un thread se libère (contre-pression), ce
+    qui borne la mémoire occupée par les lots en attente.
+
+    Avec plusieurs threads, l'ordre d'écriture des lots n'est plus garanti.
+
+    Un lot en échec est journalisé et compté (``failed_batches``,
+    ``last_error``) ; ``flush`` et ``close`` lèvent ensuite ``WriteFailure``
+    pour que l'appelant ne considère pas ces données comme écrites.
+    """
+
+    def __init__(self, collection, threads: int = 1, max_pending: int = 4,
+                 on_result: Optional[Callable] = None):
+        """
+        Args:
+            collection: Collection MongoDB cible
+            threads (int): Nombre de threads d'écriture
+            max_pending (int): Nombre maximal de lots en attente dans la file
+            on_result (Callable): Appelé après chaque lot avec
+                ``(result, document_count, latency_seconds)``
+        """
+        self.collection = collection
+        self.on_result = on_result
+        self._queue = queue.Queue(maxsize=max(1, max_pending))
+        self._closed = False
+        self._failure_lock = threading.Lock()
+        self.failed_batches = 0
+        self.last_error: Optional[BaseException] = None
+        # Échecs pas encore signalés par flush/close
+        self._unreported_failures = 0
+        self._threads = [
+            threading.Thread(target=self._run, name=f"mongo-writer-{i}", daemon=True)
+            for i in range(max(1, threads))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, operations: List, document_count: int, on_written: Optional[Callable] = None,
+               on_failed: Optional[Callable] = None) -> None:
+        """Ajoute un lot d'opérations à la file (bloquant si la file est pleine)
+
+        Args:
+            operations (List): Opérations du lot
+            document_count (int): Nombre de documents du lot
+            on_written (Callable): Appelé avec ``(result, latency_seconds)`` une fois ce lot écrit
+                (pas en cas d'échec)
+            on_failed (Callable): Appelé avec l'exception si ce lot n'a pas pu être écrit
+        """
+        if self._closed:
+            raise RuntimeError("Writer already closed")
+        if operations:
+            self._queue.put((operations, document_count, on_written, on_failed))
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            on_failed = None
+            try:
+                if item is _STOP:
+                    return
+                operations, document_count, on_written, on_failed = item
+                start = time.perf_counter()
+                result = self.collection.bulk_write(operations, ordered=False)
+                latency = time.perf_counter() - start
+                if self.on_result is not None:
+                    self.on_result(result, document_count, latency)
+                if on_written is not None:
+                    on_written(result, latency)
+            except pymongo.errors.BulkWriteError as bwe:
+                logging.error(f"Bulk write error: {bwe.details}")
+                self._record_failure(bwe, on_failed)
+            except Exception as e:
+                logging.error(f"Error in background bulk write: {str(e)}")
+                self._record_failure(e, on_failed)
+            finally:
+                self._queue.task_done()
+
+    def _record_failure(self, error: BaseException, on_failed: Optional[Callable] = None) -> None:
+        with self._failure_lock:
+            self.failed_batches += 1
+            self._unreported_failures += 1
+            self.last_error = error
+        if on_failed is not None:
+            try:
+                on_failed(error)
+            except Exception as e:
+                logging.error(f"Error in failed batch callback: {str(e)}")
+
+    def _raise_failures(self) -> None:
+        """Lève WriteFailure si des lots ont échoué depuis le dernier flush"""
+        with self._failure_lock:
+            failures, self._unreported_failures = self._unreported_failures, 0
+            error = self.last_error
+        if failures:
+            raise WriteFailure(f"{failures} lot(s) non écrit(s): {error}") from error
+
+    def flush(self) -> None:
+        """Attend que tous les lots soumis soient écrits
+
+        Raises:
+            WriteFailure: Des lots ont échoué depuis le flush précédent
+        """
+        self._queue.join()
+        self._raise_failures()
+
+    def close(self) -> None:
+        """Écrit les lots restants puis arrête les threads (WriteFailure comme ``flush``)"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.join()
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        self._raise_failures()
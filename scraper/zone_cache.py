@@ -0,0 +1,51 @@
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from utils import read_json, write_json_atomic
+
+
+class ZoneIdCache:
+    """Cache disque des identifiants de zone Bien'ici par département
+
+    Les correspondances département -> zoneIds ne changent quasiment jamais :
+    elles sont conservées d'un run à l'autre dans un fichier JSON et ne sont
+    redemandées à ``suggest.json`` qu'après expiration du TTL.
+    """
+
+    def __init__(self, path: str, ttl: timedelta = timedelta(days=30)):
+        self.path = path
+        self.ttl = ttl
+        self._zones: Dict[str, Dict] = read_json(path)
+
+    def get(self, department: str, now: Optional[datetime] = None) -> Optional[List]:
+        """Retourne les zoneIds du département s'ils sont en cache et encore valides"""
+        entry = self._zones.get(department)
+        if not entry:
+            return None
+        try:
+            fetched_at = datetime.fromisoformat(entry['fetched_at'])
+        except (KeyError, TypeError, ValueError):
+            return None
+        if (now or datetime.now()) - fetched_at > self.ttl:
+            return None
+        return entry.get('zone_ids') or None
+
+    def put(self, department: str, zone_ids: List, now: Optional[datetime] = None) -> None:
+        """Enregistre les zoneIds d'un département et réécrit le fichier"""
+        # Relecture avant écriture : un autre spider a pu compléter le fichier entre-temps
+        zones = read_json(self.path)
+        zones[department] = {
+            'zone_ids': list(zone_ids),
+            'fetched_at': (now or datetime.now()).isoformat(),
+        }
+        self._zones = zones
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            write_json_atomic(self.path, zones)
+        except OSError as e:
+            # Le cache n'est qu'une optimisation : le crawl continue avec les zoneIds en mémoire
+            logging.warning(f"Impossible d'écrire le cache des zones {self.path}: {str(e)}")
@@ -1,7 +1,10 @@
-from pyspark.sql import SparkSession
-from pyspark.sql.functions import col, length, regexp_replace, lower, when, to_date
+from pyspark.sql import SparkSession, Window
+from pyspark.sql.functions import (coalesce, col, length, lit, regexp_replace, lower, row_number,
+                                   when, to_date)
+from pyspark.sql.functions import max as spark_max
 from pymongo import MongoClient
 from dotenv import load_dotenv
+import json
 import os
 import logging
 
@@ -22,6 +25,60 @@ POSTGRES_TABLE = os.getenv("DB_TABLE")
 # MongoDB URI
 MONGO_URI = f"mongodb://{os.getenv('MONGO_USER')}:{os.getenv('MONGO_PASSWORD')}@{os.getenv('MONGO_HOST')}:{os.getenv('MONGO_PORT')}/{os.getenv('MONGO_DB')}.real_estate"
 
+# Zone d'atterrissage Parquet des scrapers : lue à la place de MongoDB si le chemin est défini
+LANDING_ZONE_PATH = os.getenv("LANDING_ZONE_READ_PATH")
+LANDING_ZONE_SOURCES = [s for s in os.getenv("LANDING_ZONE_SOURCES", "").split(",") if s]
+LANDING_ZONE_YEARS = [y for y in os.getenv("LANDING_ZONE_YEARS", "").split(",") if y]
+# Dernier last_seen_at exporté vers PostgreSQL (les fichiers préfixés par _ sont ignorés par Spark)
+LANDING_ZONE_WATERMARK = os.getenv("LANDING_ZONE_WATERMARK_PATH") or (
+    os.path.join(LANDING_ZONE_PATH, "_preprocess_watermark.json") if LANDING_ZONE_PATH else None
+)
+
+
+def load_watermark():
+    """last_seen_at maximal du dernier export de la zone d'atterrissage (None au premier run)"""
+    try:
+        with open(LANDING_ZONE_WATERMARK, encoding="utf-8") as f:
+            return json.load(f).get("last_seen_at")
+    except (OSError, ValueError):
+        return None
+
+
+def save_watermark(last_seen_at):
+    tmp_path = f"{LANDING_ZONE_WATERMARK}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"last_seen_at": last_seen_at}, f)
+    os.replace(tmp_path, LANDING_ZONE_WATERMARK)
+
+
+def read_landing_zone(spark, since=None):
+    """Lit la zone d'atterrissage Parquet en ne parcourant que les partitions demandées
+
+    La zone est en ajout seul : chaque crawl y dépose de nouveau les annonces
+    revues. Seules les annonces jamais exportées (aucune ligne avant ``since``)
+    sont gardées, une ligne par listing_url (la plus récente).
+    """
+    df = spark.read.option("basePath", LANDING_ZONE_PATH).parquet(LANDING_ZONE_PATH)
+    # Filtres sur les colonnes de partition : Spark élague les répertoires source=/year=
+    if LANDING_ZONE_SOURCES:
+        df = df.filter(col("source").isin(LANDING_ZONE_SOURCES))
+    if LANDING_ZONE_YEARS:
+        df = df.filter(col("year").isin(LANDING_ZONE_YEARS))
+    if since:
+        # Équivalent de l'indicateur "processed" de MongoDB : annonces déjà exportées écartées
+        since = lit(since).cast("timestamp")
+        exported = df.filter(col("last_seen_at") <= since).select("listing_url")
+        df = df.filter(col("last_seen_at") > since).join(exported, "listing_url", "left_anti")
+    latest = Window.partitionBy("listing_url").orderBy(col("last_seen_at").desc())
+    df = df.withColumn("_rank", row_number().over(latest)).filter(col("_rank") == 1)
+    return df.select(
+        col("listing_url").alias("_id"),
+        "price", "surface_m2", "city", "property_type", "rooms", "postal_code",
+        coalesce(col("date_mutation"),
+                 col("last_seen_at").cast("date").cast("string")).alias("scraped_at"),
+        "last_seen_at",
+    )
+
 def process_data():
     spark = None
     try:
@@ -34,6 +91,7 @@ def process_data():
             .config("spark.executor.cores", "1") \
             .config("spark.default.parallelism", "4") \
             .config("spark.sql.shuffle.partitions", "4") \
+            .config("spark.sql.sources.partitionColumnTypeInference.enabled", "false") \
             .getOrCreate()
 
         # Extraction Pipeline
@@ -45,11 +103,17 @@ def process_data():
         ]
         """
 
-        logging.info("Loading data from MongoDB")
-        # Read data from MongoDB
-        df = spark.read.format("mongodb") \
-            .option("pipeline", mongo_pipeline) \
-            .load()
+        if LANDING_ZONE_PATH:
+            since = load_watermark()
+            logging.info(f"Loading data from landing zone {LANDING_ZONE_PATH} "
+                         f"(last_seen_at > {since})")
+            df = read_landing_zone(spark, since)
+        else:
+            logging.info("Loading data from MongoDB")
+            # Read data from MongoDB
+            df = spark.read.format("mongodb") \
+                .option("pipeline", mongo_pipeline) \
+                .load()
 
         # Transform Data
         logging.info("Transforming data")
@@ -88,8 +152,9 @@ def process_data():
             .withColumn("Rooms", when(col("Name").contains("studio"), 1).otherwise(col("Rooms"))) \
             .withColumn("Date", to_date(col("Date"), "yyyy-MM-dd"))
 
-        # Collect Processed IDs
-        processed_ids = [row.Id for row in df_clean.select("Id").collect()]
+        # Collect Processed IDs (MongoDB seulement : la zone d'atterrissage suit un filigrane)
+        if not LANDING_ZONE_PATH:
+            processed_ids = [row.Id for row in df_clean.select("Id").collect()]
 
         # Write to PostgreSQL
         logging.info("Writing data to PostgreSQL")
@@ -104,16 +169,24 @@ def process_data():
             .option("batchsize", 500) \
             .jdbc(jdbc_url, POSTGRES_TABLE, mode="append", properties=connection_properties)
 
-        # Update MongoDB
-        logging.info("Updating MongoDB documents")
-        client = MongoClient(MONGO_URI)
-        db = client[os.getenv('MONGO_DB')]
-        collection = db.real_estate
-
-        collection.update_many(
-            {"_id": {"$in": processed_ids}},
-            {"$set": {"processed": True}}
-        )
+        if LANDING_ZONE_PATH:
+            # Filigrane sur toutes les lignes lues (rejetées au nettoyage comprises), après
+            # l'écriture
+            last_seen_at = df.agg(spark_max("last_seen_at")).first()[0]
+            if last_seen_at is not None:
+                save_watermark(last_seen_at.isoformat())
+                logging.info(f"Landing zone watermark saved: {last_seen_at}")
+        else:
+            # Update MongoDB
+            logging.info("Updating MongoDB documents")
+            client = MongoClient(MONGO_URI)
+            db = client[os.getenv('MONGO_DB')]
+            collection = db.real_estate
+
+            collection.update_many(
+                {"_id": {"$in": processed_ids}},
+                {"$set": {"processed": True}}
+            )
         logging.info("Processing complete")
 
     except Exception as e:
@@ -0,0 +1,59 @@
+"""Générateur de fichiers DVF synthétiques pour les tests du GouvSpider"""
+import csv
+import gzip
+import io
+
+DVF_COLUMNS = [
+    'id_mutation', 'date_mutation', 'numero_disposition', 'nature_mutation', 'valeur_fonciere',
+    'adresse_numero', 'adresse_suffixe', 'adresse_nom_voie', 'adresse_code_voie', 'code_postal',
+    'code_commune', 'nom_commune', 'code_departement', 'ancien_code_commune', 'ancien_nom_commune',
+    'id_parcelle', 'ancien_id_parcelle', 'numero_volume',
+    'lot1_numero', 'lot1_surface_carrez', 'lot2_numero', 'lot2_surface_carrez',
+    'lot3_numero', 'lot3_surface_carrez', 'lot4_numero', 'lot4_surface_carrez',
+    'lot5_numero', 'lot5_surface_carrez', 'nombre_lots', 'code_type_local', 'type_local',
+    'surface_reelle_bati', 'nombre_pieces_principales', 'code_nature_culture', 'nature_culture',
+    'code_nature_culture_speciale', 'nature_culture_speciale', 'surface_terrain',
+    'longitude', 'latitude',
+]
+
+
+def dvf_row(i: int) -> dict:
+    """Construit une ligne DVF déterministe couvrant les principaux cas du parsing"""
+    row = dict.fromkeys(DVF_COLUMNS, '')
+    department = f"{i % 95 + 1:02}"
+    row.update({
+        'id_mutation': f"2024-{i}",
+        'date_mutation': f"2024-{i % 12 + 1:02}-{i % 28 + 1:02}",
+        'numero_disposition': '000001',
+        'nature_mutation': 'Vente' if i % 7 else 'Echange',
+        'valeur_fonciere': '' if i % 53 == 0 else f"{100000 + (i * 137) % 900000}.{i % 100:02}",
+        'adresse_numero': str(i % 120) if i % 5 else '',
+        'adresse_suffixe': 'B' if i % 11 == 0 else '',
+        'adresse_nom_voie': f"RUE DU TEST {i % 300}",
+        'code_postal': f"{department}{i % 1000:03}",
+        'nom_commune': f"Commune {i % 500}",
+        'code_departement': department,
+        'lot1_surface_carrez': f"{20 + i % 80}.{i % 10}" if i % 3 == 0 else '',
+        'lot2_surface_carrez': f"{10 + i % 30}" if i % 9 == 0 else '',
+        'type_local': ('Maison', 'Appartement', 'Dépendance', 'Local industriel')[i % 4],
+        'surface_reelle_bati': '' if i % 17 == 0 else str(30 + i % 170),
+        'nombre_pieces_principales': '' if i % 13 == 0 else str(i % 7),
+        'longitude': '2.35',
+        'latitude': '48.85',
+    })
+    return row
+
+
+def write_dvf_gzip(path, rows) -> None:
+    """Écrit des lignes DVF dans un fichier CSV compressé"""
+    with gzip.open(path, 'wt', encoding='utf-8', newline='') as gz_file:
+        writer = csv.DictWriter(gz_file, fieldnames=DVF_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def dvf_gzip_bytes(rows) -> bytes:
+    """Retourne le contenu compressé d'un fichier DVF"""
+    buffer = io.BytesIO()
+    write_dvf_gzip(buffer, rows)
+    return buffer.getvalue()
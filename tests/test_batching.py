@@ -0,0 +1,73 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scraper'))
+
+from batching import BYTE_CAP, COUNT_CAP, FINAL_FLUSH, AdaptiveBatchPolicy
+
+
+def test_batch_size_shrinks_on_slow_writes_and_grows_back_within_bounds():
+    policy = AdaptiveBatchPolicy(min_docs=100, max_docs=2000, initial_docs=1000, target_latency=0.5)
+
+    # Écriture deux fois trop lente : la taille visée est réduite d'autant
+    policy.observe(1000, 1.0)
+    assert policy.batch_docs == 500
+
+    # Jamais sous la borne basse
+    for _ in range(10):
+        policy.observe(policy.batch_docs, 10.0)
+    assert policy.batch_docs == 100
+
+    # Écritures rapides : la taille remonte jusqu'à la borne haute
+    for _ in range(50):
+        policy.observe(policy.batch_docs, 0.01)
+    assert policy.batch_docs == 2000
+
+
+def test_flushed_partial_batches_do_not_change_the_target():
+    policy = AdaptiveBatchPolicy(initial_docs=1000, target_latency=0.5)
+    policy.observe(10, 5.0, byte_count=4096, reason=FINAL_FLUSH)
+    assert (policy.batch_docs, policy.batch_bytes) == (1000, policy.max_bytes)
+
+
+def test_slow_byte_capped_batches_shrink_the_byte_target():
+    policy = AdaptiveBatchPolicy(initial_docs=1000, max_bytes=1024 * 1024, min_bytes=64 * 1024,
+                                 target_latency=0.5)
+    # Quelques grosses annonces Bien'ici : le lot part au plafond en octets, bien avant 1000 documents
+    assert policy.flush_reason(40, 1024 * 1024) == BYTE_CAP
+    policy.observe(40, 2.0, byte_count=1024 * 1024, reason=BYTE_CAP)
+    assert policy.batch_bytes == 256 * 1024
+    assert policy.batch_docs == 1000
+    assert policy.should_flush(10, 256 * 1024)
+
+    # Jamais sous le plancher, puis retour au plafond quand les écritures redeviennent rapides
+    for _ in range(10):
+        policy.observe(10, 10.0, byte_count=policy.batch_bytes, reason=BYTE_CAP)
+    assert policy.batch_bytes == 64 * 1024
+    for _ in range(50):
+        policy.observe(10, 0.01, byte_count=policy.batch_bytes, reason=BYTE_CAP)
+    assert policy.batch_bytes == 1024 * 1024
+    assert policy.flush_reason(1000, 0) == COUNT_CAP
+
+
+def test_flush_on_document_count_or_byte_ceiling():
+    policy = AdaptiveBatchPolicy(initial_docs=1000, max_bytes=1024)
+    assert not policy.should_flush(999, 100)
+    assert policy.should_flush(1000, 100)
+    # Quelques gros documents suffisent à déclencher l'écriture
+    assert policy.should_flush(3, 2048)
+
+
+def test_stats_report_chosen_batch_sizes():
+    policy = AdaptiveBatchPolicy(initial_docs=1000)
+    policy.record_flush(1000, 4000)
+    policy.record_flush(200, 1000)
+    policy.observe(1000, 0.2)
+
+    stats = policy.stats()
+    assert stats['batches'] == 2
+    assert stats['batch_size_min'] == 200
+    assert stats['batch_size_max'] == 1000
+    assert stats['batch_size_avg'] == 600
+    assert stats['batch_bytes_avg'] == 2500
+    assert stats['batch_size_final'] == policy.batch_docs
@@ -0,0 +1,134 @@
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlparse
+
+from scrapy.http import Request, TextResponse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scraper'))
+
+from items import PropertyItem
+from spiders.bienici_spider import BienIciSpider, project_ad
+from utils import loads_json
+from zone_cache import ZoneIdCache
+
+
+def bare_spider(tmp_path):
+    """Spider sans Spark ni MongoDB : seuls les callbacks sont testés"""
+    spider = BienIciSpider.__new__(BienIciSpider)
+    spider.pages_scraped = 0
+    spider._shutdown_requested = False
+    spider.zone_cache = ZoneIdCache(str(tmp_path / 'zones.json'))
+    spider.work_queue = None
+    spider.checkpoint = None
+    spider.seen_index = None
+    return spider
+
+
+def json_response(url, payload, request=None):
+    return TextResponse(url=url, body=json.dumps(payload).encode(), encoding='utf-8', request=request)
+
+
+def ad(i):
+    return {
+        'id': f'ad-{i}', 'price': 200000 + i, 'roomsQuantity': 3, 'surfaceArea': 60,
+        'bedroomsQuantity': 2, 'pricePerSquareMeter': 3500, 'district': {'name': 'Centre'},
+        'city': 'Bordeaux', 'postalCode': '33000', 'description': 'Appartement', 'propertyType': 'flat',
+    }
+
+
+def test_start_requests_resolve_every_department_without_blocking(tmp_path):
+    spider = bare_spider(tmp_path)
+    requests = list(spider.start_requests())
+    assert len(requests) == 97
+    assert all(isinstance(request, Request) for request in requests)
+    assert requests[32].url == 'https://res.bienici.com/suggest.json?q=33'
+    assert requests[-1].cb_kwargs == {'department': '2b'}
+
+
+def test_cached_zones_skip_the_suggest_lookup(tmp_path):
+    ZoneIdCache(str(tmp_path / 'zones.json')).put('33', ['-7405'])
+    spider = bare_spider(tmp_path)
+
+    requests = {request.cb_kwargs['department']: request for request in spider.start_requests()}
+    assert requests['33'].url.startswith('https://www.bienici.com/realEstateAds.json')
+    assert requests['33'].cb_kwargs['zone_id'] == '-7405'
+    assert requests['01'].url == 'https://res.bienici.com/suggest.json?q=01'
+
+
+def test_zone_cache_entries_expire(tmp_path):
+    path = str(tmp_path / 'zones.json')
+    cache = ZoneIdCache(path, ttl=timedelta(days=30))
+    cache.put('33', ['-7405'], now=datetime(2024, 1, 1))
+    assert cache.get('33', now=datetime(2024, 1, 20)) == ['-7405']
+    assert cache.get('33', now=datetime(2024, 3, 1)) is None
+    assert ZoneIdCache(path).get('75') is None
+
+
+def test_zone_cache_write_failure_does_not_stop_the_crawl(tmp_path):
+    # Répertoire du cache inutilisable (c'est un fichier)
+    (tmp_path / 'cache').write_text('')
+    cache = ZoneIdCache(str(tmp_path / 'cache' / 'zones.json'))
+    cache.put('33', ['-7405'])
+    assert cache.get('33') == ['-7405']
+
+
+def test_zone_lookup_chains_into_first_search_page(tmp_path):
+    spider = bare_spider(tmp_path)
+    response = json_response('https://res.bienici.com/suggest.json?q=33', [{'zoneIds': ['-7405']}])
+    (request,) = spider.parse_zone(response, department='33')
+
+    # La zone résolue est conservée pour les runs suivants
+    assert ZoneIdCache(str(tmp_path / 'zones.json')).get('33') == ['-7405']
+
+    query = parse_qs(urlparse(request.url).query)
+    filters = query['filters'][0]
+    assert '"from":0' in filters and '"zoneIds":[-7405]' in filters
+    assert request.callback == spider.parse
+    assert request.cb_kwargs == {'department': '33', 'zone_id': '-7405', 'first_page': True}
+
+
+def test_first_page_fans_out_remaining_pages_with_priorities(tmp_path):
+    spider = bare_spider(tmp_path)
+    payload = {'total': 100, 'from': 0, 'perPage': 24, 'realEstateAds': [ad(1), ad(2)]}
+    response = json_response('https://www.bienici.com/realEstateAds.json?page=1', payload)
+
+    results = list(spider.parse(response, department='33', zone_id='-7405', first_page=True))
+    items = [result for result in results if isinstance(result, PropertyItem)]
+    requests = [result for result in results if isinstance(result, Request)]
+
+    assert [item['listing_url'] for item in items] == ['ad-1', 'ad-2']
+    assert items[0]['property_type'] == 'appartement'
+    assert spider.pages_scraped == 1
+
+    # 100 annonces à 24 par page : pages 2 à 5 (4 dernières annonces) planifiées d'un coup
+    filters = [parse_qs(urlparse(request.url).query)['filters'][0] for request in requests]
+    assert len(filters) == 4
+    assert all(f'"page":{page}' in f for f, page in zip(filters, (2, 3, 4, 5)))
+    assert '"from":48' in filters[1] and '"from":96' in filters[3]
+    assert [request.priority for request in requests] == [-2, -3, -4, -5]
+    assert {request.meta['download_slot'] for request in requests} == {'bienici-33'}
+    assert all(request.cb_kwargs['first_page'] is False for request in requests)
+
+
+def test_later_pages_do_not_schedule_more_requests(tmp_path):
+    spider = bare_spider(tmp_path)
+    payload = {'total': 100, 'from': 48, 'perPage': 24, 'realEstateAds': [ad(3)]}
+    response = json_response('https://www.bienici.com/realEstateAds.json?page=3', payload)
+
+    results = list(spider.parse(response, department='33', zone_id='-7405'))
+    assert all(isinstance(result, PropertyItem) for result in results)
+
+
+def test_ads_are_projected_on_persisted_fields():
+    seen_at = datetime(2024, 6, 1)
+    raw = {**ad(1), 'price': [300000, 320000], 'floor': 2, 'photos': [{'url': 'x.jpg'}] * 10,
+           'district': None, 'blurInfo': {'position': {'lat': 44.8, 'lon': -0.5}}}
+    property_data = project_ad(raw, '33', seen_at)
+    assert property_data['price'] == 310000.0 and property_data['address'] == ''
+    assert property_data['property_type'] == 'appartement'
+    # Seuls les champs descriptifs sont conservés, pas la réponse complète
+    assert property_data['features'] == {'id': 'ad-1', 'propertyType': 'flat', 'roomsQuantity': 3,
+                                         'bedroomsQuantity': 2, 'surfaceArea': 60, 'floor': 2}
+    assert loads_json(json.dumps(raw).encode())['price'] == [300000, 320000]
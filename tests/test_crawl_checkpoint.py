@@ -0,0 +1,84 @@
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scraper'))
+
+from crawl_checkpoint import CrawlCheckpoint, compress_pages, expand_pages
+from items import PropertyItem
+from test_bienici_spider import ad, bare_spider, json_response
+
+
+def test_pages_are_stored_as_ranges():
+    assert compress_pages([5, 1, 2, 3, 9, 10]) == '1-3,5,9-10'
+    assert expand_pages('1-3,5,9-10') == {1, 2, 3, 5, 9, 10}
+    assert compress_pages([]) == '' and expand_pages('') == set()
+
+
+def test_progress_survives_a_restart(tmp_path):
+    path = str(tmp_path / 'bienici_spider.json')
+    checkpoint = CrawlCheckpoint(path, interval=0)
+    checkpoint.start_department('33', 4, zone_id='-7405', per_page=24)
+    for page in (1, 2, 4):
+        checkpoint.page_done('33', page)
+    checkpoint.start_department('01', 1, zone_id='-1', per_page=24)
+    checkpoint.page_done('01', 1)
+    assert checkpoint.due()
+    checkpoint.save()
+
+    with open(path) as f:
+        assert json.load(f)['departments']['33']['pages'] == '1-2,4'
+
+    resumed = CrawlCheckpoint(path)
+    assert resumed.resumed
+    assert resumed.is_done('01')
+    assert resumed.missing_pages('33') == {3}
+    assert resumed.missing_pages('75') is None
+
+    resumed.clear()
+    assert not os.path.exists(path)
+
+
+def test_bienici_resumes_missing_pages_only(tmp_path):
+    spider = bare_spider(tmp_path)
+    spider.checkpoint = CrawlCheckpoint(str(tmp_path / 'bienici_spider.json'), interval=3600)
+    spider.checkpoint.department_done('01')
+    spider.checkpoint.start_department('33', 4, zone_id='-7405', per_page=24)
+    for page in (1, 2):
+        spider.checkpoint.page_done('33', page)
+
+    assert list(spider.department_requests('01')) == []
+    requests = list(spider.department_requests('33'))
+    assert [request.priority for request in requests] == [-3, -4]
+    assert '"from":48' in requests[0].url.replace('%22', '"').replace('%3A', ':').replace('%2C', ',')
+
+
+def test_bienici_pages_are_checkpointed(tmp_path):
+    spider = bare_spider(tmp_path)
+    spider.checkpoint = CrawlCheckpoint(str(tmp_path / 'bienici_spider.json'), interval=3600)
+
+    payload = {'total': 48, 'from': 0, 'perPage': 24, 'realEstateAds': [ad(1)]}
+    response = json_response('https://www.bienici.com/realEstateAds.json?page=1', payload)
+    results = list(spider.parse(response, department='33', zone_id='-7405', first_page=True))
+    assert sum(isinstance(result, PropertyItem) for result in results) == 1
+    assert spider.checkpoint.missing_pages('33') == {2}
+    assert spider.checkpoint.progress('33')['zone_id'] == '-7405'
+
+    payload = {'total': 48, 'from': 24, 'perPage': 24, 'realEstateAds': [ad(2)]}
+    response = json_response('https://www.bienici.com/realEstateAds.json?page=2', payload)
+    list(spider.parse(response, department='33', zone_id='-7405'))
+    assert spider.checkpoint.is_done('33')
+
+
+def test_replicas_keep_separate_checkpoints(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules['spiders.base_spider'].CHECKPOINT_CONFIG, 'path', str(tmp_path))
+    spider = bare_spider(tmp_path)
+    spider._init_checkpoint()
+    assert spider.checkpoint.path == str(tmp_path / 'bienici_spider.json')
+
+    # File de travail : un fichier par worker, les réplicas ne s'écrasent pas
+    spider.work_queue = SimpleNamespace()
+    spider.worker_id = 'scraper-bienici-2-1'
+    spider._init_checkpoint()
+    assert spider.checkpoint.path == str(tmp_path / 'bienici_spider-scraper-bienici-2-1.json')
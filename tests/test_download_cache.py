@@ -0,0 +1,153 @@
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scraper'))
+
+from download_cache import DownloadCache
+from rate_control import HostRateController
+from dvf_samples import dvf_gzip_bytes, dvf_row
+
+
+class FakeDvfServer:
+    """Serveur HTTP local imitant files.data.gouv.fr (ETag, Last-Modified, Range)"""
+
+    def __init__(self):
+        self.content = b''
+        self.etag = ''
+        self.last_modified = 'Mon, 06 Jan 2025 10:00:00 GMT'
+        self.truncate_next = False
+        self.throttle_next = False
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.requests.append(dict(self.headers))
+                if server.throttle_next:
+                    server.throttle_next = False
+                    self.send_response(429)
+                    self.send_header('Retry-After', '0')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                if self.headers.get('If-None-Match') == server.etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+
+                body = server.content
+                range_header = self.headers.get('Range')
+                if range_header and self.headers.get('If-Range') == server.etag:
+                    start = int(range_header.split('=')[1].rstrip('-'))
+                    self.send_response(206)
+                    self.send_header('Content-Range', f"bytes {start}-{len(body) - 1}/{len(body)}")
+                    body = body[start:]
+                else:
+                    self.send_response(200)
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', server.etag)
+                self.send_header('Last-Modified', server.last_modified)
+                self.end_headers()
+
+                if server.truncate_next:
+                    # Coupure réseau au milieu du transfert
+                    server.truncate_next = False
+                    self.wfile.write(body[:len(body) // 2])
+                    self.wfile.flush()
+                    self.close_connection = True
+                    return
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/geo-dvf/latest/csv/2024/full.csv.gz"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def publish(self, rows, etag):
+        self.content = dvf_gzip_bytes(rows)
+        self.etag = etag
+
+
+@pytest.fixture
+def server():
+    fake = FakeDvfServer()
+    fake.publish((dvf_row(i) for i in range(20000)), '"v1"')
+    fake.thread.start()
+    yield fake
+    fake.httpd.shutdown()
+    fake.httpd.server_close()
+
+
+def test_fetch_then_skip_unchanged(server, tmp_path):
+    cache = DownloadCache(str(tmp_path))
+
+    first = cache.fetch(server.url)
+    assert first.changed
+    with open(first.path, 'rb') as f:
+        assert f.read() == server.content
+
+    cache.mark_processed(server.url)
+    second = cache.fetch(server.url)
+    assert second.path == first.path
+    assert not second.changed
+    assert server.requests[-1]['If-None-Match'] == '"v1"'
+    assert server.requests[-1]['If-Modified-Since'] == server.last_modified
+
+
+def test_new_version_is_downloaded(server, tmp_path):
+    cache = DownloadCache(str(tmp_path))
+    cache.fetch(server.url)
+    cache.mark_processed(server.url)
+
+    server.publish((dvf_row(i) for i in range(21000)), '"v2"')
+    refreshed = cache.fetch(server.url)
+
+    assert refreshed.changed
+    with open(refreshed.path, 'rb') as f:
+        assert f.read() == server.content
+
+
+def test_interrupted_download_is_resumed(server, tmp_path):
+    cache = DownloadCache(str(tmp_path))
+    server.truncate_next = True
+    with pytest.raises(Exception):
+        cache.fetch(server.url)
+
+    resumed = cache.fetch(server.url)
+
+    offset = int(server.requests[-1]['Range'].split('=')[1].rstrip('-'))
+    assert 0 < offset <= len(server.content) // 2
+    assert resumed.changed
+    with open(resumed.path, 'rb') as f:
+        assert f.read() == server.content
+
+
+def test_corrupted_cache_is_downloaded_again(server, tmp_path):
+    cache = DownloadCache(str(tmp_path))
+    cached = cache.fetch(server.url)
+    cache.mark_processed(server.url)
+    with open(cached.path, 'r+b') as f:
+        f.write(b'corrupted')
+
+    refetched = cache.fetch(server.url)
+
+    assert 'If-None-Match' not in server.requests[-1]
+    with open(refetched.path, 'rb') as f:
+        assert f.read() == server.content
+
+
+def test_throttled_download_is_retried_after_backoff(server, tmp_path):
+    controller = HostRateController('127.0.0.1', initial_delay=0, backoff_delay=0.01)
+    cache = DownloadCache(str(tmp_path), rate_controller=controller)
+    server.throttle_next = True
+
+    cached = cache.fetch(server.url)
+    assert cached.changed
+    assert len(server.requests) == 2
+    assert controller.backoffs == 1 and controller.responses == 2
@@ -0,0 +1,113 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scraper'))
+
+from dvf_samples import dvf_row, write_dvf_gzip
+from property_store import PropertyStore
+from spiders import gouv_spider
+from spiders.gouv_spider import DVF_DEPARTMENTS, DVF_YEARS, GouvSpider, ingest_dvf_file
+
+URL_A = 'https://files.data.gouv.fr/geo-dvf/latest/csv/2023/full.csv.gz'
+URL_B = 'https://files.data.gouv.fr/geo-dvf/latest/csv/2024/full.csv.gz'
+
+
+class SharedCollection:
+    """Collection real_estate factice partagée par les workers ; refuse les lots de ``broken_prefix``"""
+
+    def __init__(self, broken_prefix=None):
+        self.broken_prefix = broken_prefix
+        self.written = []
+
+    def bulk_write(self, operations, ordered=False):
+        urls = [op._filter['listing_url'] for op in operations]
+        if self.broken_prefix and any(url.startswith(self.broken_prefix) for url in urls):
+            raise ConnectionError("MongoDB indisponible")
+        self.written.extend(urls)
+        return SimpleNamespace(upserted_count=len(operations), modified_count=0, matched_count=0)
+
+
+class FileCache:
+    """Cache de téléchargement factice : un fichier local par URL"""
+
+    def __init__(self, paths):
+        self.paths = paths
+        self.processed = []
+
+    def fetch(self, url):
+        return SimpleNamespace(path=self.paths[url], changed=True)
+
+    def mark_processed(self, url):
+        self.processed.append(url)
+
+
+def dvf_files(tmp_path):
+    """Deux fichiers DVF aux identifiants de mutation distincts"""
+    paths = {URL_A: str(tmp_path / 'a.csv.gz'), URL_B: str(tmp_path / 'b.csv.gz')}
+    write_dvf_gzip(paths[URL_A], (dvf_row(i) for i in range(200)))
+    write_dvf_gzip(paths[URL_B], (dict(dvf_row(i), id_mutation=f"B-{i}") for i in range(150)))
+    return paths
+
+
+def offline_workers(monkeypatch, collection, cache):
+    """Les workers construisent un spider sans MongoDB ni réseau, exécutés dans ce processus"""
+    def worker_spider():
+        spider = GouvSpider.__new__(GouvSpider)
+        spider.store = PropertyStore(collection, 'gouv_spider')
+        spider.mongo_client = None
+        spider.fixture_mode = 'off'
+        spider.download_cache = cache
+        spider.watermarks = SimpleNamespace(load=lambda url: {}, save=lambda url, watermark: None)
+        spider.FORCE_RELOAD = False
+        return spider
+
+    monkeypatch.setattr(gouv_spider, 'GouvSpider', worker_spider)
+    # Pool de threads à la place du pool spawn : la fabrique ci-dessus n'existe pas dans un processus neuf
+    monkeypatch.setattr(gouv_spider, 'ProcessPoolExecutor',
+                        lambda max_workers, mp_context: ThreadPoolExecutor(max_workers))
+
+
+def test_worker_ingests_a_file_and_returns_its_summary(tmp_path, monkeypatch):
+    collection = SharedCollection()
+    cache = FileCache(dvf_files(tmp_path))
+    offline_workers(monkeypatch, collection, cache)
+
+    summary = ingest_dvf_file(URL_A)
+
+    assert summary['properties_scraped'] == len(collection.written) > 0
+    assert summary['failed_batches'] == 0
+    assert summary['departments'] and set(summary['departments']) <= {f"{i % 95 + 1:02}" for i in range(200)}
+    assert cache.processed == [URL_A]
+
+
+def test_parallel_ingestion_merges_worker_summaries(tmp_path, monkeypatch):
+    collection = SharedCollection(broken_prefix='dvf_B-')
+    cache = FileCache(dvf_files(tmp_path))
+    offline_workers(monkeypatch, collection, cache)
+    parent = GouvSpider.__new__(GouvSpider)
+    parent.store = PropertyStore(SharedCollection(), 'gouv_spider')
+
+    parent.process_files_in_parallel([URL_A, URL_B], workers=2)
+
+    # Compteurs du fichier A, lots en échec du fichier B remontés au processus principal
+    assert parent.store.properties_scraped == len(collection.written) > 0
+    assert all(not url.startswith('dvf_B-') for url in collection.written)
+    assert parent.store.failed_batches == 1
+    assert parent.store.crawled_departments
+    # Seul le fichier entièrement écrit est marqué comme traité
+    assert cache.processed == [URL_A]
+    parent.store.close()
+
+
+def test_shards_by_year_or_department():
+    spider = GouvSpider.__new__(GouvSpider)
+    spider.SHARD_BY = 'year'
+    assert spider.get_shard_urls() == [f"{gouv_spider.DVF_BASE_URL}/{year}/full.csv.gz" for year in DVF_YEARS]
+
+    spider.SHARD_BY = 'department'
+    urls = spider.get_shard_urls()
+    assert len(urls) == len(DVF_YEARS) * len(DVF_DEPARTMENTS)
+    assert f"{gouv_spider.DVF_BASE_URL}/2024/departements/2A.csv.gz" in urls
+    assert not any(url.endswith('/57.csv.gz') for url in urls)
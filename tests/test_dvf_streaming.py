@@ -0,0 +1,43 @@
+import os
+import sys
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scraper'))
+
+from utils import iter_gzip_csv
+from dvf_samples import DVF_COLUMNS, dvf_row, write_dvf_gzip
+
+# Plafond mémoire du parsing en flux, indépendant de la taille du fichier
+MEMORY_CEILING = 4 * 1024 * 1024
+
+
+def test_iter_gzip_csv_reads_all_rows(tmp_path):
+    path = tmp_path / 'full.csv.gz'
+    write_dvf_gzip(path, (dvf_row(i) for i in range(50)))
+
+    with open(path, 'rb') as raw:
+        rows = list(iter_gzip_csv(raw))
+
+    assert len(rows) == 50
+    assert list(rows[0].keys()) == DVF_COLUMNS
+    assert rows[10] == dvf_row(10)
+
+
+def test_iter_gzip_csv_memory_is_bounded(tmp_path):
+    path = tmp_path / 'full.csv.gz'
+    row_count = 100_000
+    write_dvf_gzip(path, (dvf_row(i) for i in range(row_count)))
+
+    tracemalloc.start()
+    try:
+        seen = 0
+        with open(path, 'rb') as raw:
+            for row in iter_gzip_csv(raw):
+                seen += 1
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert seen == row_count
+    # Le fichier décompressé pèse plusieurs dizaines de Mo : le pic doit en rester très loin
+    assert peak < MEMORY_CEILING
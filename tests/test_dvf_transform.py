@@ -0,0 +1,60 @@
+import io
+import os
+import random
+import sys
+from decimal import Decimal
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scraper'))
+
+from dvf_samples import dvf_gzip_bytes, dvf_row
+from dvf_transform import iter_dvf_records
+from spiders.gouv_spider import GouvSpider
+
+TIMESTAMP_FIELDS = ('first_seen_at', 'last_seen_at')
+
+
+def sample_rows(count):
+    rng = random.Random(42)
+    rows = [dvf_row(i) for i in range(count)]
+    for row in rows[::3]:
+        # Valeurs aléatoires pour éprouver les arrondis du prix au m²
+        row['valeur_fonciere'] = f"{rng.uniform(1, 2_000_000):.2f}"
+        row['lot3_surface_carrez'] = f"{rng.uniform(5, 200):.2f}"
+    # Cas limites : valeurs invalides, espaces, lots à zéro
+    rows[1].update(nature_mutation='Vente', type_local='Maison', surface_reelle_bati='abc')
+    rows[2].update(nature_mutation='Vente', type_local='Maison', nombre_pieces_principales='3.0')
+    rows[4].update(nature_mutation='Vente', type_local='Appartement', lot1_surface_carrez='  ')
+    rows[5].update(nature_mutation='Vente', type_local='Maison', lot1_surface_carrez='0', surface_reelle_bati='75')
+    rows[6].update(nature_mutation='Vente', type_local='Maison', valeur_fonciere='0')
+    rows[8].update(nature_mutation='Vente', type_local='Maison', lot1_surface_carrez='12.5', surface_reelle_bati='n/a')
+    return rows
+
+
+def row_path(rows):
+    spider = GouvSpider.__new__(GouvSpider)
+    properties = []
+    for row in rows:
+        if row['nature_mutation'] == 'Vente' and row['valeur_fonciere'] and row['type_local'] in ['Maison', 'Appartement']:
+            property_data = spider.process_row(row)
+            if property_data is not None:
+                properties.append(property_data)
+    return properties
+
+
+def normalize(doc):
+    """Applique la conversion faite par PropertyStore.add avant l'écriture MongoDB"""
+    return {key: float(value) if isinstance(value, Decimal) else value
+            for key, value in doc.items() if key not in TIMESTAMP_FIELDS}
+
+
+def test_columnar_engine_matches_row_path():
+    rows = sample_rows(5000)
+    expected = [normalize(doc) for doc in row_path(rows)]
+
+    raw = io.BytesIO(dvf_gzip_bytes(rows))
+    actual = [normalize(doc) for records in iter_dvf_records(raw, GouvSpider.name, chunk_size=700)
+              for doc in records]
+
+    assert len(expected) > 1000
+    assert actual == expected
+    assert all(type(doc['rooms']) in (int, type(None)) for doc in actual)
@@ -0,0 +1,160 @@
+import io
+import os
+import random
+import sys
+from datetime import datetime
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scraper'))
+
+from dvf_samples import dvf_gzip_bytes, dvf_row
+from dvf_transform import bucket_key, iter_dvf_records
+from dvf_watermarks import changed_buckets, compute_watermark
+from property_store import PropertyStore
+from spiders.gouv_spider import GouvSpider
+
+
+def watermark_of(rows):
+    return compute_watermark(io.BytesIO(dvf_gzip_bytes(rows)), chunk_size=500)
+
+
+def test_watermark_ignores_row_order():
+    rows = [dvf_row(i) for i in range(3000)]
+    shuffled = rows[:]
+    random.Random(1).shuffle(shuffled)
+
+    assert watermark_of(rows) == watermark_of(shuffled)
+
+
+def test_only_modified_and_new_buckets_are_detected():
+    rows = [dvf_row(i) for i in range(3000)]
+    previous = watermark_of(rows)
+
+    rows[42] = dict(rows[42], valeur_fonciere='123456.00')
+    new_row = dict(dvf_row(3000), date_mutation='2025-01-15')
+    current = watermark_of(rows + [new_row])
+
+    assert changed_buckets(previous['checksums'], current['checksums']) == {
+        bucket_key(rows[42]['code_departement'], rows[42]['date_mutation']),
+        bucket_key(new_row['code_departement'], new_row['date_mutation']),
+    }
+    assert current['max_date_mutation'] == '2025-01-15'
+
+
+def test_records_are_restricted_to_changed_buckets():
+    rows = [dvf_row(i) for i in range(3000)]
+    buckets = {bucket_key('01', '2024-01'), bucket_key('13', '2024-06')}
+    expected = {f"dvf_{row['id_mutation']}_{row['numero_disposition']}" for row in rows
+                if bucket_key(row['code_departement'], row['date_mutation']) in buckets}
+
+    records = [doc for chunk in iter_dvf_records(io.BytesIO(dvf_gzip_bytes(rows)), 'gouv_spider', buckets=buckets)
+               for doc in chunk]
+
+    assert records
+    assert {doc['listing_url'] for doc in records} <= expected
+
+
+class RecordingCache:
+    """Cache de téléchargement factice qui enregistre les fichiers marqués comme traités"""
+
+    def __init__(self, path):
+        self.path = path
+        self.processed = []
+
+    def fetch(self, url):
+        return SimpleNamespace(path=self.path, changed=True)
+
+    def mark_processed(self, url):
+        self.processed.append(url)
+
+
+class RecordingWatermarks:
+    def __init__(self):
+        self.saved = {}
+
+    def load(self, url):
+        return self.saved.get(url, {})
+
+    def save(self, url, watermark):
+        self.saved[url] = watermark
+
+
+class FailingCollection:
+    def bulk_write(self, operations, ordered=False):
+        raise ConnectionError("MongoDB indisponible")
+
+
+def test_failed_import_is_not_marked_processed(tmp_path):
+    path = tmp_path / 'dvf.csv.gz'
+    path.write_bytes(dvf_gzip_bytes([dvf_row(i) for i in range(300)]))
+    spider = GouvSpider.__new__(GouvSpider)
+    spider.store = PropertyStore(FailingCollection(), 'gouv_spider')
+    spider.fixture_mode = 'off'
+    spider.download_cache = RecordingCache(str(path))
+    spider.watermarks = RecordingWatermarks()
+    spider.FORCE_RELOAD = False
+
+    for property_data in spider.download_and_process_file('https://files.data.gouv.fr/dvf.csv.gz'):
+        spider.store.add(property_data)
+
+    # Lignes perdues : fichier et filigrane non enregistrés, le fichier sera retraité
+    assert spider.store.failed_batches == 1
+    assert spider.download_cache.processed == []
+    assert spider.watermarks.saved == {}
+    spider.store.close()
+
+
+class RecordingCollection:
+    """Collection real_estate factice : lots écrits et balayages d'inactivité"""
+
+    def __init__(self):
+        self.batches = []
+        self.updates = []
+
+    def bulk_write(self, operations, ordered=False):
+        self.batches.append(list(operations))
+        return SimpleNamespace(upserted_count=len(operations), modified_count=0, matched_count=0)
+
+    def update_many(self, query, update):
+        self.updates.append((query, update))
+        return SimpleNamespace(modified_count=len(self.batches))
+
+    def index_information(self):
+        return {'listing_url_1': {'unique': True}}
+
+
+def test_delta_run_leaves_unchanged_mutations_active(tmp_path):
+    rows = [dvf_row(i) for i in range(300)]
+    path = tmp_path / 'dvf.csv.gz'
+    path.write_bytes(dvf_gzip_bytes(rows))
+    url = 'https://files.data.gouv.fr/dvf.csv.gz'
+    collection = RecordingCollection()
+    spider = GouvSpider.__new__(GouvSpider)
+    spider.store = PropertyStore(collection, 'gouv_spider')
+    spider.fixture_mode = 'off'
+    spider.download_cache = RecordingCache(str(path))
+    spider.watermarks = RecordingWatermarks()
+    spider.FORCE_RELOAD = False
+    spider.DELTA = True
+    for property_data in spider.download_and_process_file(url):
+        spider.store.add(property_data)
+
+    # Run suivant : un seul département-mois modifié, les autres mutations ne sont pas réécrites
+    rows[1] = dict(rows[1], valeur_fonciere='123456.00')
+    path.write_bytes(dvf_gzip_bytes(rows))
+    spider.store = PropertyStore(collection, 'gouv_spider')
+    for property_data in spider.download_and_process_file(url):
+        spider.store.add(property_data)
+    assert spider.store.crawled_departments == {rows[1]['code_departement']}
+
+    spider.start_time = datetime.now()
+    spider.pages_scraped = 0
+    spider.checkpoint = spider.work_queue = spider.seen_index = spider.payload_archive = None
+    spider.mongo_collection = collection
+    spider.mongo_db = {'scraping_stats': SimpleNamespace(insert_one=lambda doc: None)}
+    spider.mongo_client = None
+    spider.rate_control = SimpleNamespace(stats=lambda: {})
+    spider.closed('finished')
+
+    # Historique DVF : aucune mutation désactivée faute d'avoir été réécrite
+    assert collection.updates == []
@@ -0,0 +1,109 @@
+import os
+import sys
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scraper'))
+
+from batching import AdaptiveBatchPolicy
+from fingerprint import FingerprintIndex, content_fingerprint
+from property_store import PropertyStore
+from writer import WriteFailure
+
+
+class FakeCollection:
+    """Collection factice répondant aux requêtes $in sur listing_url"""
+
+    def __init__(self, docs):
+        self.docs = {doc['listing_url']: doc for doc in docs}
+        self.queries = []
+
+    def find(self, query, projection):
+        urls = query['listing_url']['$in']
+        self.queries.append(urls)
+        return [
+            {field: doc[field] for field in projection if projection[field] and field in doc}
+            for url, doc in self.docs.items() if url in urls
+        ]
+
+
+def listing(**overrides):
+    now = datetime(2024, 5, 1)
+    doc = {
+        'listing_url': 'https://example.org/annonce/1', 'source': 'bienici', 'department': '75',
+        'price': 350000.0, 'price_per_m2': 10000.0, 'surface_m2': 35.0, 'rooms': 2, 'bedrooms': 1,
+        'address': '75011', 'city': 'Paris', 'postal_code': '75011', 'property_type': 'appartement',
+        'features': {'id': 'abc', 'floor': 3}, 'description': 'Deux pièces lumineux',
+        'first_seen_at': now, 'last_seen_at': now,
+    }
+    doc.update(overrides)
+    return doc
+
+
+def test_fingerprint_ignores_timestamps_but_not_content():
+    base = content_fingerprint(listing())
+    later = datetime(2024, 6, 1)
+    assert content_fingerprint(listing(last_seen_at=later, first_seen_at=later)) == base
+    assert content_fingerprint(listing(price=340000.0)) != base
+    assert content_fingerprint(listing(features={'id': 'abc', 'floor': 4})) != base
+
+
+def test_lookup_prefetches_missing_urls_once_and_caches_them():
+    stored = listing()
+    stored['content_hash'] = content_fingerprint(stored)
+    collection = FakeCollection([stored])
+    index = FingerprintIndex(collection)
+
+    urls = [stored['listing_url'], 'https://example.org/annonce/2']
+    assert index.lookup(urls) == {stored['listing_url']: stored['content_hash']}
+    assert index.lookup(urls) == {stored['listing_url']: stored['content_hash']}
+    assert collection.queries == [urls]
+
+    # Une empreinte écrite pendant le run est servie sans requête
+    index.remember('https://example.org/annonce/2', 'abcd')
+    assert index.lookup(['https://example.org/annonce/2']) == {'https://example.org/annonce/2': 'abcd'}
+    assert len(collection.queries) == 1
+
+
+def test_cache_is_bounded():
+    index = FingerprintIndex(FakeCollection([]), max_entries=2)
+    for i in range(3):
+        index.remember(f'url-{i}', str(i))
+    assert index.lookup(['url-2']) == {'url-2': '2'}
+    assert index.lookup(['url-0']) == {}
+
+
+class FlakyCollection(FakeCollection):
+    """Collection vide dont les écritures échouent tant que ``down`` est vrai"""
+
+    def __init__(self):
+        super().__init__([])
+        self.down = True
+        self.batches = []
+
+    def bulk_write(self, operations, ordered=False):
+        if self.down:
+            raise ConnectionError("MongoDB indisponible")
+        self.batches.append(list(operations))
+        return SimpleNamespace(upserted_count=len(operations), modified_count=0, matched_count=0)
+
+
+def test_fingerprint_is_cached_only_once_written():
+    collection = FlakyCollection()
+    store = PropertyStore(collection, 'bienici', fingerprints=FingerprintIndex(collection),
+                          batch_policy=AdaptiveBatchPolicy(min_docs=1, initial_docs=100))
+    store.add(listing())
+    with pytest.raises(WriteFailure):
+        store.flush()
+
+    # Copie suivante après l'échec : contenu complet réécrit, pas seulement last_seen_at
+    collection.down = False
+    store.add(listing())
+    store.close()
+    (operation,) = collection.batches[0]
+    assert operation._upsert and 'price' in operation._doc['$set']
+    assert store.fingerprints.lookup([listing()['listing_url']]) == {
+        listing()['listing_url']: content_fingerprint(listing())
+    }
@@ -0,0 +1,77 @@
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+from scrapy.exceptions import IgnoreRequest
+from scrapy.http import Request, TextResponse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scraper'))
+
+from dvf_samples import dvf_gzip_bytes, dvf_row
+from http_fixtures import RECORD, REPLAY, FixtureStore
+from items import PropertyItem
+from middlewares import HttpFixtureMiddleware
+from spiders.gouv_spider import GouvSpider
+from test_bienici_spider import ad, bare_spider
+
+SEARCH_URL = 'https://www.bienici.com/realEstateAds.json?filters=%7B%22page%22%3A1%7D'
+
+
+def test_store_round_trip(tmp_path):
+    store = FixtureStore(str(tmp_path))
+    store.save(SEARCH_URL, b'{"total": 0}', headers={'Content-Type': 'application/json', 'Content-Encoding': 'gzip'},
+               spider='bienici_spider', callback='parse')
+    store.save('https://files.data.gouv.fr/geo-dvf/latest/csv/2024/full.csv.gz', b'\x1f\x8b...', spider='gouv_spider')
+
+    fixture = store.get(SEARCH_URL)
+    assert fixture['body_path'].endswith('.body.gz')
+    # Corps enregistré décompressé : l'en-tête de compression n'a plus de sens
+    assert fixture['headers'] == {'Content-Type': 'application/json'}
+    assert store.read_body(fixture) == b'{"total": 0}'
+    assert store.get(SEARCH_URL, method='POST') is None
+
+    (dvf,) = store.fixtures('gouv_spider')
+    assert dvf['body_path'].endswith('.body') and store.read_body(dvf) == b'\x1f\x8b...'
+
+
+def test_recorded_responses_are_replayed_offline(tmp_path):
+    store = FixtureStore(str(tmp_path))
+    spider = bare_spider(tmp_path)
+    payload = {'total': 1, 'from': 0, 'perPage': 24, 'realEstateAds': [ad(1)]}
+    request = Request(SEARCH_URL, callback=spider.parse, cb_kwargs={'department': '33', 'zone_id': '-7405'},
+                      meta={'download_slot': 'bienici-33'})
+    response = TextResponse(SEARCH_URL, body=json.dumps(payload).encode(), encoding='utf-8', request=request,
+                            headers={'Content-Type': 'application/json'})
+
+    recorder = HttpFixtureMiddleware(store, RECORD)
+    assert recorder.process_response(request, response, spider) is response
+    fixture = store.get(SEARCH_URL)
+    assert fixture['spider'] == 'bienici_spider' and fixture['callback'] == 'parse'
+    assert fixture['cb_kwargs'] == {'department': '33', 'zone_id': '-7405'}
+
+    replayer = HttpFixtureMiddleware(store, REPLAY)
+    replayed = replayer.process_request(Request(SEARCH_URL, cb_kwargs=fixture['cb_kwargs']), spider)
+    assert 'fixture' in replayed.flags and replayed.json() == payload
+    items = [result for result in spider.parse(replayed, **fixture['cb_kwargs']) if isinstance(result, PropertyItem)]
+    assert len(items) == 1
+
+    with pytest.raises(IgnoreRequest):
+        replayer.process_request(Request('https://www.bienici.com/unknown.json'), spider)
+
+
+def test_gouv_spider_replays_recorded_archives(tmp_path):
+    url = 'https://files.data.gouv.fr/geo-dvf/latest/csv/2024/full.csv.gz'
+    archive = tmp_path / 'full.csv.gz'
+    archive.write_bytes(dvf_gzip_bytes(dvf_row(i) for i in range(20)))
+    store = FixtureStore(str(tmp_path / 'fixtures'))
+    store.save_file(url, str(archive), spider='gouv_spider')
+
+    spider = GouvSpider.__new__(GouvSpider)
+    spider.fixture_mode = REPLAY
+    spider.fixtures = store
+    spider.store = SimpleNamespace(flush=lambda: None)
+    properties = list(spider.download_and_process_file(url))
+    assert properties and all(record['source'] == 'gouv_spider' for record in properties)
+    assert list(spider.download_and_process_file(url.replace('2024', '2023'))) == []
@@ -0,0 +1,35 @@
+import os
+import sys
+from datetime import datetime
+from decimal import Decimal
+
+import pyarrow.dataset as ds
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scraper'))
+
+from landing_zone import ParquetLandingZone
+
+
+def test_records_are_partitioned_by_source_year_and_department(tmp_path):
+    zone = ParquetLandingZone(str(tmp_path), rows_per_flush=10)
+    seen_at = datetime(2025, 3, 1, 12, 0)
+    zone.add([
+        {'listing_url': 'dvf_1', 'department': '33', 'price': Decimal('250000.0'), 'rooms': 4,
+         'features': [], 'date_mutation': '2023-05-02', 'first_seen_at': seen_at, 'last_seen_at': seen_at},
+        {'listing_url': 'dvf_2', 'department': '75', 'price': Decimal('480000.5'), 'rooms': None,
+         'features': [], 'date_mutation': '2024-01-10', 'first_seen_at': seen_at, 'last_seen_at': seen_at},
+    ], 'gouv_spider')
+    zone.add([
+        {'listing_url': 'ad-1', 'department': '33', 'price': 199000.0, 'rooms': 3,
+         'features': {'photos': 12}, 'first_seen_at': seen_at, 'last_seen_at': seen_at},
+    ], 'bienici_spider')
+    zone.flush()
+
+    assert zone.rows_written == 3
+    assert (tmp_path / 'source=gouv_spider' / 'year=2023' / 'department=33').is_dir()
+    assert (tmp_path / 'source=bienici_spider' / 'year=2025' / 'department=33').is_dir()
+
+    dataset = ds.dataset(str(tmp_path), format='parquet', partitioning='hive')
+    table = dataset.to_table(filter=(ds.field('source') == 'gouv_spider') & (ds.field('year') == 2024))
+    assert table.column('listing_url').to_pylist() == ['dvf_2']
+    assert table.column('price').to_pylist() == [480000.5]
@@ -0,0 +1,75 @@
+import os
+import sys
+from datetime import datetime
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scraper'))
+
+from mongo_indexes import mark_inactive_listings, remove_duplicate_listings
+
+
+class FakeCursor(list):
+    def sort(self, keys):
+        return FakeCursor(sorted(self, key=lambda doc: tuple(doc[field] for field, _ in keys)))
+
+    def allow_disk_use(self, allow):
+        return self
+
+
+class FakeCollection:
+    def __init__(self, docs, unique_index=True):
+        self.docs = list(docs)
+        self.unique_index = unique_index
+        self.finds = 0
+        self.updates = []
+
+    def index_information(self):
+        return {'listing_url_1': {'key': [('listing_url', 1)], 'unique': self.unique_index}}
+
+    def find(self, query, projection):
+        self.finds += 1
+        return FakeCursor({'_id': doc['_id'], 'listing_url': doc['listing_url']} for doc in self.docs)
+
+    def delete_many(self, query):
+        ids = set(query['_id']['$in'])
+        before = len(self.docs)
+        self.docs = [doc for doc in self.docs if doc['_id'] not in ids]
+        return SimpleNamespace(deleted_count=before - len(self.docs))
+
+    def update_many(self, query, update):
+        self.updates.append((query, update))
+        return SimpleNamespace(modified_count=3)
+
+
+def test_duplicate_sweep_is_skipped_when_unique_index_exists():
+    collection = FakeCollection([{'_id': 1, 'listing_url': 'a'}, {'_id': 2, 'listing_url': 'a'}])
+    assert remove_duplicate_listings(collection) == 0
+    assert collection.finds == 0
+
+
+def test_duplicate_sweep_keeps_first_document_per_url():
+    docs = [
+        {'_id': 4, 'listing_url': 'b'}, {'_id': 1, 'listing_url': 'a'}, {'_id': 3, 'listing_url': 'a'},
+        {'_id': 2, 'listing_url': 'b'}, {'_id': 5, 'listing_url': 'c'}, {'_id': 6, 'listing_url': 'a'},
+    ]
+    collection = FakeCollection(docs, unique_index=False)
+    assert remove_duplicate_listings(collection) == 3
+    assert sorted(doc['_id'] for doc in collection.docs) == [1, 2, 5]
+
+
+def test_inactive_sweep_is_scoped_to_source_and_crawled_departments():
+    collection = FakeCollection([])
+    cutoff = datetime(2024, 1, 1)
+    assert mark_inactive_listings(collection, 'bienici', {'75', '13', None}, cutoff) == 3
+    query, update = collection.updates[0]
+    assert query == {
+        'source': 'bienici',
+        'department': {'$in': ['13', '75']},
+        'is_active': True,
+        'last_seen_at': {'$lt': cutoff},
+    }
+    assert update == {'$set': {'is_active': False}}
+
+    # Aucun département parcouru : rien à balayer
+    assert mark_inactive_listings(collection, 'bienici', set(), cutoff) == 0
+    assert len(collection.updates) == 1
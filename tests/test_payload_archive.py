@@ -0,0 +1,107 @@
+import os
+import sys
+from datetime import datetime, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scraper'))
+
+from batching import AdaptiveBatchPolicy
+from payload_archive import PayloadArchive, archive_embedded_payloads, decompress_payload, encode_payload
+from property_store import PropertyStore
+from test_bienici_spider import ad
+from test_pipelines import FakeCollection
+import utils
+
+
+class FakePayloadCollection:
+    """Collection factice indexée par _id (find ``$in``, remplacements et mises à jour)"""
+
+    def __init__(self, docs=None):
+        self.docs = {doc['_id']: doc for doc in docs or []}
+        self.batches = []
+
+    def find(self, query, projection=None):
+        ids = query.get('_id', {}).get('$in')
+        if ids is not None:
+            return [self.docs[_id] for _id in ids if _id in self.docs]
+        # Migration : documents dont features contient encore l'annonce complète
+        return [doc for doc in self.docs.values()
+                if doc.get('source') == query['source'] and 'photos' in (doc.get('features') or {})]
+
+    def find_one(self, query, projection=None):
+        return self.docs.get(query['_id'])
+
+    def bulk_write(self, operations, ordered=False):
+        self.batches.append(list(operations))
+        for operation in operations:
+            _id = operation._filter['_id']
+            document = operation._doc
+            if '$set' in document:
+                self.docs[_id].update(document['$set'])
+            else:
+                self.docs[_id] = {'_id': _id, **document}
+        return SimpleNamespace(upserted_count=0, modified_count=len(operations), matched_count=len(operations))
+
+
+def raw_ad(i):
+    return {**ad(i), 'photos': [{'url': f'https://file.bienici.com/photo/{i}-{p}.jpg'} for p in range(10)]}
+
+
+def test_payloads_are_compressed_and_only_rewritten_when_changed():
+    collection = FakePayloadCollection()
+    archive = PayloadArchive(collection)
+    properties = [{'listing_url': f'ad-{i}', 'raw_payload': raw_ad(i)} for i in range(3)]
+    archive.add(properties + [{'listing_url': 'ad-9'}], 'bienici_spider')
+    archive.flush()
+    assert len(collection.docs) == 3
+    assert collection.docs['ad-1']['encoding'] == 'zlib+json'
+    assert decompress_payload(collection.docs['ad-1']['payload']) == raw_ad(1)
+    assert archive.get('ad-2') == raw_ad(2) and archive.get('ad-9') is None
+
+    changed = {**raw_ad(0), 'price': 1}
+    archive.add([{'listing_url': 'ad-0', 'raw_payload': changed}] + properties[1:], 'bienici_spider')
+    archive.close()
+    assert len(collection.batches) == 2 and len(collection.batches[1]) == 1
+    assert archive.get_many(['ad-0', 'ad-1']) == {'ad-0': changed, 'ad-1': raw_ad(1)}
+    stats = archive.stats()
+    assert (stats['archived'], stats['unchanged']) == (4, 2) and stats['compression_ratio'] > 1
+
+
+def test_store_keeps_raw_payload_out_of_real_estate():
+    real_estate = FakeCollection()
+    archive_collection = FakePayloadCollection()
+    store = PropertyStore(real_estate, 'bienici_spider', sinks=[PayloadArchive(archive_collection)],
+                          batch_policy=AdaptiveBatchPolicy(min_docs=1, initial_docs=10))
+    doc = {'listing_url': 'ad-1', 'department': '33', 'price': 1.0, 'price_per_m2': 1.0, 'surface_m2': 1.0,
+           'rooms': 1, 'bedrooms': 1, 'address': '', 'city': '', 'postal_code': '', 'property_type': 'appartement',
+           'features': {'id': 'ad-1'}, 'description': '', 'first_seen_at': None, 'last_seen_at': None}
+    store.add({**doc, 'raw_payload': raw_ad(1)})
+    store.close()
+    (update,) = real_estate.batches[0]
+    assert 'raw_payload' not in update._doc['$set']
+    assert 'ad-1' in archive_collection.docs
+
+
+def test_embedded_payloads_are_migrated():
+    real_estate = FakePayloadCollection([
+        {'_id': 1, 'listing_url': 'ad-1', 'source': 'bienici_spider', 'features': raw_ad(1)},
+        {'_id': 2, 'listing_url': 'ad-2', 'source': 'bienici_spider', 'features': {'id': 'ad-2'}},
+    ])
+    archive = PayloadArchive(FakePayloadCollection())
+    migrated = archive_embedded_payloads(real_estate, archive, 'bienici_spider',
+                                         lambda features: {'id': features['id']})
+    assert migrated == 1
+    assert real_estate.docs[1]['features'] == {'id': 'ad-1'}
+    assert archive.get('ad-1') == raw_ad(1)
+
+
+def test_payload_encoding_does_not_depend_on_orjson(monkeypatch):
+    payload = {**raw_ad(1), 'title': 'Maison à Pessac', 'price': Decimal('250000.50'),
+               'modificationDate': datetime(2024, 5, 3, 8, 30, tzinfo=timezone.utc),
+               'publicationDate': datetime(2024, 5, 1, 12, 0, 0, 250000)}
+    encoded = encode_payload(payload)
+
+    monkeypatch.setattr(utils, 'orjson', None)
+    assert encode_payload(payload) == encoded
+    assert b'"2024-05-03T08:30:00+00:00"' in encoded[0]
@@ -0,0 +1,84 @@
+import os
+import sys
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scraper'))
+
+from batching import AdaptiveBatchPolicy
+from items import PropertyItem
+from pipelines import PropertyPipeline
+from property_store import PropertyStore
+
+
+class FakeCollection:
+    """Collection factice qui enregistre les lots écrits"""
+
+    def __init__(self):
+        self.batches = []
+
+    def bulk_write(self, operations, ordered=False):
+        self.batches.append(list(operations))
+        return SimpleNamespace(upserted_count=len(operations), modified_count=0, matched_count=0)
+
+
+def make_spider(batch_docs=2):
+    store = PropertyStore(
+        FakeCollection(), 'seloger_spider',
+        batch_policy=AdaptiveBatchPolicy(min_docs=1, initial_docs=batch_docs)
+    )
+    return SimpleNamespace(name='seloger_spider', store=store)
+
+
+def item(i):
+    return PropertyItem(
+        listing_url=f"https://www.seloger.com/annonces/{i}.htm",
+        department='75',
+        price=Decimal('250000'),
+        surface_m2=40.0,
+        rooms=2,
+        property_type='Appartement',
+    )
+
+
+def test_items_are_converted_and_written_in_batches():
+    spider = make_spider(batch_docs=2)
+    pipeline = PropertyPipeline()
+
+    for i in range(3):
+        assert pipeline.process_item(item(i), spider) is not None
+    # Un lot complet est parti, le troisième item attend en tampon
+    spider.store.writer.flush()
+    assert len(spider.store.writer.collection.batches) == 1
+
+    pipeline.close_spider(spider)
+    batches = spider.store.writer.collection.batches
+    assert [len(batch) for batch in batches] == [2, 1]
+
+    update = batches[0][0]._doc['$set']
+    assert update['source'] == 'seloger_spider'
+    assert update['price'] == 250000.0 and isinstance(update['price'], float)
+    # Champs absents de l'item complétés à None
+    assert update['bedrooms'] is None and update['features'] is None
+    assert isinstance(update['last_seen_at'], datetime)
+    assert spider.store.properties_scraped == 3
+    assert spider.store.summary()['departments'] == ['75']
+
+
+def test_store_without_mongo_sink_only_counts():
+    collection = FakeCollection()
+    store = PropertyStore(collection, 'gouv_spider', mongo_sink=False)
+    store.add(PropertyPipeline.to_document(item(1), 'gouv_spider'))
+    store.close()
+    assert collection.batches == []
+    assert store.properties_scraped == 1
+
+
+def test_merge_adds_worker_counters():
+    store = PropertyStore(FakeCollection(), 'gouv_spider')
+    store.merge({'properties_scraped': 5, 'properties_new': 4, 'properties_updated': 1,
+                 'properties_unchanged': 0, 'departments': ['01', '2A']})
+    store.close()
+    assert store.summary() == {'properties_scraped': 5, 'properties_new': 4, 'properties_updated': 1,
+                               'properties_unchanged': 0, 'departments': ['01', '2A'], 'failed_batches': 0}
@@ -0,0 +1,104 @@
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+from scrapy.http import Request, Response
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scraper'))
+
+from middlewares import AdaptiveRateMiddleware
+from rate_control import HostRateController, RateControl, parse_retry_after
+
+
+def feed(controller, count, latency, status=200, start=0.0):
+    reasons = []
+    for i in range(count):
+        reason = controller.observe(status, latency, now=start + i * 0.1)
+        if reason:
+            reasons.append(reason)
+    return reasons
+
+
+def test_healthy_windows_raise_concurrency_and_lower_delay():
+    controller = HostRateController('bienici.com', initial_concurrency=2, max_concurrency=3,
+                                    initial_delay=1.0, target_latency=2.0, window=10)
+    reasons = feed(controller, 30, latency=0.2)
+    assert controller.concurrency == 3
+    assert controller.delay == 1.0 * 0.75 ** 3
+    assert len(reasons) == 3 and reasons[0].endswith('speedup')
+    assert controller.rate > 0
+
+
+def test_slow_or_failing_windows_slow_down():
+    controller = HostRateController('bienici.com', initial_concurrency=4, initial_delay=0.2,
+                                    target_latency=1.0, window=10)
+    (reason,) = feed(controller, 10, latency=3.0)
+    assert controller.concurrency == 3 and controller.delay == 0.25
+    assert reason.startswith('latency 3.00s > 1.00s')
+
+    (reason,) = feed(controller, 10, latency=0.1, status=503)
+    assert controller.concurrency == 2
+    assert reason.startswith('error rate 100%')
+
+
+def test_throttling_responses_back_off_immediately():
+    controller = HostRateController('seloger.com', initial_concurrency=4, initial_delay=0.5,
+                                    backoff_delay=2.0, window=10)
+    assert controller.try_acquire(now=0.0) == 0.0
+    controller.release()
+
+    assert controller.observe(429, 0.3, now=1.0) == 'HTTP 429: backoff'
+    assert controller.concurrency == 2 and controller.delay == 2.0
+    # Les requêtes suivantes attendent la fin du backoff
+    assert controller.try_acquire(now=1.5) == 1.5
+
+    controller.observe(403, 0.3, retry_after=30, now=2.0)
+    assert controller.concurrency == 1 and controller.delay == 30
+    assert controller.stats()['backoffs'] == 2
+    assert [adjustment['reason'] for adjustment in controller.stats()['adjustments']] == \
+        ['HTTP 429: backoff', 'HTTP 403: backoff']
+
+
+def test_acquire_respects_concurrency_and_delay():
+    controller = HostRateController('bienici.com', initial_concurrency=1, initial_delay=1.0)
+    assert controller.try_acquire(now=0.0) == 0.0
+    assert controller.try_acquire(now=5.0) > 0  # emplacement occupé
+    controller.release()
+    assert controller.try_acquire(now=0.4) == 0.6
+    assert controller.try_acquire(now=1.0) == 0.0
+
+
+def test_most_specific_host_wins():
+    rate_control = RateControl({'bienici.com': {}, 'res.bienici.com': {}})
+    assert rate_control.controller_for('https://res.bienici.com/suggest.json?q=33').host == 'res.bienici.com'
+    assert rate_control.controller_for('https://www.bienici.com/realEstateAds.json').host == 'bienici.com'
+    assert rate_control.controller_for('https://example.org/') is None
+    assert RateControl({'bienici.com': {}}, enabled=False).controller_for('https://www.bienici.com/') is None
+
+
+def test_retry_after_parsing():
+    assert parse_retry_after(b'12') == 12.0
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') is None
+    assert parse_retry_after(None) is None
+
+
+def test_middleware_observes_each_response():
+    rate_control = RateControl({'seloger.com': {'initial_concurrency': 2, 'initial_delay': 0}})
+    spider = SimpleNamespace(rate_control=rate_control)
+    middleware = AdaptiveRateMiddleware()
+    controller = rate_control.controller_for('seloger.com')
+
+    request = Request('https://www.seloger.com/list.htm')
+    assert asyncio.run(middleware.process_request(request, spider)) is None
+    assert controller.active == 1
+
+    response = Response(request.url, status=429, headers={'Retry-After': '10'}, request=request)
+    assert middleware.process_response(request, response, spider) is response
+    assert controller.active == 0 and controller.delay == 10
+
+    # Requête non cadencée (hôte inconnu) : ignorée
+    other = Request('https://example.org/')
+    asyncio.run(middleware.process_request(other, spider))
+    middleware.process_exception(other, IOError(), spider)
+    assert controller.responses == 1
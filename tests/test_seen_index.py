@@ -0,0 +1,106 @@
+import os
+import sys
+from decimal import Decimal
+from urllib.parse import unquote
+
+import pytest
+from bson import Decimal128
+from scrapy.http import Request
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scraper'))
+
+from batching import AdaptiveBatchPolicy
+from crawl_checkpoint import CrawlCheckpoint
+from items import PropertyItem
+from pipelines import PropertyPipeline
+from property_store import PropertyStore
+from seen_index import SeenIndex, price_key
+from test_bienici_spider import ad, bare_spider, json_response
+from test_pipelines import FakeCollection
+from test_writer import FailingCollection
+from writer import WriteFailure
+
+
+def test_only_new_or_repriced_listings_count(tmp_path):
+    index = SeenIndex(str(tmp_path / 'seen.sqlite'), 'bienici_spider')
+    assert index.count_changed({'ad-1': 200000, 'ad-2': 300000}) == 2
+    # La comparaison ne modifie pas l'index
+    assert len(index) == 0
+    index.record([('ad-1', 200000), ('ad-2', 300000)])
+    assert index.count_changed({'ad-1': 200000.0, 'ad-2': 290000}) == 1
+    index.record([('ad-2', 290000)])
+    assert index.count_changed({'ad-1': Decimal('200000.00'), 'ad-2': 290000}) == 0
+    # Index propre à chaque source
+    assert SeenIndex(str(tmp_path / 'seen.sqlite'), 'seloger_spider').count_changed({'ad-1': 200000}) == 1
+    assert len(index) == 2
+
+
+def test_index_is_updated_only_for_written_batches(tmp_path):
+    index = SeenIndex(str(tmp_path / 'seen.sqlite'), 'bienici_spider')
+    listing = {'listing_url': 'ad-1', 'department': '33', 'price': Decimal('200000')}
+
+    store = PropertyStore(FailingCollection(), 'bienici_spider', seen_index=index,
+                          batch_policy=AdaptiveBatchPolicy(min_docs=1, initial_docs=100))
+    store.add(PropertyPipeline.to_document(listing, 'bienici_spider'))
+    with pytest.raises(WriteFailure):
+        store.close()
+    # Lot non écrit : l'annonce reste nouvelle pour le prochain run
+    assert index.count_changed({'ad-1': 200000}) == 1
+
+    store = PropertyStore(FakeCollection(), 'bienici_spider', seen_index=index,
+                          batch_policy=AdaptiveBatchPolicy(min_docs=1, initial_docs=100))
+    store.add(PropertyPipeline.to_document(listing, 'bienici_spider'))
+    store.close()
+    assert index.count_changed({'ad-1': 200000}) == 0
+
+
+def test_seed_from_mongo_prices(tmp_path):
+    index = SeenIndex(str(tmp_path / 'seen.sqlite'), 'bienici_spider')
+    assert index.seed([('ad-1', Decimal128('250000.50')), ('', 1), ('ad-2', None)]) == 2
+    assert price_key(Decimal128('250000.50')) == 250000.5
+    assert index.count_changed({'ad-1': 250000.5, 'ad-2': None}) == 0
+
+
+def incremental_spider(tmp_path):
+    spider = bare_spider(tmp_path)
+    spider.seen_index = SeenIndex(str(tmp_path / 'seen.sqlite'), spider.name)
+    spider.incremental_stats = {'pages': 0, 'listings': 0, 'changed': 0, 'early_stops': 0}
+    spider.checkpoint = CrawlCheckpoint(str(tmp_path / 'bienici_spider.json'), interval=3600)
+    return spider
+
+
+def crawl_page(spider, page, ads, **cb_kwargs):
+    payload = {'total': 240, 'from': (page - 1) * 24, 'perPage': 24, 'realEstateAds': ads}
+    response = json_response(f'https://www.bienici.com/realEstateAds.json?page={page}', payload)
+    results = list(spider.parse(response, department='33', zone_id='-7405', **cb_kwargs))
+    items = [result for result in results if isinstance(result, PropertyItem)]
+    requests = [result for result in results if isinstance(result, Request)]
+    return items, requests
+
+
+def test_bienici_stops_after_pages_without_new_listings(tmp_path):
+    spider = incremental_spider(tmp_path)
+    spider.seen_index.record((f'ad-{i}', 200000 + i) for i in range(1, 7))
+
+    # Première page : une annonce nouvelle, seule la page suivante est demandée, triée par date
+    _, (request,) = crawl_page(spider, 1, [ad(1), ad(2), ad(100)], first_page=True)
+    assert '"sortBy":"modificationDate"' in unquote(request.url)
+    assert request.cb_kwargs['stale_pages'] == 0
+
+    _, (request,) = crawl_page(spider, 2, [ad(3), ad(4)], stale_pages=request.cb_kwargs['stale_pages'])
+    assert request.cb_kwargs['stale_pages'] == 1
+
+    # Deuxième page consécutive sans nouveauté : le département est terminé
+    items, requests = crawl_page(spider, 3, [ad(5), ad(6)], stale_pages=request.cb_kwargs['stale_pages'])
+    assert len(items) == 2 and requests == []
+    assert spider.checkpoint.is_done('33')
+    assert spider.incremental_stats == {'pages': 3, 'listings': 7, 'changed': 1, 'early_stops': 1}
+
+
+def test_incremental_resume_restarts_at_first_missing_page(tmp_path):
+    spider = incremental_spider(tmp_path)
+    spider.checkpoint.start_department('33', 10, zone_id='-7405', per_page=24)
+    for page in (1, 2, 3):
+        spider.checkpoint.page_done('33', page)
+    (request,) = spider.department_requests('33')
+    assert '"page":4' in unquote(request.url)
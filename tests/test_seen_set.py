@@ -0,0 +1,92 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scraper'))
+
+from batching import AdaptiveBatchPolicy
+from pipelines import PropertyPipeline
+from property_store import PropertyStore
+from seen_set import RunSeenSet
+from writer import WriteFailure
+
+
+class FakeCollection:
+    def __init__(self):
+        self.batches = []
+
+    def bulk_write(self, operations, ordered=False):
+        self.batches.append(list(operations))
+        return SimpleNamespace(upserted_count=len(operations), modified_count=0, matched_count=0)
+
+
+class FlakyCollection(FakeCollection):
+    """Refuse le premier lot, accepte les suivants"""
+
+    def __init__(self):
+        super().__init__()
+        self.failures = 1
+
+    def bulk_write(self, operations, ordered=False):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("MongoDB indisponible")
+        return super().bulk_write(operations, ordered)
+
+
+def url(i):
+    return f"https://www.seloger.com/annonces/{i}.htm"
+
+
+def test_repeated_listings_are_reported_without_false_negatives():
+    seen = RunSeenSet(capacity=1000, error_rate=1e-3)
+    assert not any(seen.check_and_add(url(i)) for i in range(1000))
+    assert all(seen.check_and_add(url(i)) for i in range(0, 1000, 2))
+    assert not seen.check_and_add(None)
+
+    stats = seen.stats()
+    assert (stats['checked'], stats['duplicates'], stats['hit_rate']) == (1500, 500, 0.3333)
+
+
+def test_filters_grow_past_capacity_within_the_error_rate():
+    seen = RunSeenSet(capacity=1000, error_rate=1e-2)
+    for i in range(5000):
+        seen.check_and_add(url(i))
+    assert len(seen.filters) == 3
+    assert all(seen.check_and_add(url(i)) for i in range(5000))
+    # Quelques octets par annonce, loin d'un set d'URLs
+    assert seen.stats()['memory_bytes'] < 5000 * 3
+
+    # Annonces jamais vues : faux positifs sous le taux demandé
+    false_positives = sum(seen.check_and_add(url(f"new-{i}")) for i in range(20_000))
+    assert false_positives / 20_000 < 1e-2
+
+
+def test_store_writes_a_listing_once_per_run():
+    store = PropertyStore(FakeCollection(), 'bienici_spider', batch_policy=AdaptiveBatchPolicy(min_docs=1, initial_docs=100),
+                          seen=RunSeenSet(capacity=100))
+    for department, i in [('33', 1), ('33', 2), ('33', 1), ('40', 2), ('40', 3)]:
+        store.add(PropertyPipeline.to_document({'listing_url': url(i), 'department': department}, 'bienici_spider'))
+    store.close()
+
+    written = [op._filter['listing_url'] for batch in store.writer.collection.batches for op in batch]
+    assert written == [url(1), url(2), url(3)]
+    assert store.seen.stats()['duplicates'] == 2
+
+
+def test_listing_from_a_failed_batch_is_written_when_seen_again():
+    store = PropertyStore(FlakyCollection(), 'bienici_spider', batch_policy=AdaptiveBatchPolicy(min_docs=1, initial_docs=100),
+                          seen=RunSeenSet(capacity=100))
+    store.add(PropertyPipeline.to_document({'listing_url': url(1), 'department': '33'}, 'bienici_spider'))
+    with pytest.raises(WriteFailure):
+        store.flush()
+
+    # Le filtre a déjà marqué l'annonce : sa copie suivante passe quand même
+    for department, i in [('40', 1), ('40', 2), ('64', 1)]:
+        store.add(PropertyPipeline.to_document({'listing_url': url(i), 'department': department}, 'bienici_spider'))
+    store.flush()
+    written = [op._filter['listing_url'] for batch in store.writer.collection.batches for op in batch]
+    assert sorted(written) == [url(1), url(2)]
+    store.close()
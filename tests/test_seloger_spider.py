@@ -0,0 +1,102 @@
+import os
+import sys
+from decimal import Decimal
+
+from scrapy.http import HtmlResponse, Request
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scraper'))
+
+from crawl_checkpoint import CrawlCheckpoint
+from items import PropertyItem
+from spiders.seloger_spider import CARD_XPATH, SeLogerSpider, extract_card, parse_keyfacts
+
+
+def bare_spider():
+    """Spider sans MongoDB ni gestionnaire de signal : seul parse est testé"""
+    spider = SeLogerSpider.__new__(SeLogerSpider)
+    spider.pages_scraped = 0
+    spider._shutdown_requested = False
+    spider.work_queue = None
+    spider.checkpoint = None
+    spider.seen_index = None
+    return spider
+
+
+def card(i):
+    return f'''
+    <div data-testid="serp-core-classified-card-testid">
+      <a data-testid="card-mfe-covering-link-testid" href="https://www.seloger.com/annonces/achat/{i}.htm"></a>
+      <div data-testid="cardmfe-price-testid">{250 + i}&#160;000&#160;€<span>Prix</span></div>
+      <div data-testid="cardmfe-keyfacts-testid">
+        <div>4 pièces</div><div>·</div><div>3 chambres</div><div>·</div><div>85,5 m²</div><div>·</div><div>600 m² terrain</div>
+      </div>
+      <div data-testid="cardmfe-description-box-text-test-id"><div>Maison à vendre</div><div>Bordeaux</div></div>
+      <div data-testid="cardmfe-description-box-address">Bordeaux (33000)</div>
+      <div data-testid="cardmfe-description-text-test-id"><div>Belle maison </div><div>avec jardin</div></div>
+    </div>'''
+
+
+def html_response(url, cards, request=None, status=200):
+    body = f'''<html><head><meta name="description" content="60 annonces immobilières"></head>
+    <body>{''.join(cards)}</body></html>'''
+    return HtmlResponse(url=url, body=body.encode(), encoding='utf-8', request=request, status=status)
+
+
+def legacy_card(listing):
+    """Sélecteurs CSS appliqués champ par champ (extraction d'origine)"""
+    return {
+        'price': listing.css('div[data-testid="cardmfe-price-testid"]::text').get(),
+        'address': listing.css('div[data-testid="cardmfe-description-box-address"]::text').get(),
+        'listing_url': listing.css('a[data-testid="card-mfe-covering-link-testid"]::attr(href)').get(),
+        'keyfacts': listing.css('div[data-testid="cardmfe-keyfacts-testid"] div::text').getall(),
+        'description': listing.css('div[data-testid="cardmfe-description-text-test-id"] div::text').getall(),
+        'description_box': listing.css('div[data-testid="cardmfe-description-box-text-test-id"] div::text').getall(),
+    }
+
+
+def test_single_pass_extraction_matches_css_selectors():
+    response = html_response('https://www.seloger.com/immobilier/achat/33/?LISTING-LISTpg=1',
+                             [card(i) for i in range(3)])
+    legacy = [legacy_card(listing) for listing in response.css('div[data-testid="serp-core-classified-card-testid"]')]
+    fast = [extract_card(listing) for listing in CARD_XPATH(response.selector.root)]
+    assert fast == legacy
+    assert fast[0]['price'] == '250\xa0000\xa0€'
+
+
+def test_keyfacts_keep_first_rooms_surface_and_bedrooms():
+    assert parse_keyfacts(['4 pièces', '3 chambres', '600 m² terrain', '85,5 m²']) == (4, 85.5, 3)
+    assert parse_keyfacts(['Studio', '', '20 m²']) == (None, 20.0, None)
+
+
+def test_parse_yields_properties_and_next_page():
+    spider = bare_spider()
+    url = 'https://www.seloger.com/immobilier/achat/33/?LISTING-LISTpg=1'
+    response = html_response(url, [card(i) for i in range(2)], request=Request(url, meta={'department': '33'}))
+
+    results = list(spider.parse(response))
+    items = [result for result in results if isinstance(result, PropertyItem)]
+    requests = [result for result in results if isinstance(result, Request)]
+    assert len(items) == 2
+    assert items[0]['price'] == Decimal('250000')
+    assert items[0]['price_per_m2'] == Decimal('2923.0')
+    assert (items[0]['rooms'], items[0]['bedrooms'], items[0]['surface_m2']) == (4.0, 3.0, 85.5)
+    assert (items[0]['city'], items[0]['postal_code']) == ('Bordeaux', '33000')
+    assert items[0]['property_type'] == 'Maison'
+    assert items[0]['description'] == 'Belle maison avec jardin'
+    assert items[0]['features'] == ['4 pièces', '3 chambres', '85,5 m²', '600 m² terrain']
+    assert [request.url for request in requests] == ['https://www.seloger.com/immobilier/achat/33/?LISTING-LISTpg=2']
+    assert spider.pages_scraped == 1
+
+
+def test_blocked_empty_page_leaves_the_department_open(tmp_path):
+    spider = bare_spider()
+    spider.checkpoint = CrawlCheckpoint(str(tmp_path / 'seloger_spider.json'), interval=3600)
+    url = 'https://www.seloger.com/immobilier/achat/33/?LISTING-LISTpg=3'
+    request = Request(url, meta={'department': '33'})
+
+    assert list(spider.parse(html_response(url, [], request=request, status=403))) == []
+    assert not spider.checkpoint.is_done('33')
+
+    # Page vide servie normalement : fin des annonces du département
+    list(spider.parse(html_response(url, [], request=request)))
+    assert spider.checkpoint.is_done('33')
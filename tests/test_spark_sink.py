@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scraper'))
+
+from property_store import PropertyStore
+from spark_sink import SPARK_SINK_COLUMNS, SparkMongoSink, to_row
+
+SCRAPER_DIR = os.path.join(os.path.dirname(__file__), '..', 'scraper')
+
+
+class RecordingSink:
+    """Sink factice qui garde les lots reçus"""
+
+    def __init__(self):
+        self.records = []
+        self.flushed = 0
+        self.closed = False
+
+    def add(self, records, source):
+        self.records.extend(records)
+
+    def flush(self):
+        self.flushed += 1
+
+    def close(self):
+        self.closed = True
+
+
+def test_spiders_import_without_pyspark():
+    code = ("import sys; import spiders.bienici_spider, spiders.seloger_spider; "
+            "print('pyspark' in sys.modules)")
+    result = subprocess.run([sys.executable, '-c', code], cwd=SCRAPER_DIR,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == 'False'
+
+
+def test_rows_have_fixed_types():
+    now = datetime(2024, 5, 1)
+    row = dict(zip(SPARK_SINK_COLUMNS, to_row({
+        'listing_url': 'ad-1', 'department': 33, 'price': 250000, 'rooms': 3.0,
+        'features': {'balcon': True}, 'last_seen_at': now,
+    }, 'bienici_spider')))
+    assert row['source'] == 'bienici_spider'
+    assert row['department'] == '33'
+    assert row['price'] == 250000.0 and isinstance(row['price'], float)
+    assert row['rooms'] == 3 and isinstance(row['rooms'], int)
+    assert row['features'] == '{"balcon": true}'
+    assert row['last_seen_at'] == now and row['bedrooms'] is None
+
+
+def test_session_is_only_created_when_rows_are_written():
+    sink = SparkMongoSink('test', 'mongodb://localhost', 'db', 'real_estate_spark', rows_per_flush=10)
+    sink.flush()
+    sink.add([{'listing_url': 'ad-1'}], 'bienici_spider')
+    # Tampon vide puis sous le seuil : aucune session Spark créée
+    assert sink._spark is None
+    assert len(sink._rows) == 1
+
+
+def test_store_feeds_and_closes_extra_sinks():
+    sink = RecordingSink()
+    store = PropertyStore(None, 'bienici_spider', mongo_sink=False, sinks=[sink])
+    store.add({'listing_url': 'ad-1', 'department': '33'})
+    store.flush()
+    assert [record['listing_url'] for record in sink.records] == ['ad-1']
+    assert sink.flushed == 1 and not sink.closed
+    store.close()
+    assert sink.closed
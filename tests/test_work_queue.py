@@ -0,0 +1,144 @@
+import os
+import sys
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from scrapy.exceptions import DontCloseSpider
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scraper'))
+
+from spiders.bienici_spider import BienIciSpider
+from work_queue import DONE, FAILED, LEASED, PENDING, SqliteWorkQueue, claim_batch, has_open_jobs
+from zone_cache import ZoneIdCache
+
+NOW = datetime(2024, 6, 1, 8, 0)
+
+
+def make_queue(tmp_path, **kwargs):
+    return SqliteWorkQueue(str(tmp_path / 'queue.sqlite'), 'bienici_spider', '2024-06-01', **kwargs)
+
+
+def test_seed_is_idempotent_and_jobs_are_claimed_once(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.seed(['01', '02'])
+    # Un second réplica qui démarre ne recrée pas les jobs
+    make_queue(tmp_path).seed(['01', '02'])
+
+    first = queue.claim('worker-a', now=NOW)
+    second = make_queue(tmp_path).claim('worker-b', now=NOW)
+    assert (first['key'], second['key']) == ('01', '02')
+    assert queue.claim('worker-a', now=NOW) is None
+    assert queue.counts() == {LEASED: 2}
+
+    assert queue.complete(first)
+    assert queue.counts() == {LEASED: 1, DONE: 1}
+    assert has_open_jobs(queue.counts())
+
+
+def test_expired_lease_is_taken_over_by_another_worker(tmp_path):
+    queue = make_queue(tmp_path, lease_seconds=60)
+    queue.seed(['33'])
+    crashed = queue.claim('worker-a', now=NOW)
+
+    # Heartbeat : le bail est prolongé, le job reste réservé
+    assert queue.heartbeat(crashed, now=NOW + timedelta(seconds=50))
+    assert queue.claim('worker-b', now=NOW + timedelta(seconds=100)) is None
+
+    taken = queue.claim('worker-b', now=NOW + timedelta(seconds=200))
+    assert taken['key'] == '33' and taken['attempts'] == 2
+    # L'ancien propriétaire a perdu son bail et ne peut plus terminer le job
+    assert not queue.heartbeat(crashed, now=NOW + timedelta(seconds=210))
+    assert not queue.complete(crashed)
+    assert queue.complete(taken)
+
+
+def test_jobs_fail_after_max_attempts(tmp_path):
+    queue = make_queue(tmp_path, lease_seconds=60, max_attempts=2)
+    queue.seed(['75'])
+    job = queue.claim('worker-a', now=NOW)
+    queue.release(job, error='shutdown')
+    assert queue.counts() == {PENDING: 1}
+
+    queue.claim('worker-a', now=NOW)
+    assert queue.claim('worker-b', now=NOW + timedelta(hours=1)) is None
+    assert queue.counts() == {FAILED: 1}
+    assert not has_open_jobs(queue.counts())
+
+
+def test_sqlite_queue_requires_a_shared_file():
+    with pytest.raises(ValueError):
+        SqliteWorkQueue('', 'bienici_spider', '2024-06-01')
+
+
+def test_claim_batch_respects_size(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.seed(['01', '02', '03'])
+    assert [job['key'] for job in claim_batch(queue, 'worker-a', 2)] == ['01', '02']
+    assert [job['key'] for job in claim_batch(queue, 'worker-a', 2)] == ['03']
+
+
+@pytest.fixture
+def queued_spider(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules['spiders.base_spider'].WORK_QUEUE_CONFIG, 'batch_size', 2)
+    spider = BienIciSpider.__new__(BienIciSpider)
+    spider.pages_scraped = 0
+    spider._shutdown_requested = False
+    spider.zone_cache = ZoneIdCache(str(tmp_path / 'zones.json'))
+    spider.work_queue = make_queue(tmp_path)
+    spider.checkpoint = None
+    spider.seen_index = None
+    spider.worker_id = 'worker-a'
+    spider._jobs = []
+    spider._jobs_failed_batches = 0
+    spider.store = SimpleNamespace(failed_batches=0, flush=lambda: None)
+    # Heartbeat déjà « démarré » : pas de LoopingCall hors du reactor
+    spider._heartbeat = SimpleNamespace(running=False)
+    crawled = []
+    spider.crawler = SimpleNamespace(engine=SimpleNamespace(crawl=crawled.append))
+    return spider, crawled
+
+
+def test_spider_crawls_departments_batch_by_batch(queued_spider):
+    spider, crawled = queued_spider
+    requests = list(spider.department_start_requests(['01', '02', '03'], spider.department_requests))
+    assert [request.cb_kwargs['department'] for request in requests] == ['01', '02']
+
+    # Lot terminé : jobs clos, lot suivant planifié et fermeture du spider repoussée
+    with pytest.raises(DontCloseSpider):
+        spider._on_spider_idle()
+    assert [request.cb_kwargs['department'] for request in crawled] == ['03']
+    assert spider.work_queue.counts() == {DONE: 2, LEASED: 1}
+
+    spider._on_spider_idle()
+    assert spider.work_queue.counts() == {DONE: 3}
+
+
+def test_interrupted_batch_is_returned_to_the_queue(queued_spider):
+    spider, _ = queued_spider
+    list(spider.department_start_requests(['01', '02', '03'], spider.department_requests))
+    spider._shutdown_requested = True
+    spider._on_spider_idle()
+    spider._release_jobs('shutdown')
+    assert spider.work_queue.counts() == {PENDING: 3}
+
+
+def test_jobs_with_failed_writes_are_not_completed(queued_spider):
+    spider, crawled = queued_spider
+    list(spider.department_start_requests(['01', '02', '03'], spider.department_requests))
+    spider.store.failed_batches = 1
+
+    # Écritures du lot en échec : ses départements sont rendus à la file et retentés
+    with pytest.raises(DontCloseSpider):
+        spider._on_spider_idle()
+    assert DONE not in spider.work_queue.counts()
+    assert [(job['key'], job['attempts']) for job in spider._jobs] == [('03', 1), ('01', 2)]
+
+
+def test_queue_requires_an_explicit_run_id(monkeypatch):
+    config = sys.modules['spiders.base_spider'].WORK_QUEUE_CONFIG
+    monkeypatch.setitem(config, 'enabled', True)
+    monkeypatch.setitem(config, 'run_id', '')
+    spider = BienIciSpider.__new__(BienIciSpider)
+    with pytest.raises(ValueError):
+        spider._init_work_queue()
@@ -0,0 +1,100 @@
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scraper'))
+
+from batching import AdaptiveBatchPolicy
+from pipelines import PropertyPipeline
+from property_store import PropertyStore
+from writer import BackgroundBulkWriter, WriteFailure
+
+
+class SlowCollection:
+    """Collection factice dont chaque bulk_write prend un peu de temps"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.batches = []
+        self.release = threading.Event()
+
+    def bulk_write(self, operations, ordered=False):
+        self.release.wait()
+        time.sleep(self.delay)
+        self.batches.append(list(operations))
+        return SimpleNamespace(upserted_count=len(operations), modified_count=0, matched_count=0)
+
+
+def test_batches_are_written_in_background_and_flushed_on_close():
+    collection = SlowCollection(delay=0.01)
+    results = []
+    writer = BackgroundBulkWriter(collection, max_pending=2,
+                                  on_result=lambda result, count, latency: results.append(count))
+
+    # Le parsing n'attend pas l'écriture du lot tant que la file n'est pas pleine
+    start = time.perf_counter()
+    writer.submit(['op'] * 3, 3)
+    writer.submit(['op'] * 2, 2)
+    assert time.perf_counter() - start < 0.5
+    assert collection.batches == []
+
+    collection.release.set()
+    writer.close()
+
+    assert collection.batches == [['op'] * 3, ['op'] * 2]
+    assert results == [3, 2]
+
+
+def test_submit_blocks_when_queue_is_full():
+    collection = SlowCollection(delay=0)
+    writer = BackgroundBulkWriter(collection, max_pending=1)
+    writer.submit(['op'], 1)  # pris par le thread d'écriture, bloqué sur release
+    time.sleep(0.05)
+    writer.submit(['op'], 1)  # remplit la file
+
+    blocked = threading.Thread(target=writer.submit, args=(['op'], 1))
+    blocked.start()
+    blocked.join(timeout=0.1)
+    assert blocked.is_alive()
+
+    collection.release.set()
+    blocked.join(timeout=2)
+    writer.close()
+    assert len(collection.batches) == 3
+
+
+class FailingCollection:
+    def bulk_write(self, operations, ordered=False):
+        raise ConnectionError("MongoDB indisponible")
+
+
+def test_failed_batches_are_reported_by_flush_and_close():
+    writer = BackgroundBulkWriter(FailingCollection())
+    writer.submit(['op'], 1)
+    with pytest.raises(WriteFailure):
+        writer.flush()
+    assert writer.failed_batches == 1
+    assert isinstance(writer.last_error, ConnectionError)
+    # Échec déjà signalé : le flush suivant ne le relève pas, le compteur reste
+    writer.flush()
+
+    writer.submit(['op'], 1)
+    with pytest.raises(WriteFailure):
+        writer.close()
+    assert writer.failed_batches == 2
+
+
+def test_store_flush_fails_when_its_batches_fail():
+    store = PropertyStore(FailingCollection(), 'seloger_spider',
+                          batch_policy=AdaptiveBatchPolicy(min_docs=1, initial_docs=100))
+    store.add(PropertyPipeline.to_document({'listing_url': 'https://www.seloger.com/annonces/1.htm',
+                                            'department': '75'}, 'seloger_spider'))
+    with pytest.raises(WriteFailure):
+        store.flush()
+    assert store.properties_scraped == 0
+    assert store.summary()['failed_batches'] == 1
+    store.close()